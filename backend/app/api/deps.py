@@ -0,0 +1,29 @@
+# app/api/deps.py
+from fastapi import HTTPException, Request
+from ..core.config import settings
+from ..services.catalog import Catalog
+from ..services.pipeline_loader import PipelineUnavailable
+from ..services.quiz import QuestionBank
+
+# The shared objects live on app.state, set up by app.main, so routers can
+# depend on them without importing the app
+
+
+async def get_rag_pipeline(request: Request):
+    """The RAG pipeline, waiting for it while it warms up (503 if it is not ready in time)."""
+    try:
+        return await request.app.state.pipeline_loader.get(timeout=settings.PIPELINE_WAIT_TIMEOUT)
+    except PipelineUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+
+def get_catalog(request: Request) -> Catalog:
+    catalog = request.app.state.catalog
+    catalog.maybe_reload()
+    return catalog
+
+
+def get_question_bank(request: Request) -> QuestionBank:
+    bank = request.app.state.question_bank
+    bank.maybe_reload()
+    return bank
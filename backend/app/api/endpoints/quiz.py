@@ -0,0 +1,36 @@
+# app/api/endpoints/quiz.py
+from typing import Optional
+import random
+from fastapi import APIRouter, Depends, HTTPException, Query
+from ...services.catalog import Catalog
+from ...services.quiz import QuestionBank
+from ..deps import get_catalog, get_question_bank
+
+router = APIRouter()
+
+
+@router.get("/api/quiz/{chapter_id}")
+async def get_quiz(
+    chapter_id: str,
+    count: int = Query(10, ge=1, le=50),
+    seed: Optional[int] = None,
+    bank: QuestionBank = Depends(get_question_bank),
+    catalog: Catalog = Depends(get_catalog)
+):
+    """
+    A randomized quiz drawn from the chapter's pre-generated question bank.
+
+    The seed is returned so the same quiz can be requested again.
+    """
+    if catalog.get_chapter(chapter_id) is None:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    scope = catalog.retrieval_scope({"chapterId": chapter_id})
+    if not scope or "chapter" not in scope:
+        raise HTTPException(status_code=404, detail="This chapter is not linked to an indexed book")
+    key = QuestionBank.key(scope["book"], scope["chapter"])
+    if seed is None:
+        seed = random.randrange(2 ** 31)
+    questions = bank.quiz(key, count, seed)
+    if not questions:
+        raise HTTPException(status_code=404, detail="No quiz questions have been generated for this chapter yet")
+    return {"chapter_id": chapter_id, "seed": seed, "questions": questions}
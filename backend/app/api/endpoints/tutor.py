@@ -0,0 +1,60 @@
+# app/api/endpoints/tutor.py
+import logging
+from fastapi import APIRouter, Depends, HTTPException
+from ...models.schemas import SessionStart, SessionQuestion, SessionAnswer
+from ...services.catalog import Catalog
+from ..deps import get_rag_pipeline, get_catalog
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/tutor/sessions")
+
+
+def get_session(session_id: str, pipeline):
+    session = pipeline.sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return session
+
+
+@router.post("", status_code=201)
+async def start_session(
+    start: SessionStart,
+    pipeline = Depends(get_rag_pipeline),
+    catalog: Catalog = Depends(get_catalog)
+):
+    """Start a multi-turn tutoring session, optionally tied to the chapter it was opened from."""
+    session = pipeline.sessions.create(scope=catalog.retrieval_scope(start.context))
+    return {"session_id": session.id, "scope": session.scope}
+
+
+@router.post("/{session_id}/ask", response_model=SessionAnswer)
+async def ask_in_session(
+    session_id: str,
+    question: SessionQuestion,
+    pipeline = Depends(get_rag_pipeline)
+):
+    session = get_session(session_id, pipeline)
+    try:
+        result = await pipeline.answer_in_session(session, question.question)
+    except Exception as e:
+        logger.error(f"Error answering in session {session_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing question: {str(e)}")
+    return SessionAnswer(
+        answer=result["answer"],
+        sources=result["sources"],
+        session_id=session_id,
+        reused_context=result["reused_context"]
+    )
+
+
+@router.get("/{session_id}")
+async def get_session_history(session_id: str, pipeline = Depends(get_rag_pipeline)):
+    """The session's summary of earlier turns and its recent turns verbatim."""
+    return get_session(session_id, pipeline).to_dict()
+
+
+@router.delete("/{session_id}", status_code=204)
+async def end_session(session_id: str, pipeline = Depends(get_rag_pipeline)):
+    if not pipeline.sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
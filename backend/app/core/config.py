@@ -7,7 +7,21 @@ from pathlib import Path
 class Settings(BaseSettings):
     APP_NAME: str = "Tailor Tutor"
     DEBUG: bool = True
+    LOG_LEVEL: str = "INFO"
     API_V1_STR: str = "/api"
     PROJECT_ROOT: str = str(Path(__file__).parent.parent.parent)
+    CATALOG_DIR: str = str(Path(__file__).parent.parent.parent / "data" / "catalog")
+    CATALOG_CHECK_INTERVAL: float = 2.0
+    CATALOG_MAX_AGE: int = 60
+    PIPELINE_WAIT_TIMEOUT: float = 30.0
+    PIPELINE_RETRY_DELAY: float = 5.0
+    PIPELINE_MAX_RETRY_DELAY: float = 300.0
+    RAW_DATA_DIR: str = str(Path(__file__).parent.parent.parent / "data" / "raw")
+    QUIZ_BANK_DIR: str = str(Path(__file__).parent.parent.parent / "data" / "quiz")
+    QUIZ_WORKERS: int = 4
+    INDEX_MAX_JOBS: int = 1
+    INDEX_EMBED_WORKERS: int = 1
+    INDEX_EMBEDDING_CONCURRENCY: int = 1
+    INDEX_PROCESS_WORKERS: int = 2
 
 settings = Settings()
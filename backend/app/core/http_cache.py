@@ -0,0 +1,168 @@
+# app/core/http_cache.py
+from typing import Dict, Optional
+from pathlib import Path
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Assets requested with a matching ?v=<content hash> can never change under that URL
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+# Below this size compression costs more than it saves
+MIN_COMPRESS_SIZE = 512
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag, as RFC 9110 requires for GET."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in if_none_match.split(","))
+
+
+def cached_response(
+    request: Request,
+    body: bytes,
+    version: str,
+    max_age: int = 0,
+    media_type: str = "application/json"
+) -> Response:
+    """
+    Build a response with a strong ETag, answering 304 when the client already has it.
+
+    Args:
+        request: Incoming request, read for If-None-Match
+        body: Serialized response body
+        version: Version of the data the body was built from (e.g. the catalog version)
+        max_age: Seconds the client may reuse the body without revalidating
+        media_type: Content type of the body
+
+    Returns:
+        A 304 with no body if the client's copy is current, else the full response
+    """
+    etag = f'"{version}-{content_hash(body)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={max_age}, must-revalidate" if max_age else REVALIDATE
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def accepted_encodings(header: str) -> set:
+    """Content codings from an Accept-Encoding header, minus any refused with q=0."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class _Asset:
+    """One static file held in memory, with its compressed variants."""
+
+    def __init__(self, full_path: str, stat_result: os.stat_result):
+        with open(full_path, "rb") as f:
+            raw = f.read()
+        self.signature = (stat_result.st_mtime_ns, stat_result.st_size)
+        self.hash = content_hash(raw)
+        self.media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+        self.bodies: Dict[str, bytes] = {"identity": raw}
+        if len(raw) >= MIN_COMPRESS_SIZE:
+            self.bodies["gzip"] = gzip.compress(raw, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(raw)
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that serves files from memory, precompressed, with content-hash ETags.
+
+    Every file is read and compressed (gzip, plus brotli when the `brotli`
+    package is installed) once and re-read only when its mtime or size
+    changes. Requests carrying `?v=<content hash>`, as produced by
+    `asset_url`, get a year-long immutable Cache-Control; other requests
+    are revalidated against the ETag and answered with 304 when unchanged.
+    Range requests are left to StaticFiles, which serves the file as is.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._assets: Dict[str, _Asset] = {}
+        if self.directory is not None:
+            self._warm(Path(self.directory))
+
+    def _warm(self, directory: Path) -> None:
+        for file_path in directory.rglob("*"):
+            if file_path.is_file():
+                full_path, stat_result = self.lookup_path(file_path.relative_to(directory).as_posix())
+                if stat_result is not None:
+                    self._asset(full_path, stat_result)
+        logger.info(f"Precompressed {len(self._assets)} static files from {directory}")
+
+    def _asset(self, full_path: str, stat_result: os.stat_result) -> _Asset:
+        asset = self._assets.get(full_path)
+        if asset is None or asset.signature != (stat_result.st_mtime_ns, stat_result.st_size):
+            asset = _Asset(full_path, stat_result)
+            self._assets[full_path] = asset
+        return asset
+
+    def asset_url(self, mount_path: str, path: str) -> str:
+        """Fingerprinted URL for a file under this directory, for use in templates."""
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None:
+            return f"{mount_path}/{path}"
+        return f"{mount_path}/{path}?v={self._asset(full_path, stat_result).hash}"
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request = Request(scope)
+        if "range" in request.headers:
+            # Byte ranges index the identity body, so partial and If-Range handling stays upstream
+            return super().file_response(full_path, stat_result, scope, status_code)
+        asset = self._asset(str(full_path), stat_result)
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next(
+            (e for e in ("br", "gzip") if e in asset.bodies and e in accepted),
+            "identity"
+        )
+        # Each encoding is a different representation, so it gets its own strong ETag
+        etag = f'"{asset.hash}"' if encoding == "identity" else f'"{asset.hash}-{encoding}"'
+        immutable = request.query_params.get("v") == asset.hash
+        headers = {
+            "ETag": etag,
+            "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+            "Vary": "Accept-Encoding"
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if status_code == 200 and etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=asset.bodies[encoding],
+            status_code=status_code,
+            media_type=asset.media_type,
+            headers=headers
+        )
@@ -0,0 +1,93 @@
+# app/core/logging.py
+from typing import List, Optional, Tuple
+from contextvars import ContextVar
+import logging
+import time
+import uuid
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .metrics import HTTP_REQUEST_SECONDS
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+# (stage, milliseconds) spans recorded while handling the current request
+_spans_var: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("spans", default=None)
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+logger = logging.getLogger(__name__)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request ID to every log record as `request_id`."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+def setup_logging(level: str = "INFO") -> None:
+    """Log to stderr with the request ID in every line."""
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper())
+
+
+def record_span(stage: str, elapsed_ms: float) -> None:
+    """Attach a timed stage to the current request, if there is one."""
+    spans = _spans_var.get()
+    if spans is not None:
+        spans.append((stage, elapsed_ms))
+
+
+class RequestContextMiddleware:
+    """
+    Assigns each HTTP request an ID, times it, and logs one summary line.
+
+    The ID comes from an incoming X-Request-ID header or is generated, is
+    returned in the response's X-Request-ID header, and is available to
+    every log line written while the request is handled. The summary line
+    lists the pipeline stage spans recorded during the request, and the
+    request latency is observed in the http_request_duration_seconds
+    histogram under its route template (not the raw path, which would
+    explode the label cardinality).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        request_id = headers.get(b"x-request-id", b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        id_token = request_id_var.set(request_id)
+        spans_token = _spans_var.set([])
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=scope["method"], route=route_path, status=status[0])
+            spans = _spans_var.get()
+            if spans:
+                logger.info(
+                    f"{scope['method']} {scope['path']} {status[0]} {elapsed * 1000:.1f}ms "
+                    + " ".join(f"{stage}={ms:.1f}ms" for stage, ms in spans)
+                )
+            _spans_var.reset(spans_token)
+            request_id_var.reset(id_token)
@@ -1,31 +1,105 @@
 # backend/app/main.py
 from fastapi import FastAPI, HTTPException, Request, Depends
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 from pathlib import Path
+import asyncio
 import os
+import json
+import logging
 from typing import Dict
 from dotenv import load_dotenv
 
-from .models.schemas import Question, Answer
+from .models.schemas import Question, QuestionBatch, Answer, IndexRequest
 from .core.config import settings  
-from .services.rag import RAGPipeline
+from .services.catalog import Catalog
+from .services.pipeline_loader import PipelineLoader
+from .services.index_jobs import IndexJob, IndexJobQueue
+from .services.quiz import QuestionBank
+from .api.deps import get_rag_pipeline, get_catalog
+from .api.endpoints import quiz, tutor
+from .core.http_cache import PrecompressedStaticFiles, cached_response
+from .core.logging import setup_logging, RequestContextMiddleware
+from .core.metrics import REGISTRY
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Initialize RAG pipeline configuration
 rag_config = {
     "pinecone_api_key": os.getenv("PINECONE_API_KEY"),
     "pinecone_environment": os.getenv("PINECONE_ENVIRONMENT"),
     "pinecone_index_name": os.getenv("PINECONE_INDEX_NAME"),
     "openai_api_key": os.getenv("OPENAI_API_KEY"),
-    "groq_api_key": os.getenv("GROQ_API_KEY")
+    "groq_api_key": os.getenv("GROQ_API_KEY"),
+    "vector_backend": os.getenv("VECTOR_BACKEND", "pinecone"),
+    "vector_index_path": os.getenv("VECTOR_INDEX_PATH", str(Path(settings.PROJECT_ROOT) / "data" / "index")),
+    "retrieval_mode": os.getenv("RETRIEVAL_MODE", "dense"),
+    "lexical_index_path": os.getenv("LEXICAL_INDEX_PATH", str(Path(settings.PROJECT_ROOT) / "data" / "index" / "lexical")),
+    "chunk_store_path": os.getenv("CHUNK_STORE_PATH", str(Path(settings.PROJECT_ROOT) / "data" / "index" / "chunks")),
+    "vector_store_pool_size": int(os.getenv("VECTOR_STORE_POOL_SIZE", "8")),
+    "index_manifest_path": os.getenv("INDEX_MANIFEST_PATH", str(Path(settings.PROJECT_ROOT) / "data" / "index" / "manifest.json")),
+    "embedding_cache_path": os.getenv("EMBEDDING_CACHE_PATH", str(Path(settings.PROJECT_ROOT) / "data" / "cache" / "embeddings.sqlite")),
+    "embedding_batch_size": int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+    "embedding_batch_wait_ms": float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5")),
+    # Admin index jobs embed on their own, smaller limiter than questions
+    "index_embedding_concurrency": settings.INDEX_EMBEDDING_CONCURRENCY,
+    "answer_cache_size": int(os.getenv("ANSWER_CACHE_SIZE", "1024")),
+    "answer_cache_ttl": float(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600))),
+    "answer_cache_threshold": float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+    "context_max_tokens": int(os.getenv("CONTEXT_MAX_TOKENS", "1500")),
+    "session_max_count": int(os.getenv("SESSION_MAX_COUNT", "1000")),
+    "session_ttl": float(os.getenv("SESSION_TTL", "3600")),
+    "session_history_tokens": int(os.getenv("SESSION_HISTORY_TOKENS", "600")),
+    "session_reuse_threshold": float(os.getenv("SESSION_REUSE_THRESHOLD", "0.7")),
+    "session_follow_up_threshold": float(os.getenv("SESSION_FOLLOW_UP_THRESHOLD", "0.3")),
+    "reranker": os.getenv("RERANKER", "none"),
+    "rerank_candidates": int(os.getenv("RERANK_CANDIDATES", "50")),
+    "llm_provider": os.getenv("LLM_PROVIDER", "auto"),
+    "llm_hedge": os.getenv("LLM_HEDGE", "true").lower() == "true"
 }
 
-app = FastAPI(title="Tailor Tutor API")
+setup_logging(settings.LOG_LEVEL)
+
+# The RAG pipeline is built in the background once the server starts, so
+# importing the app stays fast and works without network access
+pipeline_loader = PipelineLoader(
+    rag_config,
+    retry_delay=settings.PIPELINE_RETRY_DELAY,
+    max_retry_delay=settings.PIPELINE_MAX_RETRY_DELAY
+)
+
+async def run_index_job(job: IndexJob) -> Dict:
+    # Queued jobs wait for the pipeline for as long as it takes to start
+    pipeline = await pipeline_loader.get()
+    return await pipeline.index_directory(
+        Path(job.directory),
+        incremental=job.incremental,
+        embed_workers=settings.INDEX_EMBED_WORKERS,
+        process_workers=settings.INDEX_PROCESS_WORKERS,
+        progress=job.progress
+    )
+
+# Indexing runs in the background, a few jobs at a time with few workers
+# each, so it does not slow down answering questions
+index_jobs = IndexJobQueue(run_index_job, max_running=settings.INDEX_MAX_JOBS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.pipeline_loader = pipeline_loader
+    pipeline_loader.start()
+    yield
+    await index_jobs.close()
+    await pipeline_loader.close()
+
+app = FastAPI(title="Tailor Tutor API", lifespan=lifespan)
+
+# Request IDs in the logs and per-route latency histograms
+app.add_middleware(RequestContextMiddleware)
 
 # CORS middleware
 app.add_middleware(
@@ -39,65 +113,29 @@ app.add_middleware(
 # Get the absolute path to the frontend directory
 FRONTEND_DIR = Path(__file__).parent.parent.parent / "frontend"
 
-# Initialize RAG pipeline
-rag_pipeline = RAGPipeline(rag_config)
-
-# Dependency to get RAG pipeline instance
-async def get_rag_pipeline():
-    return rag_pipeline
-
 # Mount static files
-app.mount("/static", StaticFiles(directory=str(FRONTEND_DIR / "static")), name="static")
+static_files = PrecompressedStaticFiles(directory=str(FRONTEND_DIR / "static"))
+app.mount("/static", static_files, name="static")
 
 # Templates
 templates = Jinja2Templates(directory=str(FRONTEND_DIR / "templates"))
+# Content-hashed asset URLs, so browsers can cache them as immutable
+templates.env.globals["asset_url"] = lambda path: static_files.asset_url("/static", path)
 
-# Sample data - This should eventually move to a database or separate data file
-subjects_data = {
-    "science": {
-        "id": "science",
-        "name": "Science",
-        "grade": "Class 10",
-        "chapters": [
-            {
-                "id": "ch1",
-                "title": "Chemical Reactions",
-                "description": "Learn about different types of chemical reactions",
-                "topics": [
-                    {
-                        "id": "topic1",
-                        "title": "Introduction to Chemical Reactions",
-                        "content": "A chemical reaction is a process that leads to the chemical transformation of one set of chemical substances to another."
-                    },
-                    {
-                        "id": "topic2",
-                        "title": "Types of Chemical Reactions",
-                        "content": "Chemical reactions can be classified into several types including combination, decomposition, displacement, and double displacement."
-                    }
-                ]
-            }
-        ]
-    },
-    "social": {
-        "id": "social",
-        "name": "Social Science",
-        "grade": "Class 10",
-        "chapters": [
-            {
-                "id": "ch2",
-                "title": "Indian National Movement",
-                "description": "Study the history of Indian independence movement",
-                "topics": [
-                    {
-                        "id": "topic3",
-                        "title": "Early Nationalist Movements",
-                        "content": "The early nationalist movements in India laid the foundation for the independence struggle."
-                    }
-                ]
-            }
-        ]
-    }
-}
+# Curriculum catalog, loaded from data/catalog and reloaded when the files change
+catalog = Catalog(Path(settings.CATALOG_DIR), check_interval=settings.CATALOG_CHECK_INTERVAL)
+
+# Pre-generated quiz questions, served by the quiz router
+question_bank = QuestionBank(Path(settings.QUIZ_BANK_DIR))
+
+# Shared with the routers through app.state (see app/api/deps.py)
+app.state.catalog = catalog
+app.state.question_bank = question_bank
+app.include_router(quiz.router)
+app.include_router(tutor.router)
+
+# Background question bank generation, one build at a time
+quiz_build: Dict = {"task": None, "result": None, "error": None}
 
 # Frontend routes
 @app.get("/", response_class=HTMLResponse)
@@ -109,13 +147,14 @@ async def read_subjects(request: Request):
     return templates.TemplateResponse("subjects.html", {"request": request})
 
 @app.get("/chapters/{subject_id}", response_class=HTMLResponse)
-async def read_chapters(request: Request, subject_id: str):
-    if subject_id not in subjects_data:
+async def read_chapters(request: Request, subject_id: str, catalog: Catalog = Depends(get_catalog)):
+    subject = catalog.get_subject(subject_id)
+    if subject is None:
         raise HTTPException(status_code=404, detail="Subject not found")
     return templates.TemplateResponse("chapters.html", {
         "request": request,
         "subject_id": subject_id,
-        "subject_name": subjects_data[subject_id]["name"]
+        "subject_name": subject.name
     })
 
 @app.get("/chapter/{chapter_id}", response_class=HTMLResponse)
@@ -131,46 +170,51 @@ async def read_quiz(request: Request):
     return templates.TemplateResponse("quiz.html", {"request": request})
 
 # API routes
+# Catalog responses are pre-serialized JSON bytes cached per catalog version,
+# sent with an ETag so repeat requests are answered with 304
 @app.get("/api/subjects")
-async def get_subjects():
-    return [
-        {"id": subject_id, "name": data["name"], "grade": data["grade"]}
-        for subject_id, data in subjects_data.items()
-    ]
+async def get_subjects(request: Request, catalog: Catalog = Depends(get_catalog)):
+    return cached_response(request, catalog.subjects_json(), catalog.version, settings.CATALOG_MAX_AGE)
 
 @app.get("/api/chapters/{subject_id}")
-async def get_chapters(subject_id: str):
-    if subject_id not in subjects_data:
+async def get_chapters(request: Request, subject_id: str, catalog: Catalog = Depends(get_catalog)):
+    body = catalog.chapters_json(subject_id)
+    if body is None:
         raise HTTPException(status_code=404, detail="Subject not found")
-    return subjects_data[subject_id]["chapters"]
+    return cached_response(request, body, catalog.version, settings.CATALOG_MAX_AGE)
 
 @app.get("/api/chapter/{chapter_id}")
-async def get_chapter(chapter_id: str):
-    for subject in subjects_data.values():
-        for chapter in subject["chapters"]:
-            if chapter["id"] == chapter_id:
-                return chapter
-    raise HTTPException(status_code=404, detail="Chapter not found")
+async def get_chapter(request: Request, chapter_id: str, catalog: Catalog = Depends(get_catalog)):
+    body = catalog.chapter_json(chapter_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Chapter not found")
+    return cached_response(request, body, catalog.version, settings.CATALOG_MAX_AGE)
 
 @app.get("/api/topic/{topic_id}")
-async def get_topic(topic_id: str):
-    for subject in subjects_data.values():
-        for chapter in subject["chapters"]:
-            for topic in chapter["topics"]:
-                if topic["id"] == topic_id:
-                    return topic
-    raise HTTPException(status_code=404, detail="Topic not found")
+async def get_topic(request: Request, topic_id: str, catalog: Catalog = Depends(get_catalog)):
+    body = catalog.topic_json(topic_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Topic not found")
+    return cached_response(request, body, catalog.version, settings.CATALOG_MAX_AGE)
+
+@app.post("/api/admin/catalog/reload")
+async def reload_catalog():
+    if not catalog.reload():
+        raise HTTPException(status_code=500, detail="Catalog failed to load; previous version kept")
+    return {"version": catalog.version}
 
 
 # Modified /api/tutor/ask endpoint to use RAG pipeline
 @app.post("/api/tutor/ask")
 async def ask_question(
     question: Question,
-    pipeline: RAGPipeline = Depends(get_rag_pipeline)
+    pipeline = Depends(get_rag_pipeline),
+    catalog: Catalog = Depends(get_catalog)
 ):
     try:
-        # Process question through RAG pipeline
-        result = await pipeline.answer_question(question.question)
+        # Process question through RAG pipeline, searching only the chapter it was asked from
+        scope = catalog.retrieval_scope(question.context)
+        result = await pipeline.answer_question(question.question, scope=scope)
         
         return Answer(
             answer=result["answer"],
@@ -182,3 +226,151 @@ async def ask_question(
             detail=f"Error processing question: {str(e)}"
         )
 
+@app.post("/api/tutor/ask/stream")
+async def ask_question_stream(
+    question: Question,
+    pipeline = Depends(get_rag_pipeline),
+    catalog: Catalog = Depends(get_catalog)
+):
+    """Stream the answer as newline-delimited JSON events: sources first, then tokens."""
+    scope = catalog.retrieval_scope(question.context)
+
+    async def event_stream():
+        try:
+            async for event in pipeline.stream_answer(question.question, scope=scope):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming answer: {e}")
+            yield json.dumps({"type": "error", "detail": f"Error processing question: {str(e)}"}) + "\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/tutor/ask/batch")
+async def ask_question_batch(
+    batch: QuestionBatch,
+    pipeline = Depends(get_rag_pipeline)
+):
+    """
+    Answer a list of questions, streamed as newline-delimited JSON.
+
+    Each line carries the question's index in the request so results can
+    be matched up as they arrive out of order.
+    """
+    async def result_stream():
+        try:
+            async for index, result in pipeline.answer_batch(batch.questions):
+                yield json.dumps({"index": index, "question": batch.questions[index], **result}) + "\n"
+        except Exception as e:
+            logger.error(f"Error answering question batch: {e}")
+            yield json.dumps({"error": f"Error processing questions: {str(e)}"}) + "\n"
+
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+@app.get("/health/live")
+async def liveness():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def readiness():
+    """200 once the RAG pipeline is built and warmed up, 503 while it is loading or if it failed."""
+    # An unready worker gets no questions, so the probe is what retries a
+    # failed start once its cooldown has passed
+    pipeline_loader.start()
+    status = pipeline_loader.status()
+    return JSONResponse(status, status_code=200 if pipeline_loader.ready else 503)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: request and pipeline stage histograms, cache and token counters."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+async def run_quiz_build(pipeline, force: bool) -> None:
+    # Imported here: the generator pulls in langchain
+    from .services.quiz.builder import QuizBankBuilder
+    from .services.quiz.generator import QuizGenerator
+
+    builder = QuizBankBuilder(
+        question_bank,
+        QuizGenerator(pipeline.answer_generator.llm),
+        workers=settings.QUIZ_WORKERS
+    )
+    try:
+        quiz_build["result"] = await builder.build_all(Path(settings.RAW_DATA_DIR), force=force)
+        quiz_build["error"] = None
+    except Exception as e:
+        logger.error(f"Error building question banks: {e}")
+        quiz_build["error"] = str(e)
+
+@app.post("/api/admin/quiz/generate", status_code=202)
+async def generate_question_banks(force: bool = False, pipeline = Depends(get_rag_pipeline)):
+    """Regenerate, in the background, the question banks of chapters whose text changed (all with force)."""
+    task = quiz_build["task"]
+    if task is not None and not task.done():
+        raise HTTPException(status_code=409, detail="A question bank build is already running")
+    quiz_build["task"] = asyncio.create_task(run_quiz_build(pipeline, force))
+    return {"status": "started"}
+
+@app.get("/api/admin/quiz")
+async def get_question_bank_status():
+    task = quiz_build["task"]
+    return {
+        "bank": question_bank.stats(),
+        "running": task is not None and not task.done(),
+        "last_result": quiz_build["result"],
+        "last_error": quiz_build["error"],
+    }
+
+@app.post("/api/admin/index", status_code=202)
+async def start_index_job(request: IndexRequest):
+    """Index a book directory under RAW_DATA_DIR in the background, returning the job to poll."""
+    raw_dir = Path(settings.RAW_DATA_DIR).resolve()
+    directory = (raw_dir / request.book).resolve()
+    if directory.parent != raw_dir or not directory.is_dir():
+        raise HTTPException(status_code=400, detail=f"No book directory named {request.book}")
+    if index_jobs.active(str(directory)) is not None:
+        raise HTTPException(status_code=409, detail=f"{request.book} is already being indexed")
+    return index_jobs.submit(str(directory), incremental=not request.full).to_dict()
+
+@app.get("/api/admin/index/jobs")
+async def list_index_jobs():
+    return [job.to_dict() for job in index_jobs.jobs()]
+
+@app.get("/api/admin/index/jobs/{job_id}")
+async def get_index_job(job_id: str):
+    job = index_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Index job not found")
+    return job.to_dict()
+
+@app.delete("/api/admin/index/jobs/{job_id}")
+async def cancel_index_job(job_id: str):
+    """Cancel a queued or running job; documents already committed stay indexed."""
+    if not index_jobs.cancel(job_id):
+        raise HTTPException(status_code=404, detail="No queued or running index job with this ID")
+    job = index_jobs.get(job_id)
+    await asyncio.gather(job.task, return_exceptions=True)
+    return job.to_dict()
+
+@app.post("/api/admin/index/jobs/{job_id}/resume", status_code=202)
+async def resume_index_job(job_id: str):
+    """Continue a cancelled or failed job from the last document it committed."""
+    job = index_jobs.get(job_id)
+    if job is not None and index_jobs.active(job.directory) is not None:
+        raise HTTPException(status_code=409, detail="This directory is already being indexed")
+    resumed = index_jobs.resume(job_id)
+    if resumed is None:
+        raise HTTPException(status_code=404, detail="No cancelled or failed index job with this ID")
+    return resumed.to_dict()
+
+@app.get("/api/admin/cache")
+async def get_cache_stats(pipeline = Depends(get_rag_pipeline)):
+    return pipeline.answer_cache.stats()
+
+@app.get("/api/admin/stats")
+async def get_pipeline_stats(pipeline = Depends(get_rag_pipeline)):
+    return pipeline.stats()
+
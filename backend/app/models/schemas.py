@@ -1,15 +1,36 @@
 # backend/app/models/schemas.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict
 
 class Question(BaseModel):
     question: str
     context: Optional[Dict] = None
 
+class QuestionBatch(BaseModel):
+    questions: List[str] = Field(..., min_length=1, max_length=1000)
+
 class Answer(BaseModel):
     answer: str
     sources: List[str] = []
 
+class SessionStart(BaseModel):
+    # Same shape as Question.context; restricts the session's retrieval to a chapter
+    context: Optional[Dict] = None
+
+class SessionQuestion(BaseModel):
+    question: str
+
+class SessionAnswer(Answer):
+    session_id: str
+    # The previous turn's contexts answered this follow-up, without a new search
+    reused_context: bool = False
+
+class IndexRequest(BaseModel):
+    # Directory of the book under RAW_DATA_DIR, e.g. "class_10_science"
+    book: str
+    # Wipe the index first instead of applying only what changed
+    full: bool = False
+
 class Topic(BaseModel):
     id: str
     title: str
@@ -20,9 +41,13 @@ class Chapter(BaseModel):
     title: str
     description: str
     topics: List[Topic]
+    # Chapter number in the indexed book, used to scope retrieval
+    chapter_number: Optional[int] = None
 
 class Subject(BaseModel):
     id: str
     name: str
     grade: str
-    chapters: List[Chapter]
\ No newline at end of file
+    chapters: List[Chapter]
+    # Directory of the indexed book under data/raw, e.g. "class_10_science"
+    book: Optional[str] = None
\ No newline at end of file
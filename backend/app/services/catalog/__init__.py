@@ -0,0 +1,2 @@
+# app/services/catalog/__init__.py
+from .catalog import Catalog
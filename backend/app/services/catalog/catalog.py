@@ -0,0 +1,220 @@
+# app/services/catalog/catalog.py
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+import threading
+import time
+from ...models.schemas import Subject, Chapter, Topic
+
+logger = logging.getLogger(__name__)
+
+
+class _CatalogIndex:
+    """Immutable id -> object indexes and parent -> children adjacency for one catalog version."""
+
+    def __init__(self, subjects: List[Subject], version: str):
+        self.version = version
+        self.subjects: Dict[str, Subject] = {}
+        self.chapters: Dict[str, Chapter] = {}
+        self.topics: Dict[str, Topic] = {}
+        self.chapter_subject: Dict[str, str] = {}
+        self.topic_chapter: Dict[str, str] = {}
+        self.subject_chapters: Dict[str, List[str]] = {}
+        self.chapter_topics: Dict[str, List[str]] = {}
+        # Serialized responses, filled on first use
+        self.json_cache: Dict[Tuple[str, str], bytes] = {}
+
+        for subject in subjects:
+            self._add(self.subjects, subject.id, subject, "subject")
+            self.subject_chapters[subject.id] = []
+            for chapter in subject.chapters:
+                self._add(self.chapters, chapter.id, chapter, "chapter")
+                self.chapter_subject[chapter.id] = subject.id
+                self.subject_chapters[subject.id].append(chapter.id)
+                self.chapter_topics[chapter.id] = []
+                for topic in chapter.topics:
+                    self._add(self.topics, topic.id, topic, "topic")
+                    self.topic_chapter[topic.id] = chapter.id
+                    self.chapter_topics[chapter.id].append(topic.id)
+
+    @staticmethod
+    def _add(index: Dict, key: str, value, kind: str) -> None:
+        if key in index:
+            raise ValueError(f"Duplicate {kind} id in catalog: {key}")
+        index[key] = value
+
+
+class Catalog:
+    """
+    Curriculum catalog loaded from JSON files on disk.
+
+    Every `*.json` file in the catalog directory holds one subject (or a
+    list of subjects) in the `Subject` schema. Lookups by id are dictionary
+    hits, list responses are serialized once per catalog version, and the
+    files are re-read when they change on disk without restarting the app.
+    """
+
+    def __init__(self, directory: Path, check_interval: float = 2.0):
+        """
+        Args:
+            directory: Directory containing the catalog JSON files
+            check_interval: Minimum seconds between checks for changed files
+        """
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._signature = None
+        self._last_check = 0.0
+        self._index = _CatalogIndex([], version="empty")
+        self.reload()
+
+    @property
+    def version(self) -> str:
+        """Content hash of the loaded catalog files."""
+        return self._index.version
+
+    def _files(self) -> List[Path]:
+        return sorted(self.directory.glob("*.json"))
+
+    def _file_signature(self) -> Tuple:
+        return tuple((f.name, f.stat().st_mtime_ns, f.stat().st_size) for f in self._files())
+
+    def reload(self) -> bool:
+        """
+        Re-read the catalog files and swap in new indexes.
+
+        Returns:
+            True if a new catalog was loaded. A catalog that fails to load
+            is logged and the previous version keeps serving.
+        """
+        with self._lock:
+            try:
+                signature = self._file_signature()
+                digest = hashlib.sha256()
+                subjects = []
+                for file_path in self._files():
+                    raw = file_path.read_bytes()
+                    digest.update(file_path.name.encode("utf-8") + b"\0" + raw)
+                    data = json.loads(raw)
+                    items = data if isinstance(data, list) else [data]
+                    subjects.extend(Subject.model_validate(item) for item in items)
+                index = _CatalogIndex(subjects, version=digest.hexdigest()[:16])
+            except Exception as e:
+                logger.error(f"Error loading catalog from {self.directory}: {e}")
+                return False
+            self._index = index
+            self._signature = signature
+            self._last_check = time.monotonic()
+            logger.info(f"Loaded catalog version {index.version} with {len(index.topics)} topics")
+            return True
+
+    def maybe_reload(self) -> None:
+        """Reload if the catalog files changed, checking at most every `check_interval` seconds."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        try:
+            changed = self._file_signature() != self._signature
+        except OSError:
+            changed = True
+        if changed:
+            self.reload()
+
+    def get_subject(self, subject_id: str) -> Optional[Subject]:
+        return self._index.subjects.get(subject_id)
+
+    def get_chapter(self, chapter_id: str) -> Optional[Chapter]:
+        return self._index.chapters.get(chapter_id)
+
+    def get_topic(self, topic_id: str) -> Optional[Topic]:
+        return self._index.topics.get(topic_id)
+
+    def subject_of_chapter(self, chapter_id: str) -> Optional[Subject]:
+        subject_id = self._index.chapter_subject.get(chapter_id)
+        return self._index.subjects.get(subject_id) if subject_id else None
+
+    def chapter_of_topic(self, topic_id: str) -> Optional[Chapter]:
+        chapter_id = self._index.topic_chapter.get(topic_id)
+        return self._index.chapters.get(chapter_id) if chapter_id else None
+
+    def retrieval_scope(self, context: Optional[Dict]) -> Optional[Dict]:
+        """
+        Translate a question's context into a retrieval scope.
+
+        The context comes from the frontend with any of `subjectId`,
+        `chapterId` and `topicId`. A topic narrows to its chapter, since
+        chunks are only tagged by book and chapter.
+
+        Args:
+            context: The `context` of a Question
+
+        Returns:
+            Chunk metadata to filter on, e.g. {"book": "class_10_science",
+            "chapter": 1}, or None when the context does not map to an
+            indexed book
+        """
+        if not context:
+            return None
+        index = self._index
+        chapter_id = context.get("chapterId")
+        if chapter_id is None and context.get("topicId") is not None:
+            chapter_id = index.topic_chapter.get(context["topicId"])
+        subject_id = context.get("subjectId") or index.chapter_subject.get(chapter_id)
+        subject = index.subjects.get(subject_id)
+        if subject is None or not subject.book:
+            return None
+
+        scope = {"book": subject.book}
+        chapter = index.chapters.get(chapter_id)
+        if (
+            chapter is not None
+            and chapter.chapter_number is not None
+            and index.chapter_subject.get(chapter.id) == subject.id
+        ):
+            scope["chapter"] = chapter.chapter_number
+        return scope
+
+    def chapters_of(self, subject_id: str) -> List[Chapter]:
+        index = self._index
+        return [index.chapters[c] for c in index.subject_chapters.get(subject_id, [])]
+
+    def subjects_json(self) -> bytes:
+        """Serialized subject list (without chapters)."""
+        index = self._index
+        return self._cached_json(index, ("subjects", ""), lambda: [
+            {"id": s.id, "name": s.name, "grade": s.grade} for s in index.subjects.values()
+        ])
+
+    def chapters_json(self, subject_id: str) -> Optional[bytes]:
+        """Serialized chapters of a subject, or None for an unknown subject."""
+        index = self._index
+        if subject_id not in index.subjects:
+            return None
+        return self._cached_json(index, ("chapters", subject_id), lambda: [
+            index.chapters[c].model_dump() for c in index.subject_chapters[subject_id]
+        ])
+
+    def chapter_json(self, chapter_id: str) -> Optional[bytes]:
+        index = self._index
+        chapter = index.chapters.get(chapter_id)
+        if chapter is None:
+            return None
+        return self._cached_json(index, ("chapter", chapter_id), chapter.model_dump)
+
+    def topic_json(self, topic_id: str) -> Optional[bytes]:
+        index = self._index
+        topic = index.topics.get(topic_id)
+        if topic is None:
+            return None
+        return self._cached_json(index, ("topic", topic_id), topic.model_dump)
+
+    @staticmethod
+    def _cached_json(index: _CatalogIndex, key: Tuple[str, str], build) -> bytes:
+        body = index.json_cache.get(key)
+        if body is None:
+            body = json.dumps(build(), separators=(",", ":")).encode("utf-8")
+            index.json_cache[key] = body
+        return body
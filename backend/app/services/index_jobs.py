@@ -0,0 +1,166 @@
+# app/services/index_jobs.py
+from typing import Awaitable, Callable, Dict, List, Optional
+from collections import OrderedDict
+import asyncio
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class IndexJob:
+    """One indexing run of a book directory, and how far it has got."""
+
+    def __init__(self, directory: str, incremental: bool, resumes: Optional[str] = None):
+        self.id = secrets.token_hex(8)
+        self.directory = directory
+        self.incremental = incremental
+        # ID of the cancelled or failed job this one picks up from
+        self.resumes = resumes
+        self.state = "queued"  # queued -> running -> completed, failed or cancelled
+        # Filled in by RAGPipeline.index_directory as the run advances
+        self.progress: Dict = {}
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in ("completed", "failed", "cancelled")
+
+    def eta_seconds(self) -> Optional[float]:
+        """Remaining time at the rate files have been committed so far."""
+        files, files_done = self.progress.get("files"), self.progress.get("files_done")
+        if self.state != "running" or not files or not files_done:
+            return None
+        elapsed = time.time() - self.started
+        return elapsed / files_done * (files - files_done)
+
+    def to_dict(self) -> Dict:
+        eta = self.eta_seconds()
+        return {
+            "job_id": self.id,
+            "directory": self.directory,
+            "incremental": self.incremental,
+            "resumes": self.resumes,
+            "state": self.state,
+            "progress": dict(self.progress),
+            "eta_seconds": None if eta is None else round(eta, 1),
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class IndexJobQueue:
+    """
+    Runs indexing jobs in the background, `max_running` at a time.
+
+    Submitting returns the job at once; the job waits for a free slot and
+    then runs `run(job)` as its own task, off the request that submitted
+    it. Queued and running jobs can be cancelled. Indexing commits one
+    document at a time, so a cancelled or failed job is resumed by an
+    incremental run of the same directory, which skips what was already
+    committed. Finished jobs are kept for inspection, `history` of them
+    at most.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[IndexJob], Awaitable[Dict]],
+        max_running: int = 1,
+        history: int = 50
+    ):
+        """
+        Args:
+            run: Indexes the job's directory, updating `job.progress`, and
+                returns the indexing stats
+            max_running: Jobs indexed at the same time
+            history: Finished jobs remembered
+        """
+        self.run = run
+        self.max_running = max_running
+        self.history = history
+        self._jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def submit(self, directory: str, incremental: bool = True, resumes: Optional[str] = None) -> IndexJob:
+        """Queue a job; must be called from the event loop."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running)
+        job = IndexJob(directory, incremental, resumes)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        self._forget_old_jobs()
+        return job
+
+    def resume(self, job_id: str) -> Optional[IndexJob]:
+        """
+        Continue a cancelled or failed job from its last committed document.
+
+        Returns:
+            The new job, or None if `job_id` is unknown or did not stop early
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.state not in ("cancelled", "failed"):
+            return None
+        return self.submit(job.directory, incremental=True, resumes=job.id)
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        return self._jobs.get(job_id)
+
+    def jobs(self) -> List[IndexJob]:
+        """Every remembered job, newest first."""
+        return list(reversed(self._jobs.values()))
+
+    def active(self, directory: str) -> Optional[IndexJob]:
+        """The queued or running job of a directory, if any."""
+        for job in self._jobs.values():
+            if job.directory == directory and not job.done:
+                return job
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        """Stop a queued or running job; False if it is unknown or already finished."""
+        job = self._jobs.get(job_id)
+        if job is None or job.done:
+            return False
+        job.task.cancel()
+        return True
+
+    async def _run(self, job: IndexJob) -> None:
+        try:
+            async with self._slots:
+                job.state = "running"
+                job.started = time.time()
+                logger.info(f"Index job {job.id} started for {job.directory}")
+                job.result = await self.run(job)
+            job.state = "completed"
+            logger.info(f"Index job {job.id} completed: {job.result}")
+        except asyncio.CancelledError:
+            job.state = "cancelled"
+            logger.info(f"Index job {job.id} cancelled after {job.progress.get('files_done', 0)} files")
+        except Exception as e:
+            job.state = "failed"
+            job.error = str(e)
+            logger.error(f"Error in index job {job.id}: {e}")
+        finally:
+            job.finished = time.time()
+
+    def _forget_old_jobs(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    async def close(self) -> None:
+        """Cancel every unfinished job, e.g. on shutdown."""
+        tasks = [job.task for job in self._jobs.values() if not job.done]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,139 @@
+# app/services/pipeline_loader.py
+from typing import Any, Callable, Dict, Optional
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineUnavailable(RuntimeError):
+    """The RAG pipeline failed to start or is not ready in time."""
+
+
+def build_rag_pipeline(config: Dict) -> Any:
+    # Imported here so importing the app does not pull in langchain and the API clients
+    from .rag import RAGPipeline
+    return RAGPipeline(config)
+
+
+class PipelineLoader:
+    """
+    Builds the RAG pipeline in the background and hands it out once ready.
+
+    `start` schedules the work on the running event loop: the pipeline is
+    constructed on a worker thread (importing langchain and creating the
+    API clients is slow and blocking) and then its connections are warmed
+    up. Requests that need the pipeline wait for it with `get`; everything
+    else is served while it loads. A failed build is reported through
+    `status` and `get` rather than stopping the server, so a worker still
+    boots without network access. It is not final: once a cooldown has
+    passed (doubling with each failure, up to `max_retry_delay`), the next
+    `start` or `get` builds the pipeline again, so a worker recovers from
+    an outage without a restart.
+    """
+
+    def __init__(
+        self,
+        config: Dict,
+        factory: Callable[[Dict], Any] = build_rag_pipeline,
+        retry_delay: float = 5.0,
+        max_retry_delay: float = 300.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            config: RAGPipeline configuration
+            factory: Builds the pipeline from the config, overridable for tests
+            retry_delay: Seconds after a first failure before loading again
+            max_retry_delay: Longest cooldown after repeated failures
+            clock: Time source, overridable for tests
+        """
+        self.config = config
+        self.factory = factory
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._clock = clock
+        self.failures = 0
+        self._retry_at: Optional[float] = None
+        self.state = "idle"  # idle -> loading -> warming -> ready, or failed
+        self.error: Optional[str] = None
+        self.warmup_errors: Dict[str, str] = {}
+        self.pipeline = None
+        self._task: Optional[asyncio.Task] = None
+        self._started: Optional[float] = None
+        self._ready_seconds: Optional[float] = None
+
+    def start(self) -> asyncio.Task:
+        """Start loading in the background, or again once a failed load has cooled down."""
+        if self._task is None or (self.state == "failed" and self._clock() >= self._retry_at):
+            if self._task is not None:
+                logger.info(f"Retrying RAG pipeline start (attempt {self.failures + 1})")
+            self._started = time.perf_counter()
+            self._task = asyncio.ensure_future(self._load())
+        return self._task
+
+    async def _load(self) -> None:
+        try:
+            self.state = "loading"
+            pipeline = await asyncio.to_thread(self.factory, self.config)
+            self.state = "warming"
+            warm_up = getattr(pipeline, "warm_up", None)
+            if warm_up is not None:
+                self.warmup_errors = await warm_up()
+            self.pipeline = pipeline
+            self.state = "ready"
+            self.error = None
+            self._ready_seconds = time.perf_counter() - self._started
+            logger.info(f"RAG pipeline ready in {self._ready_seconds:.2f}s")
+        except Exception as e:
+            self.failures += 1
+            delay = min(self.retry_delay * 2 ** (self.failures - 1), self.max_retry_delay)
+            self._retry_at = self._clock() + delay
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"Error starting RAG pipeline (retrying in {delay:.0f}s): {e}")
+
+    async def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        Return the pipeline, waiting for it to finish loading.
+
+        Args:
+            timeout: Longest wait in seconds (None waits for as long as loading takes)
+
+        Raises:
+            PipelineUnavailable: Loading failed or did not finish within `timeout`
+        """
+        if self.pipeline is not None:
+            return self.pipeline
+        task = self.start()
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            raise PipelineUnavailable(f"RAG pipeline is still {self.state}")
+        if self.pipeline is None:
+            raise PipelineUnavailable(f"RAG pipeline failed to start: {self.error}")
+        return self.pipeline
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def status(self) -> Dict:
+        retry_in = None
+        if self.state == "failed":
+            retry_in = round(max(0.0, self._retry_at - self._clock()), 1)
+        return {
+            "state": self.state,
+            "error": self.error,
+            "failures": self.failures,
+            "retry_in_seconds": retry_in,
+            "warmup_errors": self.warmup_errors,
+            "ready_seconds": None if self._ready_seconds is None else round(self._ready_seconds, 3),
+        }
+
+    async def close(self) -> None:
+        """Stop a load still in progress, e.g. on shutdown."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
@@ -0,0 +1,3 @@
+# app/services/quiz/__init__.py
+# The generator and builder import langchain, so they are imported from their modules when needed
+from .bank import QuestionBank
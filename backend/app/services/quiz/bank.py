@@ -0,0 +1,163 @@
+# app/services/quiz/bank.py
+from typing import List, Dict, Optional
+from pathlib import Path
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QuestionBank:
+    """
+    Pre-generated quiz questions, one gzip-compressed JSON file per chapter.
+
+    Chapters are keyed "<book>/<chapter number>". `index.json` records the
+    content hash each chapter's questions were generated from, so a
+    rebuild can skip chapters whose text did not change. A chapter's
+    questions are read from disk once and then served from memory.
+    Banks written by another process (scripts/generate_quizzes.py) are
+    picked up by `maybe_reload`, which re-reads the index when it changed
+    and forgets the loaded questions of regenerated chapters.
+    """
+
+    def __init__(self, directory: Path, check_interval: float = 2.0):
+        """
+        Args:
+            directory: Where the bank files are stored
+            check_interval: Minimum seconds between checks for a changed index
+        """
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, List[Dict]] = {}
+        self._index: Dict[str, Dict] = {}
+        self._signature = None
+        self._last_check = time.monotonic()
+        self._read_index()
+
+    def _index_signature(self):
+        try:
+            stat = (self.directory / "index.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_index(self) -> None:
+        signature = self._index_signature()
+        index = {}
+        if signature is not None:
+            with open(self.directory / "index.json") as f:
+                index = json.load(f)
+        with self._lock:
+            for key in list(self._loaded):
+                if index.get(key) != self._index.get(key):
+                    del self._loaded[key]
+            self._index = index
+            self._signature = signature
+
+    def maybe_reload(self) -> None:
+        """Re-read the index if another process changed it, checking at most every `check_interval` seconds."""
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        if self._index_signature() == self._signature:
+            return
+        try:
+            self._read_index()
+            logger.info(f"Reloaded question bank index with {len(self._index)} chapters")
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reloading question bank index: {e}")
+
+    @staticmethod
+    def key(book: str, chapter: int) -> str:
+        return f"{book}/{chapter}"
+
+    def _file(self, key: str) -> Path:
+        book, chapter = key.rsplit("/", 1)
+        return self.directory / book / f"chapter_{int(chapter):02d}.json.gz"
+
+    def content_hash(self, key: str) -> Optional[str]:
+        """Hash of the content the stored questions were generated from."""
+        entry = self._index.get(key)
+        return entry["hash"] if entry else None
+
+    def keys(self) -> List[str]:
+        return sorted(self._index)
+
+    def put(self, key: str, content_hash: str, questions: List[Dict]) -> None:
+        """Store a chapter's questions, replacing the previous ones."""
+        path = self._file(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(questions, f, separators=(",", ":"))
+        tmp_path.replace(path)
+        with self._lock:
+            self._loaded[key] = questions
+            self._index[key] = {"hash": content_hash, "count": len(questions), "generated": time.time()}
+            self._save_index()
+
+    def _save_index(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / "index.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        tmp_path.replace(self.directory / "index.json")
+        # Our own write is not a change to pick up
+        self._signature = self._index_signature()
+
+    def questions(self, key: str) -> List[Dict]:
+        """Every stored question of a chapter (empty if none were generated)."""
+        questions = self._loaded.get(key)
+        if questions is None:
+            if key not in self._index:
+                return []
+            try:
+                with gzip.open(self._file(key), "rt", encoding="utf-8") as f:
+                    questions = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error reading question bank {key}: {e}")
+                return []
+            self._loaded[key] = questions
+        return questions
+
+    def quiz(self, key: str, count: int = 10, seed: Optional[int] = None) -> List[Dict]:
+        """
+        Draw a randomized quiz from a chapter's bank.
+
+        Questions are sampled without replacement and their options are
+        shuffled, with 'answer' pointing at the correct option's new
+        position.
+
+        Args:
+            key: Chapter key
+            count: Number of questions (fewer if the bank is smaller)
+            seed: Makes the quiz reproducible, e.g. to re-display it
+
+        Returns:
+            Quiz questions
+        """
+        rng = random.Random(seed)
+        bank = self.questions(key)
+        quiz = []
+        for question in rng.sample(bank, min(count, len(bank))):
+            order = list(range(len(question["options"])))
+            rng.shuffle(order)
+            quiz.append({
+                **question,
+                "options": [question["options"][i] for i in order],
+                "answer": order.index(question["answer"]),
+            })
+        return quiz
+
+    def stats(self) -> Dict:
+        return {
+            "chapters": len(self._index),
+            "questions": sum(entry["count"] for entry in self._index.values()),
+            "loaded": len(self._loaded),
+        }
@@ -0,0 +1,116 @@
+# app/services/quiz/builder.py
+from typing import Dict, Optional
+from pathlib import Path
+import asyncio
+import hashlib
+import logging
+from ..rag.text_processor import TextProcessor
+from ..rag.manifest import stable_chunk_id
+from .bank import QuestionBank
+from .generator import QuizGenerator
+
+logger = logging.getLogger(__name__)
+
+
+class QuizBankBuilder:
+    """
+    Regenerates the question banks of chapters whose text changed.
+
+    Chapter files are split exactly as for indexing, and each chapter's
+    content hash is derived from its chunk IDs (which hash the chunk text)
+    plus the generator settings. Chapters whose hash matches the bank are
+    skipped; the rest go onto a queue drained by `workers` concurrent
+    generation tasks, and each chapter is written to the bank as soon as
+    it is done.
+    """
+
+    def __init__(
+        self,
+        bank: QuestionBank,
+        generator: QuizGenerator,
+        text_processor: Optional[TextProcessor] = None,
+        workers: int = 4
+    ):
+        """
+        Args:
+            bank: Where the questions are stored
+            generator: Writes the questions of one chapter
+            text_processor: Splits chapter files (defaults to the indexing settings)
+            workers: Chapters generated concurrently
+        """
+        self.bank = bank
+        self.generator = generator
+        self.text_processor = text_processor or TextProcessor()
+        self.workers = workers
+
+    def chapter_hash(self, chunks) -> str:
+        digest = hashlib.sha256(self.generator.settings_key.encode("utf-8"))
+        for chunk in chunks:
+            digest.update(chunk["id"].encode("utf-8"))
+        return digest.hexdigest()[:16]
+
+    async def build(self, directory: Path, force: bool = False) -> Dict:
+        """
+        Bring the question banks of one book up to date.
+
+        Args:
+            directory: Book directory of chapter_NN.txt files
+            force: Regenerate every chapter, changed or not
+
+        Returns:
+            Dict with the number of generated, unchanged and failed chapters
+        """
+        stats = {"generated": 0, "unchanged": 0, "failed": 0, "questions": 0}
+        queue = asyncio.Queue(maxsize=2 * self.workers)
+
+        async def produce():
+            async for chunks in self.text_processor.iter_directory(directory):
+                if not chunks:
+                    continue
+                document = f"{directory.name}/{chunks[0]['source']}"
+                for chunk in chunks:
+                    chunk["id"] = stable_chunk_id(document, chunk["text"])
+                key = self.bank.key(directory.name, chunks[0]["chapter"])
+                content_hash = self.chapter_hash(chunks)
+                if not force and self.bank.content_hash(key) == content_hash:
+                    stats["unchanged"] += 1
+                    continue
+                await queue.put((key, content_hash, chunks))
+            for _ in range(self.workers):
+                await queue.put(None)
+
+        async def work():
+            while (item := await queue.get()) is not None:
+                key, content_hash, chunks = item
+                try:
+                    questions = await self.generator.generate_chapter(chunks, chapter=chunks[0]["chapter"])
+                    if not questions:
+                        # Storing an empty bank under the current hash would skip the chapter from now on
+                        raise ValueError("no well-formed questions in the LLM replies")
+                    await asyncio.to_thread(self.bank.put, key, content_hash, questions)
+                except Exception as e:
+                    # One chapter failing keeps its old bank; the others carry on
+                    logger.error(f"Error generating question bank for {key}: {e}")
+                    stats["failed"] += 1
+                    continue
+                stats["generated"] += 1
+                stats["questions"] += len(questions)
+                logger.info(f"Generated {len(questions)} questions for {key}")
+
+        tasks = [asyncio.create_task(produce()), *(asyncio.create_task(work()) for _ in range(self.workers))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return stats
+
+    async def build_all(self, root: Path, force: bool = False) -> Dict:
+        """Build the banks of every book directory under `root`, returning the summed stats."""
+        totals = {"generated": 0, "unchanged": 0, "failed": 0, "questions": 0}
+        for directory in sorted(path for path in root.iterdir() if path.is_dir()):
+            for name, value in (await self.build(directory, force)).items():
+                totals[name] += value
+        return totals
@@ -0,0 +1,126 @@
+# app/services/quiz/generator.py
+from typing import List, Dict, Optional
+import hashlib
+import json
+import logging
+import re
+from langchain.prompts import ChatPromptTemplate
+from langchain.schema import StrOutputParser
+
+logger = logging.getLogger(__name__)
+
+QUIZ_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You write multiple-choice quiz questions for school students. "
+               "Every question must be answerable from the given passage alone."),
+    ("user", """
+Passage:
+{passage}
+
+Write {count} multiple-choice questions about the passage. Reply with only a
+JSON array, where each item has "question", "options" (exactly 4 strings),
+"answer" (the index 0-3 of the correct option) and "explanation" (one sentence).
+""")
+])
+
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def parse_questions(text: str) -> List[Dict]:
+    """
+    Extract well-formed questions from an LLM reply.
+
+    The reply may wrap the JSON array in prose or a code fence; malformed
+    items are dropped rather than failing the whole batch.
+    """
+    match = _JSON_ARRAY_RE.search(text)
+    if not match:
+        return []
+    try:
+        items = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return []
+
+    questions = []
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        options = item.get("options")
+        answer = item.get("answer")
+        if (
+            not isinstance(item.get("question"), str)
+            or not isinstance(options, list) or len(options) != 4
+            or not all(isinstance(option, str) for option in options)
+            or not isinstance(answer, int) or not 0 <= answer < 4
+        ):
+            continue
+        questions.append({
+            "question": item["question"].strip(),
+            "options": [option.strip() for option in options],
+            "answer": answer,
+            "explanation": str(item.get("explanation", "")).strip(),
+        })
+    return questions
+
+
+def question_id(question: str) -> str:
+    return hashlib.sha256(question.encode("utf-8")).hexdigest()[:12]
+
+
+class QuizGenerator:
+    """
+    Writes multiple-choice questions for a chapter with an LLM.
+
+    A chapter's questions come from a sample of its chunks spread evenly
+    through the text, with one LLM call per sampled chunk.
+    """
+
+    def __init__(self, llm, questions_per_chunk: int = 3, chunks_per_chapter: int = 8):
+        """
+        Args:
+            llm: LangChain chat model (or any runnable taking a prompt)
+            questions_per_chunk: Questions requested per sampled chunk
+            chunks_per_chapter: Chunks sampled from each chapter
+        """
+        self.chain = QUIZ_PROMPT | llm | StrOutputParser()
+        self.questions_per_chunk = questions_per_chunk
+        self.chunks_per_chapter = chunks_per_chapter
+
+    @property
+    def settings_key(self) -> str:
+        """Changes when the generator would produce a different bank for the same text."""
+        return f"q{self.questions_per_chunk}c{self.chunks_per_chapter}"
+
+    def sample_chunks(self, chunks: List[Dict]) -> List[Dict]:
+        if len(chunks) <= self.chunks_per_chapter:
+            return list(chunks)
+        step = len(chunks) / self.chunks_per_chapter
+        return [chunks[int(i * step)] for i in range(self.chunks_per_chapter)]
+
+    async def generate_chapter(self, chunks: List[Dict], chapter: Optional[int] = None) -> List[Dict]:
+        """
+        Generate the question bank of one chapter.
+
+        Args:
+            chunks: The chapter's chunks, in order, with 'text' and 'id' keys
+            chapter: Chapter number recorded on each question
+
+        Returns:
+            Deduplicated questions, each with 'id', 'question', 'options',
+            'answer', 'explanation', 'chapter' and 'source_chunk' keys
+        """
+        questions = {}
+        for chunk in self.sample_chunks(chunks):
+            try:
+                reply = await self.chain.ainvoke({"passage": chunk["text"], "count": self.questions_per_chunk})
+            except Exception as e:
+                logger.error(f"Error generating quiz questions for chunk {chunk.get('id')}: {e}")
+                raise
+            for question in parse_questions(reply):
+                qid = question_id(question["question"])
+                questions.setdefault(qid, {
+                    "id": qid,
+                    **question,
+                    "chapter": chapter,
+                    "source_chunk": chunk.get("id"),
+                })
+        return list(questions.values())
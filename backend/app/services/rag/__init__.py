@@ -3,8 +3,21 @@ from .text_processor import TextProcessor
 from .embedder import Embedder
 from .vector_store import VectorStore
 from .answer_generator import AnswerGenerator
-from typing import Dict
+from .context_packer import ContextPacker
+from .reranker import create_reranker
+from .timings import StageTimings
+from ...core.metrics import ANSWER_CACHE_REQUESTS
+from .answer_cache import AnswerCache, normalize_question, scope_key
+from .single_flight import SingleFlight
+from .sessions import SessionStore, TutorSession
+from .manifest import IndexManifest, stable_chunk_id
+from typing import List, Dict, Optional, AsyncIterator, Tuple
 from pathlib import Path
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
 
 class RAGPipeline:
     def __init__(self, config: Dict):
@@ -13,16 +26,479 @@ class RAGPipeline:
             api_key=config["pinecone_api_key"],
             environment=config["pinecone_environment"],
             openai_api_key= config['openai_api_key'],  
+            backend=config.get("vector_backend", "pinecone"),
+            index_path=config.get("vector_index_path"),
+            embedding_cache_path=config.get("embedding_cache_path"),
+            embedding_concurrency=config.get("embedding_concurrency", 4),
+            index_embedding_concurrency=config.get("index_embedding_concurrency"),
+            embedding_batch_size=config.get("embedding_batch_size", 64),
+            embedding_batch_wait=config.get("embedding_batch_wait_ms", 5.0) / 1000,
+            pool_size=config.get("vector_store_pool_size", 8),
+            upsert_concurrency=config.get("upsert_concurrency", 4),
+            retrieval_mode=config.get("retrieval_mode", "dense"),
+            lexical_index_path=config.get("lexical_index_path"),
+            chunk_store_path=config.get("chunk_store_path"),
+        )
+        self.answer_generator = AnswerGenerator(
+            openai_api_key=config["openai_api_key"],
+            groq_api_key=config["groq_api_key"],
+            provider=config.get("llm_provider", "auto"),
+            context_packer=ContextPacker(max_tokens=config.get("context_max_tokens", 1500)),
+            hedge=config.get("llm_hedge", True),
+            hedge_delay=config.get("llm_hedge_delay", 2.0),
+        )
+        self.answer_cache = AnswerCache(
+            max_entries=config.get("answer_cache_size", 1024),
+            max_bytes=config.get("answer_cache_max_bytes", 32 * 1024 * 1024),
+            ttl_seconds=config.get("answer_cache_ttl", 24 * 3600),
+            similarity_threshold=config.get("answer_cache_threshold", 0.95),
+        )
+        self.sessions = SessionStore(
+            max_sessions=config.get("session_max_count", 1000),
+            max_bytes=config.get("session_max_bytes", 16 * 1024 * 1024),
+            ttl_seconds=config.get("session_ttl", 3600),
+            history_tokens=config.get("session_history_tokens", 600),
+            reuse_threshold=config.get("session_reuse_threshold", 0.7),
+            follow_up_threshold=config.get("session_follow_up_threshold", 0.3),
         )
-        self.answer_generator = AnswerGenerator(openai_api_key=config["openai_api_key"], groq_api_key = config["groq_api_key"])
+        self.manifest = IndexManifest(config.get("index_manifest_path"))
+        self.single_flight = SingleFlight()
+        # With a reranker, retrieval over-fetches candidates and only the best top_k reach the prompt
+        self.reranker = create_reranker(config.get("reranker", "none"))
+        self.top_k = config.get("top_k", 5)
+        self.rerank_candidates = config.get("rerank_candidates", 50)
+        self.timings = StageTimings()
     
-    async def index_directory(self, directory: Path) -> None:
-        """Index all documents in a directory."""
-        chunks = await self.text_processor.process_directory(directory)
-        await self.vector_store.index_chunks(chunks)
+    async def warm_up(self) -> Dict[str, str]:
+        """
+        Open connections so the first question does not pay for the handshakes.
+
+        Failures are logged and returned rather than raised: the pipeline
+        still works, the first request is just slower.
+
+        Returns:
+            Error message per component that failed to warm up
+        """
+        return await self.vector_store.warm_up()
+
+    async def index_directory(
+        self,
+        directory: Path,
+        incremental: bool = True,
+        queue_size: int = 4,
+        embed_workers: int = 2,
+        process_workers: Optional[int] = None,
+        progress: Optional[Dict] = None,
+        checkpoint_interval: float = 10.0
+    ) -> Dict:
+        """
+        Index all documents in a directory.
+
+        Files are read and split on a process pool and flow document by
+        document through bounded queues into an embedding stage and an
+        upsert stage, so memory is bounded by the queue depth rather than
+        the corpus size. Each document is compared against the manifest:
+        only new chunks are embedded and upserted, unchanged chunks that
+        moved are upserted again (from the embedding cache) so their
+        `chunk_id` stays right for ContextPacker, and vectors of chunks
+        that no longer exist are deleted. Saving the local indexes rewrites
+        them whole, so it happens at checkpoints rather than per document:
+        at most every `checkpoint_interval` seconds, at the end, and when
+        the run fails or is cancelled. The manifest is saved only after the
+        indexes, so it never lists chunks the saved indexes lack. Without
+        `incremental` every indexed chunk of this directory is deleted
+        first (see `clear_index` to wipe the whole index). An interrupted
+        run is resumed by running again incrementally: checkpointed
+        documents are unchanged by then, and the embeddings of the others
+        are in the embedding cache.
+
+        Args:
+            directory: Directory of chapter text files
+            incremental: Only apply the changes since the last run,
+                rather than rebuilding the directory's chunks
+            queue_size: Documents buffered between stages
+            embed_workers: Documents embedded concurrently
+            process_workers: Processes splitting files (defaults to the CPU count)
+            progress: Dict updated in place as the run advances, with the
+                number of 'files' and 'files_done', 'chunks' read,
+                'chunks_new' to embed, and chunks 'embedded' and 'upserted'
+            checkpoint_interval: Longest time in seconds between saves of
+                the indexes and the manifest
+
+        Returns:
+            Dict with the number of added, removed and unchanged chunks
+        """
+        prefix = f"{directory.name}/"
+        stats = {"added": 0, "removed": 0, "unchanged": 0}
+        last_checkpoint = [time.monotonic()]
+
+        async def checkpoint() -> None:
+            await self.vector_store.persist()
+            await asyncio.to_thread(self.manifest.save)
+            last_checkpoint[0] = time.monotonic()
+
+        if not incremental:
+            # Only this book is rebuilt; the other books in the index stay
+            for document in self.manifest.missing_documents(prefix, set()):
+                removed_ids = self.manifest.remove_document(document)
+                await self.vector_store.delete(removed_ids, persist=False)
+                stats["removed"] += len(removed_ids)
+            await checkpoint()
+        progress = progress if progress is not None else {}
+        progress.update({
+            "files": len(list(directory.glob("*.txt"))),
+            "files_done": 0,
+            "chunks": 0,
+            "chunks_new": 0,
+            "embedded": 0,
+            "upserted": 0,
+        })
+        seen = set()
+        embed_queue = asyncio.Queue(maxsize=queue_size)
+        upsert_queue = asyncio.Queue(maxsize=queue_size)
+        running_embedders = [embed_workers]
+
+        async def produce():
+            async for chunks in self.text_processor.iter_directory(directory, max_workers=process_workers):
+                if not chunks:
+                    progress["files_done"] += 1
+                    continue
+                document = f"{prefix}{chunks[0]['source']}"
+                seen.add(document)
+                for chunk in chunks:
+                    chunk["id"] = stable_chunk_id(document, chunk["text"])
+                    # The directory is the book, so retrieval can be scoped to it
+                    chunk["book"] = directory.name
+                new_chunks, moved_chunks, removed_ids = self.manifest.diff(document, chunks)
+                stats["unchanged"] += len(chunks) - len(new_chunks)
+                progress["chunks"] += len(chunks)
+                progress["chunks_new"] += len(new_chunks) + len(moved_chunks)
+                await embed_queue.put((document, chunks, new_chunks + moved_chunks, len(new_chunks), removed_ids))
+            for _ in range(embed_workers):
+                await embed_queue.put(None)
+
+        async def embed():
+            while (item := await embed_queue.get()) is not None:
+                document, chunks, changed_chunks, added, removed_ids = item
+                vectors = await self.vector_store.embed_chunks(changed_chunks)
+                progress["embedded"] += len(vectors)
+                await upsert_queue.put((document, chunks, vectors, added, removed_ids))
+            running_embedders[0] -= 1
+            if running_embedders[0] == 0:
+                await upsert_queue.put(None)
+
+        async def upsert():
+            while (item := await upsert_queue.get()) is not None:
+                document, chunks, vectors, added, removed_ids = item
+                if vectors:
+                    await self.vector_store.upsert_vectors(vectors, persist=False)
+                if removed_ids:
+                    await self.vector_store.delete(removed_ids, persist=False)
+                self.manifest.update(document, chunks)
+                if time.monotonic() - last_checkpoint[0] >= checkpoint_interval:
+                    await checkpoint()
+                stats["added"] += added
+                stats["removed"] += len(removed_ids)
+                progress["upserted"] += len(vectors)
+                progress["files_done"] += 1
+
+        tasks = [
+            asyncio.create_task(produce()),
+            *(asyncio.create_task(embed()) for _ in range(embed_workers)),
+            asyncio.create_task(upsert()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # One stage failed: stop the others instead of leaving them blocked on a queue
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Keep what was upserted, so a resumed run continues from there
+            await checkpoint()
+            raise
+
+        # Documents that disappeared from the directory
+        for document in self.manifest.missing_documents(prefix, seen):
+            removed_ids = self.manifest.remove_document(document)
+            await self.vector_store.delete(removed_ids, persist=False)
+            stats["removed"] += len(removed_ids)
+        await checkpoint()
+
+        if stats["added"] or stats["removed"] or not incremental:
+            # Cached answers may cite content that just changed
+            self.answer_cache.clear()
+        return stats
     
-    async def answer_question(self, question: str) -> Dict:
-        """Process a question and return an answer with sources."""
-        contexts = await self.vector_store.query(question)
-        print(contexts)## Just for debug 
-        return await self.answer_generator.generate_answer(question, contexts)
\ No newline at end of file
+    async def clear_index(self) -> None:
+        """Delete every book from the index, including vectors the manifest does not know about."""
+        await self.vector_store.delete_all()
+        self.manifest.clear()
+        self.manifest.save()
+        self.answer_cache.clear()
+
+    async def _embed_question(self, question: str) -> Optional[List[float]]:
+        """Embed a question, or return None when retrieval is lexical only."""
+        if self.vector_store.embedder is None:
+            return None
+        with self.timings.stage("embed"):
+            return await self.vector_store.embedder.embed_text(question)
+
+    async def _retrieve(
+        self,
+        question: str,
+        query_embedding: Optional[List[float]],
+        scope: Optional[Dict] = None
+    ) -> List[Dict]:
+        """
+        Retrieve the contexts for a question, reranking over-fetched candidates if configured.
+
+        With a scope only chunks whose metadata matches it are searched; if
+        none match (e.g. the book is not indexed yet) the whole index is.
+        """
+        top_k = self.top_k if self.reranker is None else self.rerank_candidates
+        with self.timings.stage("retrieve"):
+            candidates = await self.vector_store.query(
+                question, top_k=top_k, query_embedding=query_embedding, filter=scope
+            )
+            if scope and not candidates:
+                logger.info(f"No chunks in scope {scope_key(scope)}, searching the whole index")
+                candidates = await self.vector_store.query(question, top_k=top_k, query_embedding=query_embedding)
+        return await self._rerank(question, candidates)
+
+    async def _rerank(self, question: str, candidates: List[Dict]) -> List[Dict]:
+        if self.reranker is None:
+            return candidates
+        with self.timings.stage("rerank"):
+            return await self.reranker.rerank(question, candidates, self.top_k)
+
+    async def answer_question(self, question: str, scope: Optional[Dict] = None) -> Dict:
+        """
+        Process a question and return an answer with sources.
+
+        Concurrent calls for the same normalized question and scope share a
+        single run of the pipeline.
+
+        Args:
+            question: The student's question
+            scope: Metadata the retrieved chunks must match, e.g.
+                {"book": "class_10_science", "chapter": 3}
+        """
+        key = scope_key(scope)
+        cached = self.answer_cache.get(question, key)
+        if cached is not None:
+            ANSWER_CACHE_REQUESTS.inc(outcome="exact_hit")
+            return cached
+
+        result = await self.single_flight.do(
+            f"{key}|{normalize_question(question)}",
+            lambda: self._answer_uncached(question, scope)
+        )
+        return dict(result)
+
+    async def _answer_uncached(self, question: str, scope: Optional[Dict] = None) -> Dict:
+        key = scope_key(scope)
+        query_embedding = await self._embed_question(question)
+        cached = self.answer_cache.get_similar(query_embedding, key)
+        if cached is not None:
+            ANSWER_CACHE_REQUESTS.inc(outcome="similar_hit")
+            return cached
+        ANSWER_CACHE_REQUESTS.inc(outcome="miss")
+
+        contexts = await self._retrieve(question, query_embedding, scope)
+        logger.debug(f"Retrieved {len(contexts)} contexts: {[c.get('id') for c in contexts]}")
+        with self.timings.stage("format"):
+            packed = self.answer_generator.pack_contexts(contexts)
+        with self.timings.stage("generate"):
+            result = await self.answer_generator.generate_answer(question, packed)
+        self.answer_cache.put(question, query_embedding, result, key)
+        return result
+
+    async def answer_in_session(self, session: TutorSession, question: str) -> Dict:
+        """
+        Answer a question asked in a tutoring session.
+
+        The session's history goes into the prompt so follow-ups can refer
+        back to earlier turns. A follow-up that is still about the previous
+        turn (see SessionStore.reusable_contexts) is answered from that
+        turn's contexts without querying the index again. Session answers
+        depend on the conversation, so the answer cache is bypassed.
+
+        Args:
+            session: Session from `self.sessions`
+            question: The student's question
+
+        Returns:
+            Dict with the answer, sources and whether the contexts were reused
+        """
+        query_embedding = await self._embed_question(question)
+        contexts = self.sessions.reusable_contexts(session, question, query_embedding)
+        reused = contexts is not None
+        if not reused:
+            contexts = await self._retrieve(question, query_embedding, session.scope)
+        with self.timings.stage("format"):
+            packed = self.answer_generator.pack_contexts(contexts)
+        with self.timings.stage("generate"):
+            result = await self.answer_generator.generate_answer(question, packed, history=session.history())
+        self.sessions.record(session, question, result, packed.contexts, query_embedding, reused=reused)
+        return {**result, "reused_context": reused}
+
+    async def answer_batch(
+        self,
+        questions: List[str],
+        concurrency: int = 8
+    ) -> AsyncIterator[Tuple[int, Dict]]:
+        """
+        Answer many questions, yielding (index, result) as each one finishes.
+
+        Cached answers are yielded first. The remaining questions are
+        embedded in one batched call and retrieved with one batched query,
+        then up to `concurrency` LLM generations run at once. A question
+        that fails yields a result with an 'error' key instead of stopping
+        the batch.
+
+        Args:
+            questions: Questions to answer
+            concurrency: LLM generations kept in flight
+
+        Yields:
+            (position in `questions`, answer dict) in completion order
+        """
+        pending = []
+        for i, question in enumerate(questions):
+            cached = self.answer_cache.get(question)
+            if cached is not None:
+                ANSWER_CACHE_REQUESTS.inc(outcome="exact_hit")
+                yield i, cached
+            else:
+                pending.append(i)
+        if not pending:
+            return
+
+        embeddings = [None] * len(pending)
+        if self.vector_store.embedder is not None:
+            with self.timings.stage("embed_batch"):
+                embeddings = await self.vector_store.embedder.embed_text([questions[i] for i in pending])
+            if len(pending) == 1:
+                # embed_text unwraps single results
+                embeddings = [embeddings]
+
+        misses = []
+        for i, embedding in zip(pending, embeddings):
+            cached = self.answer_cache.get_similar(embedding)
+            if cached is not None:
+                ANSWER_CACHE_REQUESTS.inc(outcome="similar_hit")
+                yield i, cached
+            else:
+                ANSWER_CACHE_REQUESTS.inc(outcome="miss")
+                misses.append((i, embedding))
+        if not misses:
+            return
+
+        with self.timings.stage("retrieve_batch"):
+            all_contexts = await self.vector_store.query_batch(
+                [questions[i] for i, _ in misses],
+                top_k=self.top_k if self.reranker is None else self.rerank_candidates,
+                query_embeddings=None if self.vector_store.embedder is None else [e for _, e in misses]
+            )
+        all_contexts = [
+            await self._rerank(questions[i], candidates)
+            for (i, _), candidates in zip(misses, all_contexts)
+        ]
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def generate(i: int, embedding, contexts: List[Dict]) -> Tuple[int, Dict]:
+            async with semaphore:
+                try:
+                    with self.timings.stage("format"):
+                        packed = self.answer_generator.pack_contexts(contexts)
+                    with self.timings.stage("generate"):
+                        result = await self.answer_generator.generate_answer(questions[i], packed)
+                except Exception as e:
+                    logger.error(f"Error answering batch question {i}: {e}")
+                    return i, {"error": str(e)}
+            self.answer_cache.put(questions[i], embedding, result)
+            return i, result
+
+        tasks = [
+            asyncio.create_task(generate(i, embedding, contexts))
+            for (i, embedding), contexts in zip(misses, all_contexts)
+        ]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # The consumer stopped early (e.g. the client disconnected)
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict:
+        """Counters for sizing the answer cache, request coalescing and tutoring sessions, per-stage latency and LLM routing."""
+        embedder = self.vector_store.embedder
+        return {
+            "answer_cache": self.answer_cache.stats(),
+            "coalescing": self.single_flight.stats(),
+            "sessions": self.sessions.stats(),
+            "context": dict(self.answer_generator.context_stats),
+            "stages": self.timings.stats(),
+            "llm": self.answer_generator.router.stats(),
+            "embedding_batching": embedder.batcher.stats() if embedder is not None and embedder.batcher is not None else None,
+            "chunk_store": self.vector_store.chunk_store.stats() if self.vector_store.chunk_store is not None else None,
+        }
+
+    async def stream_answer(self, question: str, scope: Optional[Dict] = None) -> AsyncIterator[Dict]:
+        """
+        Answer a question as a stream of events.
+
+        Yields a {"type": "sources"} event as soon as retrieval finishes,
+        then {"type": "token"} events as the LLM produces text, and finally
+        a {"type": "done"} event carrying the time to first token and the
+        prompt tokens saved by context packing. `scope` restricts retrieval
+        as in `answer_question`.
+        """
+        start = time.perf_counter()
+        key = scope_key(scope)
+        cached = self.answer_cache.get(question, key)
+        query_embedding = None
+        if cached is not None:
+            ANSWER_CACHE_REQUESTS.inc(outcome="exact_hit")
+        else:
+            query_embedding = await self._embed_question(question)
+            cached = self.answer_cache.get_similar(query_embedding, key)
+            ANSWER_CACHE_REQUESTS.inc(outcome="miss" if cached is None else "similar_hit")
+        if cached is not None:
+            yield {"type": "sources", "sources": cached["sources"]}
+            yield {"type": "token", "text": cached["answer"]}
+            yield {"type": "done", "cached": True, "ttft_ms": (time.perf_counter() - start) * 1000}
+            return
+
+        contexts = await self._retrieve(question, query_embedding, scope)
+        with self.timings.stage("format"):
+            packed = self.answer_generator.pack_contexts(contexts)
+        sources = self.answer_generator.extract_sources(packed.contexts)
+        yield {"type": "sources", "sources": sources}
+
+        parts = []
+        ttft_ms = None
+        generate_start = time.perf_counter()
+        meta = {}
+        async for token in self.answer_generator.stream_answer(question, packed, meta=meta):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000
+                logger.info(f"Time to first token: {ttft_ms:.0f}ms")
+            parts.append(token)
+            yield {"type": "token", "text": token}
+        self.timings.record("generate", (time.perf_counter() - generate_start) * 1000)
+
+        self.answer_cache.put(question, query_embedding, {
+            "answer": "".join(parts),
+            "sources": sources,
+            "provider": meta.get("provider")
+        }, key)
+        yield {
+            "type": "done",
+            "cached": False,
+            "ttft_ms": ttft_ms,
+            "context_tokens_saved": packed.tokens_saved
+        }
@@ -0,0 +1,220 @@
+# app/services/rag/answer_cache.py
+from typing import List, Dict, Optional, Callable
+from collections import OrderedDict
+import logging
+import re
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase a question and strip punctuation and repeated whitespace."""
+    question = re.sub(r"[^\w\s]", " ", question.lower())
+    return " ".join(question.split())
+
+
+def scope_key(scope: Optional[Dict]) -> str:
+    """Stable string for a retrieval scope such as {"book": ..., "chapter": 3}."""
+    if not scope:
+        return ""
+    return ",".join(f"{key}={scope[key]}" for key in sorted(scope))
+
+
+class _Entry:
+    __slots__ = ("answer", "slot", "created", "size", "scope")
+
+    def __init__(self, answer: Dict, slot: Optional[int], created: float, size: int, scope: str = ""):
+        self.answer = answer
+        self.slot = slot
+        self.created = created
+        self.size = size
+        self.scope = scope
+
+
+class AnswerCache:
+    """
+    Two-tier cache of generated answers.
+
+    The exact tier is keyed on the normalized question text. The semantic
+    tier keeps the embedding of every cached question in a matrix and
+    returns a stored answer when a new question's embedding has cosine
+    similarity of at least `similarity_threshold` with a cached one. Both
+    tiers share one LRU order, TTL and memory bound. Answers retrieved
+    from a restricted part of the index carry a `scope` string and are only
+    served to lookups with the same scope.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 24 * 3600,
+        similarity_threshold: float = 0.95,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_entries: Maximum number of cached answers (0 disables the cache)
+            max_bytes: Approximate memory bound for answers and embeddings
+            ttl_seconds: Age after which an entry is no longer served
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            clock: Time source, overridable for tests
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # Semantic tier: one row per slot, keys[slot] maps back to the entry
+        self._embeddings: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+        self._stats = {
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @staticmethod
+    def _key(question: str, scope: str) -> str:
+        key = normalize_question(question)
+        return f"{scope}|{key}" if scope else key
+
+    def get(self, question: str, scope: str = "") -> Optional[Dict]:
+        """Look up an answer by normalized question text."""
+        if not self.enabled:
+            return None
+        key = self._key(question, scope)
+        entry = self._entries.get(key)
+        if entry is not None and not self._expire_if_stale(key, entry):
+            self._entries.move_to_end(key)
+            self._stats["exact_hits"] += 1
+            return dict(entry.answer)
+        return None
+
+    def get_similar(self, embedding: Optional[List[float]], scope: str = "") -> Optional[Dict]:
+        """
+        Look up an answer by question embedding. Counts a miss when neither
+        tier has a usable answer, so call it after `get` (with None when no
+        embedding is available).
+        """
+        if not self.enabled:
+            return None
+        if embedding is not None and self._embeddings is not None and self._entries:
+            query = self._normalize(embedding)
+            scores = self._embeddings @ query
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.similarity_threshold:
+                    break
+                key = self._slot_keys[slot]
+                if key is None:
+                    continue
+                entry = self._entries[key]
+                if entry.scope != scope or self._expire_if_stale(key, entry):
+                    continue
+                self._entries.move_to_end(key)
+                self._stats["semantic_hits"] += 1
+                return dict(entry.answer)
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, question: str, embedding: Optional[List[float]], answer: Dict, scope: str = "") -> None:
+        """Store an answer for a question (and its embedding, if available)."""
+        if not self.enabled:
+            return
+        key = self._key(question, scope)
+        if key in self._entries:
+            self._remove(key)
+
+        slot = None
+        if embedding is not None:
+            slot = self._allocate_slot(len(embedding))
+            self._embeddings[slot] = self._normalize(embedding)
+            self._slot_keys[slot] = key
+
+        size = self._estimate_size(key, answer, embedding)
+        self._entries[key] = _Entry(dict(answer), slot, self._clock(), size, scope)
+        self._bytes += size
+
+        while self._entries and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop every cached answer, e.g. after the index content changed."""
+        self._entries.clear()
+        self._bytes = 0
+        self._embeddings = None
+        self._slot_keys = []
+        self._free_slots = []
+        self._stats["invalidations"] += 1
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current size of the cache."""
+        lookups = self._stats["exact_hits"] + self._stats["semantic_hits"] + self._stats["misses"]
+        hits = self._stats["exact_hits"] + self._stats["semantic_hits"]
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+    @staticmethod
+    def _estimate_size(key: str, answer: Dict, embedding: Optional[List[float]]) -> int:
+        # Character counts are a close enough proxy for the bound we need
+        size = len(key) + sum(len(str(value)) for value in answer.values())
+        if embedding is not None:
+            size += 4 * len(embedding)
+        return size
+
+    def _allocate_slot(self, dim: int) -> int:
+        if self._embeddings is None or self._embeddings.shape[1] != dim:
+            self._embeddings = np.zeros((0, dim), dtype=np.float32)
+            self._slot_keys = []
+            self._free_slots = []
+            for entry in self._entries.values():
+                entry.slot = None
+        if self._free_slots:
+            return self._free_slots.pop()
+        slot = len(self._slot_keys)
+        if slot >= self._embeddings.shape[0]:
+            grown = np.zeros((max(16, 2 * slot), dim), dtype=np.float32)
+            grown[:slot] = self._embeddings[:slot]
+            self._embeddings = grown
+        self._slot_keys.append(None)
+        return slot
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        if entry.slot is not None and self._embeddings is not None:
+            self._embeddings[entry.slot] = 0.0
+            self._slot_keys[entry.slot] = None
+            self._free_slots.append(entry.slot)
+
+    def _expire_if_stale(self, key: str, entry: _Entry) -> bool:
+        if self._clock() - entry.created <= self.ttl_seconds:
+            return False
+        self._remove(key)
+        self._stats["expirations"] += 1
+        return True
@@ -1,9 +1,13 @@
-from typing import List, Dict, Union, Literal
+from typing import List, Dict, Union, Literal, AsyncIterator
+from operator import itemgetter
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 from langchain.prompts import ChatPromptTemplate
 from langchain.schema import StrOutputParser
-from langchain.schema.runnable import RunnablePassthrough
+from langchain.schema.runnable import RunnableLambda
+from .context_packer import ContextPacker, PackedContext
+from .provider_router import ProviderRouter
+from ...core.metrics import CONTEXT_TOKENS
 import logging
 from typing import Optional
 
@@ -12,43 +16,57 @@ logger = logging.getLogger(__name__)
 class AnswerGenerator:
     def __init__(
         self, 
-        openai_api_key: str, 
-        groq_api_key: str,  
-        provider: Literal["openai", "groq"] = "groq"
+        openai_api_key: Optional[str], 
+        groq_api_key: Optional[str],  
+        provider: Literal["openai", "groq", "auto"] = "auto",
+        context_packer: Optional[ContextPacker] = None,
+        hedge: bool = True,
+        hedge_delay: float = 2.0
     ):
         """
         Initialize the AnswerGenerator with support for both OpenAI and Groq.
         
+        Only providers with an API key are set up. By default requests are
+        routed between them by live latency and error rate, with hedging
+        and failover (see ProviderRouter).
+        
         Args:
             openai_api_key: OpenAI API key
             groq_api_key: Groq API key
-            model: Model name to use
-            provider: Which provider to use ("openai" or "groq")
+            provider: "auto" to route between every configured provider,
+                or "openai"/"groq" to always use that one
+            context_packer: Merges, deduplicates and budgets the retrieved
+                contexts before they go into the prompt
+            hedge: Race a second provider when the first is slower than its p95
+            hedge_delay: Hedge delay until enough latencies have been measured
         """
-        self.provider = provider
+        self.context_packer = context_packer or ContextPacker()
+        self.context_stats = {"requests": 0, "tokens": 0, "tokens_saved": 0}
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
         
-        # Initialize both LLMs
+        # Initialize the LLMs we have keys for
         self.llm_openai = ChatOpenAI(
             openai_api_key=openai_api_key,
             model='gpt-4o-mini',
             temperature=0
-        )
+        ) if openai_api_key else None
         
         self.llm_groq = ChatGroq(
             groq_api_key=groq_api_key,
             model="llama-3.3-70b-versatile",  # Groq supports various models including "mixtral-8x7b-32768"
             temperature=0
-        )
+        ) if groq_api_key else None
         
-        # Select the active LLM based on provider
-        self.llm = self.llm_groq if provider == "groq" else self.llm_openai
+        if self.llm_openai is None and self.llm_groq is None:
+            raise ValueError("An OpenAI or Groq API key is required to generate answers")
         
         # Define the prompt template
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", "You are a helpful AI tutor. Answer questions based on the provided context. "
                       "If you cannot answer based on the given context, explicitly say so."),
             ("user", """
-Here are the relevant contexts:
+{history}Here are the relevant contexts:
 {contexts}
 
 Question: {question}
@@ -57,17 +75,27 @@ Please provide an answer based solely on the above contexts.
 """)
         ])
         
-        # Create the chain
-        self.chain = (
+        # Create the chains and the router between them
+        if provider == "auto":
+            self.use_routing()
+        else:
+            self.switch_provider(provider)
+
+    def _build_chain(self, llm):
+        return (
             {
-                "contexts": self._format_contexts, 
-                "question": RunnablePassthrough()
+                "contexts": itemgetter("contexts") | RunnableLambda(self._format_contexts),
+                "question": itemgetter("question"),
+                "history": RunnableLambda(self._format_history)
             }
             | self.prompt 
-            | self.llm 
+            | llm 
             | StrOutputParser()
         )
 
+    def _llms(self) -> Dict:
+        return {name: llm for name, llm in (("groq", self.llm_groq), ("openai", self.llm_openai)) if llm is not None}
+
     def _format_contexts(self, contexts: List[Union[str, Dict]]) -> str:
         """
         Format the contexts into a string.
@@ -89,58 +117,142 @@ Please provide an answer based solely on the above contexts.
             formatted_contexts.append(f"Context {i}:\n{text}\n")
         return "\n".join(formatted_contexts)
 
+    @staticmethod
+    def _format_history(inputs: Dict) -> str:
+        """Prompt section for the conversation so far (empty outside tutoring sessions)."""
+        history = inputs.get("history")
+        return f"Conversation so far:\n{history}\n\n" if history else ""
+
     def switch_provider(self, provider: Literal["openai", "groq"]):
         """
-        Switch between OpenAI and Groq providers.
+        Send every request to one provider, without routing.
         
         Args:
             provider: The provider to switch to ("openai" or "groq")
         """
         if provider not in ["openai", "groq"]:
             raise ValueError("Provider must be either 'openai' or 'groq'")
+        llm = self._llms().get(provider)
+        if llm is None:
+            raise ValueError(f"No API key configured for provider '{provider}'")
         
         self.provider = provider
-        self.llm = self.llm_groq if provider == "groq" else self.llm_openai
+        self.llm = llm
         
         # Recreate the chain with the new LLM
-        self.chain = (
-            {
-                "contexts": self._format_contexts, 
-                "question": RunnablePassthrough()
-            }
-            | self.prompt 
-            | self.llm 
-            | StrOutputParser()
+        self.router = ProviderRouter({provider: self._build_chain(llm)}, hedge=False)
+
+    def use_routing(self, preferred: Optional[str] = None):
+        """
+        Route requests between every configured provider.
+        
+        Args:
+            preferred: Provider tried first while no latencies are known
+        """
+        llms = self._llms()
+        order = sorted(llms, key=lambda name: name != preferred)
+        self.provider = "auto"
+        self.llm = llms[order[0]]
+        self.router = ProviderRouter(
+            {name: self._build_chain(llms[name]) for name in order},
+            hedge=self.hedge,
+            hedge_delay=self.hedge_delay
+        )
+
+    def pack_contexts(self, contexts: Union[PackedContext, List[Union[str, Dict]]]) -> PackedContext:
+        """
+        Fit retrieved contexts into the prompt budget, recording the tokens saved.
+
+        Already packed contexts are returned unchanged.
+        """
+        if isinstance(contexts, PackedContext):
+            return contexts
+        packed = self.context_packer.pack(contexts)
+        self.context_stats["requests"] += 1
+        self.context_stats["tokens"] += packed.tokens
+        self.context_stats["tokens_saved"] += packed.tokens_saved
+        CONTEXT_TOKENS.inc(packed.tokens, kind="sent")
+        CONTEXT_TOKENS.inc(packed.tokens_saved, kind="saved")
+        logger.debug(
+            f"Prompt context: {packed.tokens} tokens from {len(packed.contexts)} contexts, "
+            f"{packed.tokens_saved} tokens saved"
         )
+        return packed
+
+    @staticmethod
+    def extract_sources(contexts: List[Union[str, Dict]]) -> List[str]:
+        """Collect the 'source' of every dictionary context, in order."""
+        return [ctx['source'] for ctx in contexts if isinstance(ctx, dict) and 'source' in ctx]
 
-    async def generate_answer(self, question: str, contexts: List[Union[str, Dict]]) -> Dict:
+    async def stream_answer(
+        self,
+        question: str,
+        contexts: Union[PackedContext, List[Union[str, Dict]]],
+        meta: Optional[Dict] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the answer as the LLM produces it.
+        
+        Args:
+            question: The user's question
+            contexts: List of context strings or dictionaries with 'text' and 'source' keys,
+                or the result of pack_contexts
+            meta: Optional dict that receives the 'provider' that answered
+            
+        Yields:
+            Answer text fragments in order
+        """
+        try:
+            packed = self.pack_contexts(contexts)
+            async for provider, chunk in self.router.astream({
+                "question": question,
+                "contexts": packed.contexts
+            }):
+                if meta is not None:
+                    meta["provider"] = provider
+                if chunk:
+                    yield chunk
+        except Exception as e:
+            logger.error(f"Error streaming answer with {self.provider}: {e}")
+            raise
+
+    async def generate_answer(
+        self,
+        question: str,
+        contexts: Union[PackedContext, List[Union[str, Dict]]],
+        history: Optional[str] = None
+    ) -> Dict:
         """
         Generate an answer using retrieved contexts with LangChain.
         
         Args:
             question: The user's question
-            contexts: List of context strings or dictionaries with 'text' and 'source' keys
+            contexts: List of context strings or dictionaries with 'text' and 'source' keys,
+                or the result of pack_contexts
+            history: The conversation so far, for follow-up questions in a tutoring session
             
         Returns:
-            Dict containing the answer and source documents
+            Dict containing the answer, source documents and prompt context token counts
         """
         try:
-            # Invoke the chain with a single input dictionary
-            answer = await self.chain.ainvoke({
+            packed = self.pack_contexts(contexts)
+
+            # Invoke the best provider's chain with a single input dictionary
+            provider, answer = await self.router.ainvoke({
                 "question": question,
-                "contexts": contexts
+                "contexts": packed.contexts,
+                "history": history
             })
             
             # Extract sources if available
-            sources = []
-            for ctx in contexts:
-                if isinstance(ctx, dict) and 'source' in ctx:
-                    sources.append(ctx['source'])
+            sources = self.extract_sources(packed.contexts)
             
             return {
                 "answer": answer,
                 "sources": sources,
-                "provider": self.provider
+                "provider": provider,
+                "context_tokens": packed.tokens,
+                "context_tokens_saved": packed.tokens_saved
             }
 
         except Exception as e:
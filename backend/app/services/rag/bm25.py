@@ -0,0 +1,252 @@
+# app/services/rag/bm25.py
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+from collections import Counter
+import asyncio
+import json
+import logging
+import re
+import numpy as np
+from .vector_backends import matches_filter
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from has have how in is it its of on or
+that the their there these this to was were what when where which who why will with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase alphanumeric tokens with common English stopwords removed."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    In-memory BM25 index with compact array-backed postings.
+
+    Documents are added and removed through per-document term counts;
+    `commit` rebuilds CSR-style postings (term offsets, document indices
+    and precomputed BM25 weights) so a query is a handful of vectorized
+    scatter-adds over contiguous arrays. The rebuild covers the whole
+    index, so it only happens when documents changed, and saving is left
+    to the caller: `save_async` rebuilds and writes on a worker thread.
+    """
+
+    def __init__(self, path: Optional[Path] = None, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            path: Directory to persist the index to. When None the index
+                only lives in memory.
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.path = Path(path) if path else None
+        self.k1 = k1
+        self.b = b
+        self._vocab: Dict[str, int] = {}
+        self._doc_ids: List[str] = []
+        self._metadata: List[Dict] = []
+        self._doc_terms: List[Dict[int, int]] = []
+        self._id_to_doc: Dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._postings = np.zeros(0, dtype=np.int32)
+        self._weights = np.zeros(0, dtype=np.float32)
+        self._tfs = np.zeros(0, dtype=np.int32)
+        self._dirty = False
+        # Bumped on every change; a save records the version it wrote
+        self._version = 0
+        self._saved_version = 0
+        if self.path and (self.path / "postings.npz").exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def add(self, doc_id: str, text: str, metadata: Dict) -> None:
+        """Add or replace a document. Call `commit` before querying."""
+        terms = Counter()
+        for token in tokenize(text):
+            term = self._vocab.setdefault(token, len(self._vocab))
+            terms[term] += 1
+        doc = self._id_to_doc.get(doc_id)
+        if doc is None:
+            self._id_to_doc[doc_id] = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._metadata.append(metadata)
+            self._doc_terms.append(dict(terms))
+        else:
+            self._metadata[doc] = metadata
+            self._doc_terms[doc] = dict(terms)
+        self._changed()
+
+    def remove(self, doc_ids: List[str]) -> None:
+        """Remove documents by ID. Call `commit` before querying."""
+        for doc_id in doc_ids:
+            doc = self._id_to_doc.pop(doc_id, None)
+            if doc is None:
+                continue
+            last = len(self._doc_ids) - 1
+            if doc != last:
+                self._doc_ids[doc] = self._doc_ids[last]
+                self._metadata[doc] = self._metadata[last]
+                self._doc_terms[doc] = self._doc_terms[last]
+                self._id_to_doc[self._doc_ids[doc]] = doc
+            self._doc_ids.pop()
+            self._metadata.pop()
+            self._doc_terms.pop()
+            self._changed()
+
+    def clear(self) -> None:
+        self._vocab = {}
+        self._doc_ids = []
+        self._metadata = []
+        self._doc_terms = []
+        self._id_to_doc = {}
+        self._changed()
+
+    def _changed(self) -> None:
+        self._dirty = True
+        self._version += 1
+
+    def commit(self) -> None:
+        """Rebuild the postings arrays after adds and removes."""
+        if not self._dirty:
+            return
+        self._install(self._build(self._doc_terms, len(self._vocab)))
+
+    def _install(self, arrays: Tuple[np.ndarray, ...]) -> None:
+        self._offsets, self._postings, self._weights, self._tfs = arrays
+        self._dirty = False
+
+    def _build(self, doc_terms: List[Dict[int, int]], vocab_size: int) -> Tuple[np.ndarray, ...]:
+        """CSR postings for `doc_terms`: (offsets, postings, weights, tfs)."""
+        n_docs = len(doc_terms)
+        doc_len = np.array([sum(terms.values()) for terms in doc_terms], dtype=np.float32)
+        avg_len = float(doc_len.mean()) if n_docs else 0.0
+
+        entries = [(term, doc, tf) for doc, terms in enumerate(doc_terms) for term, tf in terms.items()]
+        if entries:
+            terms, docs, tfs = (np.array(column) for column in zip(*entries))
+        else:
+            terms = docs = tfs = np.zeros(0, dtype=np.int64)
+        order = np.lexsort((docs, terms))
+        terms, docs, tfs = terms[order], docs[order].astype(np.int32), tfs[order].astype(np.float32)
+
+        df = np.bincount(terms, minlength=vocab_size).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1 - self.b + self.b * doc_len[docs] / max(avg_len, 1e-9))
+        weights = (idf[terms] * tfs * (self.k1 + 1) / (tfs + norm)).astype(np.float32)
+        offsets = np.concatenate([[0], np.cumsum(df)]).astype(np.int64)
+        return offsets, docs, weights, tfs.astype(np.int32)
+
+    def query(self, text: str, top_k: int = 5, filter: Optional[Dict] = None) -> List[Dict]:
+        """
+        Score documents against a query.
+
+        Args:
+            text: Query text
+            top_k: Number of documents to return
+            filter: Only return documents whose metadata has these key/values
+
+        Returns:
+            Up to top_k dictionaries with 'id', 'score' and 'metadata' keys,
+            best first; documents sharing no term with the query are skipped
+        """
+        self.commit()
+        if not self._doc_ids:
+            return []
+        scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+        for token in set(tokenize(text)):
+            term = self._vocab.get(token)
+            if term is None:
+                continue
+            start, end = self._offsets[term], self._offsets[term + 1]
+            scores[self._postings[start:end]] += self._weights[start:end]
+
+        candidates = np.flatnonzero(scores)
+        if filter:
+            keep = np.fromiter(
+                (matches_filter(self._metadata[doc], filter) for doc in candidates), dtype=bool, count=len(candidates)
+            )
+            candidates = candidates[keep]
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            {'id': self._doc_ids[doc], 'score': float(scores[doc]), 'metadata': self._metadata[doc]}
+            for doc in candidates
+        ]
+
+    def save(self) -> None:
+        """Write the index to `path`, if it changed since the last save."""
+        if not self.path or self._saved_version == self._version:
+            return
+        version = self._version
+        arrays = self._write(self._snapshot())
+        if self._dirty:
+            self._install(arrays)
+        self._saved_version = version
+
+    async def save_async(self) -> None:
+        """`save`, with the postings rebuild and the writes on a worker thread."""
+        if not self.path or self._saved_version == self._version:
+            return
+        version = self._version
+        arrays = await asyncio.to_thread(self._write, self._snapshot())
+        if self._version == version:
+            if self._dirty:
+                self._install(arrays)
+            self._saved_version = version
+
+    def _snapshot(self) -> Dict:
+        # Shallow copies suffice: a document's term counts are replaced, never edited
+        return {
+            "vocab": dict(self._vocab),
+            "ids": list(self._doc_ids),
+            "metadata": list(self._metadata),
+            "doc_terms": list(self._doc_terms),
+            "arrays": None if self._dirty else (self._offsets, self._postings, self._weights, self._tfs),
+        }
+
+    def _write(self, snapshot: Dict) -> Tuple[np.ndarray, ...]:
+        arrays = snapshot["arrays"] or self._build(snapshot["doc_terms"], len(snapshot["vocab"]))
+        offsets, postings, weights, tfs = arrays
+        self.path.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            self.path / "postings.npz",
+            offsets=offsets,
+            postings=postings,
+            weights=weights,
+            # Raw term frequencies let a loaded index keep accepting edits
+            tfs=tfs
+        )
+        with open(self.path / "documents.json", "w") as f:
+            json.dump({"vocab": snapshot["vocab"], "ids": snapshot["ids"], "metadata": snapshot["metadata"]}, f)
+        logger.info(f"Saved BM25 index with {len(snapshot['ids'])} documents to {self.path}")
+        return arrays
+
+    def _load(self) -> None:
+        arrays = np.load(self.path / "postings.npz")
+        with open(self.path / "documents.json") as f:
+            stored = json.load(f)
+        self._vocab = stored["vocab"]
+        self._doc_ids = stored["ids"]
+        self._metadata = stored["metadata"]
+        self._id_to_doc = {doc_id: doc for doc, doc_id in enumerate(self._doc_ids)}
+        self._offsets = arrays["offsets"]
+        self._postings = arrays["postings"]
+        self._weights = arrays["weights"]
+        self._tfs = arrays["tfs"]
+        # Rebuild per-document term counts so documents can still be added or removed
+        self._doc_terms = [{} for _ in self._doc_ids]
+        tfs = self._tfs
+        for term in range(len(self._offsets) - 1):
+            start, end = self._offsets[term], self._offsets[term + 1]
+            for doc, tf in zip(self._postings[start:end], tfs[start:end]):
+                self._doc_terms[doc][term] = int(tf)
+        self._dirty = False
+        logger.info(f"Loaded BM25 index with {len(self)} documents from {self.path}")
@@ -0,0 +1,300 @@
+# app/services/rag/chunk_store.py
+from typing import Dict, Iterable, List, Optional, Tuple
+from contextlib import contextmanager
+from pathlib import Path
+import json
+import logging
+import mmap
+import os
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking between processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkStore:
+    """
+    Local store of chunk texts, so the vector index only holds IDs and
+    the small metadata fields that queries filter on.
+
+    Texts are appended as UTF-8 to a data file, which is memory-mapped
+    for reads. `chunks.idx` starts with a {"generation": N} header naming
+    that data file (`chunks.bin` for generation 0, `chunks.N.bin` after),
+    followed by an append-only log of JSON lines [id, offset, length]
+    (length -1 removes the ID) that is replayed into an in-memory offset
+    table. Chunk IDs are content-derived, so an ID that is already stored
+    is never written twice.
+
+    Removed texts stay in the data file until dead bytes outweigh live
+    ones. Compaction then copies the live records into the next
+    generation's data file and swaps in a new index in a single rename,
+    so a crash leaves either the old or the new generation, never a mix.
+
+    Several processes (e.g. scripts/index_documents.py and a server) may
+    share a store. Writes and compactions hold an exclusive `flock` on
+    `chunks.lock`, and reading the index holds a shared one. A lookup
+    that misses replays the index records added since, and a replaced
+    index is read afresh. Without fcntl (Windows) only one process may
+    write at a time.
+    """
+
+    # Smallest amount of dead data worth a rewrite
+    _MIN_COMPACT_BYTES = 1024 * 1024
+
+    def __init__(self, path: Path):
+        """
+        Args:
+            path: Directory for the data and index files, created if missing
+        """
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.path / "chunks.idx"
+        self._lock_path = self.path / "chunks.lock"
+        self._mmap: Optional[mmap.mmap] = None
+        with self._locked(exclusive=False):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._offsets
+
+    def _data_file(self, generation: int) -> Path:
+        return self.path / ("chunks.bin" if generation == 0 else f"chunks.{generation}.bin")
+
+    @property
+    def _data_path(self) -> Path:
+        return self._data_file(self._generation)
+
+    @contextmanager
+    def _locked(self, exclusive: bool = True):
+        """Hold the store's lock file; the helpers below expect it to be held."""
+        if fcntl is None:
+            yield
+            return
+        # A fresh descriptor per use: flock on a shared one would convert, not nest
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _load(self) -> None:
+        """Read the store from scratch."""
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        self._dead_bytes = 0
+        self._generation = 0
+        # Bytes of the index replayed so far, and which index file they came from
+        self._index_pos = 0
+        self._index_id = None
+        if self._index_path.exists():
+            stat = self._index_path.stat()
+            self._index_id = (stat.st_dev, stat.st_ino)
+            self._replay()
+        self._data_path.touch()
+        self._remap()
+
+    def _replay(self) -> None:
+        """Apply the complete index lines written since the last replay."""
+        data_size = self._data_path.stat().st_size if self._data_path.exists() else 0
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_pos)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Still being written (or cut short by a crash); read it next time
+                    break
+                self._index_pos += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping malformed record in {self._index_path}")
+                    continue
+                if isinstance(record, dict):
+                    self._generation = record.get("generation", 0)
+                    data_size = self._data_path.stat().st_size if self._data_path.exists() else 0
+                    continue
+                chunk_id, offset, length = record
+                previous = self._offsets.pop(chunk_id, None)
+                if previous is not None:
+                    self._dead_bytes += previous[1]
+                if length >= 0 and offset + length <= data_size:
+                    self._offsets[chunk_id] = (offset, length)
+
+    def _refresh(self) -> bool:
+        """Pick up records written by another process; True if the index had changed."""
+        try:
+            stat = self._index_path.stat()
+        except FileNotFoundError:
+            return False
+        if (stat.st_dev, stat.st_ino) != self._index_id:
+            # Compacted or cleared elsewhere: the old offsets mean nothing now
+            self._load()
+            return True
+        if stat.st_size > self._index_pos:
+            self._replay()
+            self._remap()
+            return True
+        return False
+
+    def _remap(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._data_path.stat().st_size:
+            with open(self._data_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def put_many(self, texts: Dict[str, str]) -> int:
+        """
+        Store chunk texts by ID, skipping IDs that are already stored.
+
+        Returns:
+            Number of texts written
+        """
+        with self._locked():
+            self._refresh()
+            return self._put_many(texts)
+
+    def _put_many(self, texts: Dict[str, str]) -> int:
+        new = [(chunk_id, text.encode("utf-8")) for chunk_id, text in texts.items() if chunk_id not in self._offsets]
+        if not new:
+            return 0
+        records = []
+        # The data is on disk before the index points at it; holding the
+        # lock, nothing else appends between reading the end and writing
+        with open(self._data_path, "ab") as f:
+            offset = f.seek(0, os.SEEK_END)
+            for chunk_id, data in new:
+                f.write(data)
+                records.append((chunk_id, offset, len(data)))
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._append_index(records)
+        for chunk_id, offset, length in records:
+            self._offsets[chunk_id] = (offset, length)
+        self._remap()
+        return len(records)
+
+    def get(self, chunk_id: str) -> Optional[str]:
+        location = self._offsets.get(chunk_id)
+        if location is None:
+            with self._locked(exclusive=False):
+                refreshed = self._refresh()
+            if refreshed:
+                location = self._offsets.get(chunk_id)
+        if location is None:
+            return None
+        offset, length = location
+        if length == 0:
+            return ""
+        # Decoded straight from the mapped pages, without an intermediate bytes copy
+        with memoryview(self._mmap) as view:
+            return str(view[offset:offset + length], "utf-8")
+
+    def get_many(self, chunk_ids: Iterable[str]) -> List[Optional[str]]:
+        return [self.get(chunk_id) for chunk_id in chunk_ids]
+
+    def remove(self, chunk_ids: Iterable[str]) -> None:
+        with self._locked():
+            self._refresh()
+            self._remove(chunk_ids)
+
+    def _remove(self, chunk_ids: Iterable[str]) -> None:
+        records = []
+        for chunk_id in chunk_ids:
+            location = self._offsets.pop(chunk_id, None)
+            if location is not None:
+                self._dead_bytes += location[1]
+                records.append((chunk_id, 0, -1))
+        if records:
+            self._append_index(records)
+        if self._dead_bytes >= self._MIN_COMPACT_BYTES and self._dead_bytes > self.live_bytes:
+            self._compact()
+
+    def clear(self) -> None:
+        """Drop every stored text."""
+        with self._locked():
+            self._switch_generation({}, b"")
+
+    @property
+    def live_bytes(self) -> int:
+        return sum(length for _, length in self._offsets.values())
+
+    def compact(self) -> None:
+        """Rewrite the store with only the live records."""
+        with self._locked():
+            # Records appended elsewhere must survive into the new generation
+            self._refresh()
+            self._compact()
+
+    def _compact(self) -> None:
+        offsets, parts, position = {}, [], 0
+        with memoryview(self._mmap) if self._mmap is not None else memoryview(b"") as view:
+            for chunk_id, (offset, length) in self._offsets.items():
+                offsets[chunk_id] = (position, length)
+                parts.append(bytes(view[offset:offset + length]))
+                position += length
+        dead_bytes = self._dead_bytes
+        self._switch_generation(offsets, b"".join(parts))
+        logger.info(f"Compacted chunk store: {dead_bytes} dead bytes dropped")
+
+    def _switch_generation(self, offsets: Dict[str, Tuple[int, int]], data: bytes) -> None:
+        old_data_path = self._data_path
+        generation = self._generation + 1
+        data_path = self._data_file(generation)
+        with open(data_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        index_tmp = self._index_path.with_suffix(".idx.tmp")
+        with open(index_tmp, "w") as f:
+            f.write(json.dumps({"generation": generation}) + "\n")
+            for chunk_id, (offset, length) in offsets.items():
+                f.write(json.dumps([chunk_id, offset, length]) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        # The single commit point: the index names the data file its offsets belong to
+        index_tmp.replace(self._index_path)
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        old_data_path.unlink(missing_ok=True)
+        self._load()
+
+    def _append_index(self, records: List[Tuple[str, int, int]]) -> None:
+        lines = "".join(json.dumps(list(record)) + "\n" for record in records)
+        with open(self._index_path, "a+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                lines = json.dumps({"generation": self._generation}) + "\n" + lines
+            else:
+                f.seek(end - 1)
+                if f.read(1) != b"\n":
+                    # Terminate a line a crashed writer left unfinished, so ours parse
+                    lines = "\n" + lines
+            f.write(lines.encode("utf-8"))
+        if self._index_id is None:
+            stat = self._index_path.stat()
+            self._index_id = (stat.st_dev, stat.st_ino)
+        self._index_pos = self._index_path.stat().st_size
+
+    def stats(self) -> Dict:
+        return {
+            "chunks": len(self._offsets),
+            "live_bytes": self.live_bytes,
+            "dead_bytes": self._dead_bytes,
+            "generation": self._generation,
+        }
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
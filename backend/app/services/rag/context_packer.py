@@ -0,0 +1,168 @@
+# app/services/rag/context_packer.py
+from typing import List, Dict, Union, Optional, Tuple
+import logging
+import re
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class PackedContext:
+    """Contexts chosen for a prompt, with the token accounting behind the choice."""
+
+    def __init__(self, contexts: List[Dict], tokens_before: int, tokens: int, dropped: int):
+        self.contexts = contexts
+        self.tokens_before = tokens_before
+        self.tokens = tokens
+        self.dropped = dropped
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.tokens_before - self.tokens)
+
+
+class ContextPacker:
+    """
+    Assemble retrieved chunks into a prompt-sized set of contexts.
+
+    TextProcessor chunks overlap by a couple of hundred characters, so the
+    top results often include neighbouring chunks of the same chapter. The
+    packer stitches chunks from the same source file of the same book
+    (several books name their files chapter_01.txt) back together where they
+    are adjacent (consecutive chunk_id) or overlap, drops near-duplicates,
+    and then keeps the best-scoring contexts that fit in the token budget.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        duplicate_threshold: float = 0.8,
+        min_overlap: int = 40,
+        max_overlap: int = 600
+    ):
+        """
+        Args:
+            max_tokens: Estimated token budget for all contexts together
+            duplicate_threshold: Word-shingle Jaccard similarity above which
+                a lower-scoring context counts as a duplicate
+            min_overlap: Shortest shared suffix/prefix (in characters) that
+                counts as an overlap between two chunks
+            max_overlap: Longest overlap searched for
+        """
+        self.max_tokens = max_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.min_overlap = min_overlap
+        self.max_overlap = max_overlap
+
+    def pack(self, contexts: List[Union[str, Dict]]) -> PackedContext:
+        """
+        Merge, deduplicate and budget a list of retrieved contexts.
+
+        Args:
+            contexts: Strings or dictionaries with 'text' and optionally
+                'book', 'source', 'chunk_id' and 'score' keys, best first
+
+        Returns:
+            PackedContext whose contexts are ordered by score
+        """
+        items = [
+            dict(ctx) if isinstance(ctx, dict) else {'text': str(ctx)}
+            for ctx in contexts
+        ]
+        for rank, item in enumerate(items):
+            item.setdefault('score', -rank)
+        tokens_before = sum(estimate_tokens(item.get('text', '')) for item in items)
+
+        merged = self._merge_neighbours(items)
+        unique = self._drop_duplicates(sorted(merged, key=lambda c: c['score'], reverse=True))
+
+        packed, used = [], 0
+        for item in unique:
+            tokens = estimate_tokens(item['text'])
+            if used + tokens <= self.max_tokens:
+                packed.append(item)
+                used += tokens
+            elif not packed:
+                # Always keep the best context, trimmed to the budget
+                item['text'] = item['text'][:self.max_tokens * 4]
+                packed.append(item)
+                used += estimate_tokens(item['text'])
+
+        result = PackedContext(packed, tokens_before, used, dropped=len(items) - len(packed))
+        logger.debug(
+            f"Packed {len(items)} contexts into {len(packed)}: "
+            f"{result.tokens} tokens, {result.tokens_saved} saved"
+        )
+        return result
+
+    def _merge_neighbours(self, items: List[Dict]) -> List[Dict]:
+        """Stitch together chunks of the same document that are adjacent or overlap."""
+        by_source: Dict[Tuple[Optional[str], str], List[Dict]] = {}
+        merged = []
+        for item in items:
+            if item.get('source') is None or item.get('chunk_id') is None:
+                merged.append(item)
+            else:
+                by_source.setdefault((item.get('book'), item['source']), []).append(item)
+
+        for chunks in by_source.values():
+            chunks.sort(key=lambda c: c['chunk_id'])
+            current, last_id = chunks[0], chunks[0]['chunk_id']
+            for chunk in chunks[1:]:
+                if chunk['text'] in current['text']:
+                    overlap, separator = len(chunk['text']), ""
+                else:
+                    overlap = self._overlap(current['text'], chunk['text'])
+                    separator = "" if overlap else "\n"
+                if overlap or chunk['chunk_id'] == last_id + 1:
+                    current = {
+                        **current,
+                        'text': current['text'] + separator + chunk['text'][overlap:],
+                        'score': max(current['score'], chunk['score']),
+                    }
+                else:
+                    merged.append(current)
+                    current = chunk
+                last_id = chunk['chunk_id']
+            merged.append(current)
+        return merged
+
+    def _overlap(self, first: str, second: str) -> int:
+        """Length of the longest suffix of `first` that is a prefix of `second`."""
+        if len(second) < self.min_overlap:
+            return 0
+        tail = first[-self.max_overlap:]
+        probe = second[:self.min_overlap]
+        pos = tail.find(probe)
+        while pos != -1:
+            length = len(tail) - pos
+            if second.startswith(tail[pos:]):
+                return length
+            pos = tail.find(probe, pos + 1)
+        return 0
+
+    def _drop_duplicates(self, items: List[Dict]) -> List[Dict]:
+        """Keep items whose word shingles are not mostly covered by a better item."""
+        kept, kept_shingles = [], []
+        for item in items:
+            shingles = self._shingles(item['text'])
+            if any(self._jaccard(shingles, other) >= self.duplicate_threshold for other in kept_shingles):
+                continue
+            kept.append(item)
+            kept_shingles.append(shingles)
+        return kept
+
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> set:
+        words = _WORD_RE.findall(text.lower())
+        if len(words) < size:
+            return {tuple(words)}
+        return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    @staticmethod
+    def _jaccard(a: set, b: set) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -1,42 +1,212 @@
 # app/services/rag/embedder.py
-from typing import List, Union
+from typing import List, Union, Optional
+from pathlib import Path
+import asyncio
+import random
+import time
 import numpy as np
 from openai import AsyncOpenAI  # Note the AsyncOpenAI import
+from openai import RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+from .embedding_cache import EmbeddingCache
+from .micro_batcher import MicroBatcher
+from .tokens import estimate_tokens
+from ...core.metrics import EMBEDDING_TOKENS
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Errors worth retrying: the batch itself is fine, the provider is not
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+class EmbeddingStats:
+    """Running totals used for the throughput report."""
+
+    def __init__(self):
+        self.texts = 0
+        self.tokens = 0
+        self.requests = 0
+        self.retries = 0
+        self.seconds = 0.0
+
+    def report(self) -> str:
+        seconds = max(self.seconds, 1e-9)
+        return (
+            f"Embedded {self.texts} texts ({self.tokens} tokens) in {self.requests} requests "
+            f"over {self.seconds:.2f}s: {self.texts / seconds:.1f} texts/s, "
+            f"{self.tokens / seconds:.1f} tokens/s, {self.retries} retries"
+        )
+
+
 class Embedder:
-    def __init__(self, api_key: str, model: str = "text-embedding-3-small"):
-        self.client = AsyncOpenAI(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "text-embedding-3-small",
+        cache_path: Optional[Path] = None,
+        max_concurrency: int = 4,
+        index_concurrency: Optional[int] = None,
+        max_batch_tokens: int = 100_000,
+        max_retries: int = 5,
+        micro_batch_size: int = 64,
+        micro_batch_wait: float = 0.005
+    ):
+        """
+        Args:
+            api_key: OpenAI API key
+            model: Embedding model name
+            cache_path: SQLite file for cached embeddings (None disables caching)
+            max_concurrency: Number of embedding requests kept in flight
+            index_concurrency: Requests kept in flight for indexing (defaults
+                to `max_concurrency`). Indexing has its own limiter, so
+                question embeddings never queue behind an index job
+            max_batch_tokens: Estimated token budget of a single request
+            max_retries: Attempts per batch on rate limits and transient errors
+            micro_batch_size: Most single-text requests coalesced into one API call
+            micro_batch_wait: Longest wait in seconds for other single-text
+                requests to share a call (0 sends each one on its own)
+        """
+        # Retries are handled per batch below so a failure only re-sends that batch
+        self.client = AsyncOpenAI(api_key=api_key, max_retries=0)
         self.model = model
-    
+        self.cache = EmbeddingCache(cache_path) if cache_path else None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.max_concurrency = max_concurrency
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.stats = EmbeddingStats()
+        self.index_concurrency = index_concurrency or max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._index_semaphore = asyncio.Semaphore(self.index_concurrency)
+        # Concurrent question embeddings share API calls instead of sending one text each
+        self.batcher = None
+        if micro_batch_wait > 0 and micro_batch_size > 1:
+            self.batcher = MicroBatcher(self._embed_batch, max_batch_size=micro_batch_size, max_wait=micro_batch_wait)
+
+    def _make_batches(self, texts: List[str], indices: List[int], batch_size: int) -> List[List[int]]:
+        """Group text indices into batches bounded by count and estimated tokens."""
+        batches, current, current_tokens = [], [], 0
+        for i in indices:
+            tokens = estimate_tokens(texts[i])
+            if current and (len(current) >= batch_size or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(i)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        """Honour the provider's retry-after header, else back off exponentially."""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        return min(30.0, 0.5 * 2 ** attempt) * (0.5 + random.random() / 2)
+
+    async def _embed_batch(self, batch: List[str], background: bool = False) -> List[List[float]]:
+        """Embed one batch, retrying it alone on rate limits and transient errors."""
+        semaphore = self._index_semaphore if background else self._semaphore
+        attempt = 0
+        while True:
+            async with semaphore:
+                try:
+                    response = await self.client.embeddings.create(
+                        model=self.model,
+                        input=batch
+                    )
+                    break
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    error = e
+                    delay = self._retry_delay(e, attempt)
+            # Sleep outside the semaphore so other batches can use the slot
+            attempt += 1
+            self.stats.retries += 1
+            logger.warning(f"Embedding batch failed ({error.__class__.__name__}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+        usage = getattr(response, "usage", None)
+        self.stats.requests += 1
+        self.stats.texts += len(batch)
+        tokens = getattr(usage, "total_tokens", None) or sum(estimate_tokens(t) for t in batch)
+        self.stats.tokens += tokens
+        EMBEDDING_TOKENS.inc(tokens)
+        batch_embeddings = [data.embedding for data in response.data]
+        if self.cache is not None:
+            self.cache.put_many(self.model, batch, batch_embeddings)
+        return batch_embeddings
+
+    async def warm_up(self) -> None:
+        """Open the HTTP connection to the embeddings API with a tiny request."""
+        await self.client.embeddings.create(model=self.model, input=["warm up"])
+
+    async def _embed_single(self, text: str) -> List[float]:
+        if self.cache is not None:
+            cached = self.cache.get_many(self.model, [text])[0]
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+        self.cache_misses += 1
+        return await self.batcher.submit(text)
+
     # app/services/rag/embedder.py
-    async def embed_text(self, text: Union[str, List[str]], batch_size: int = 100) -> Union[List[float], List[List[float]]]:
+    async def embed_text(
+        self,
+        text: Union[str, List[str]],
+        batch_size: int = 100,
+        background: bool = False
+    ) -> Union[List[float], List[List[float]]]:
         """
         Generate embeddings for a single text or list of texts.
-        Handles batching automatically for large lists.
+        Handles batching automatically for large lists: batches are bounded
+        by `batch_size` texts and `max_batch_tokens`, and up to
+        `max_concurrency` of them are in flight at once (`index_concurrency`
+        for `background` work such as indexing). When a cache is
+        configured only texts without a cached embedding are sent upstream.
+        A single string goes through the micro-batcher, so concurrent
+        callers share one request.
         """
         try:
+            if isinstance(text, str) and self.batcher is not None and not background:
+                return await self._embed_single(text)
+
             # Convert single string to list
             if isinstance(text, str):
                 text = [text]
-                
-            all_embeddings = []
-            # Process in batches
-            for i in range(0, len(text), batch_size):
-                batch = text[i:i + batch_size]
-                response = await self.client.embeddings.create(
-                    model=self.model,
-                    input=batch
-                )
-                batch_embeddings = [data.embedding for data in response.data]
-                all_embeddings.extend(batch_embeddings)
-                
+
+            if self.cache is not None:
+                all_embeddings = self.cache.get_many(self.model, text)
+            else:
+                all_embeddings = [None] * len(text)
+            missing = [i for i, embedding in enumerate(all_embeddings) if embedding is None]
+            self.cache_hits += len(text) - len(missing)
+            self.cache_misses += len(missing)
+
+            # Process misses in concurrent batches
+            if missing:
+                start = time.perf_counter()
+                batches = self._make_batches(text, missing, batch_size)
+                results = await asyncio.gather(*(
+                    self._embed_batch([text[j] for j in batch_idx], background) for batch_idx in batches
+                ))
+                for batch_idx, batch_embeddings in zip(batches, results):
+                    for j, embedding in zip(batch_idx, batch_embeddings):
+                        all_embeddings[j] = embedding
+                self.stats.seconds += time.perf_counter() - start
+
             return all_embeddings[0] if len(all_embeddings) == 1 else all_embeddings
-                
+
         except Exception as e:
             logger.error(f"Error generating embeddings: {e}")
             raise
-            
-            
+
+
@@ -0,0 +1,91 @@
+# app/services/rag/manifest.py
+from typing import List, Dict, Optional, Set, Tuple
+from pathlib import Path
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def stable_chunk_id(document: str, text: str) -> str:
+    """Content-derived vector ID: the document key plus a hash of the chunk text."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+    return f"{document}#{digest}"
+
+
+class IndexManifest:
+    """
+    Local record of which chunk IDs are indexed for each document.
+
+    Documents are keyed as "<directory name>/<file name>" so books with the
+    same chapter file names do not overwrite each other. Comparing a fresh
+    run of TextProcessor against the manifest, one document at a time,
+    tells the pipeline which chunks are new and which vectors are stale.
+    IDs are kept in chunk order, so a chunk's position is its `chunk_id`
+    ordinal and unchanged chunks that moved can be told apart.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: JSON file to persist the manifest to. When None the
+                manifest only lives in memory.
+        """
+        self.path = Path(path) if path else None
+        self.documents: Dict[str, List[str]] = {}
+        if self.path and self.path.exists():
+            with open(self.path) as f:
+                self.documents = json.load(f).get("documents", {})
+
+    def diff(self, document: str, chunks: List[Dict]) -> Tuple[List[Dict], List[Dict], List[str]]:
+        """
+        Compare the freshly processed chunks of one document against the manifest.
+
+        Args:
+            document: Document key
+            chunks: The document's chunks, in order; every chunk needs an 'id'
+
+        Returns:
+            (chunks that are not indexed yet, indexed chunks whose position
+            changed and whose metadata is therefore stale, IDs that should
+            be removed)
+        """
+        # A repeated ID is indexed with the metadata of its last occurrence
+        indexed = {chunk_id: i for i, chunk_id in enumerate(self.documents.get(document, []))}
+        current = {chunk["id"]: i for i, chunk in enumerate(chunks)}
+        new_chunks = [chunk for chunk in chunks if chunk["id"] not in indexed]
+        moved_chunks = [
+            chunk for i, chunk in enumerate(chunks)
+            if current[chunk["id"]] == i and indexed.get(chunk["id"], i) != i
+        ]
+        return new_chunks, moved_chunks, sorted(indexed.keys() - current.keys())
+
+    def update(self, document: str, chunks: List[Dict]) -> None:
+        """Record `chunks` as the indexed content of `document`."""
+        self.documents[document] = [chunk["id"] for chunk in chunks]
+
+    def missing_documents(self, prefix: str, seen: Set[str]) -> List[str]:
+        """Documents under `prefix` that were not seen in the latest run."""
+        return [d for d in self.documents if d.startswith(prefix) and d not in seen]
+
+    def remove_document(self, document: str) -> List[str]:
+        """Forget a document, returning the IDs that were indexed for it."""
+        return list(dict.fromkeys(self.documents.pop(document, [])))
+
+    def clear(self) -> None:
+        self.documents = {}
+
+    def __len__(self) -> int:
+        return sum(len(set(ids)) for ids in self.documents.values())
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            # A copy, so the save can run on a worker thread while documents are updated
+            json.dump({"documents": dict(self.documents)}, f)
+        tmp_path.replace(self.path)
+        logger.info(f"Saved manifest with {len(self)} chunks to {self.path}")
@@ -0,0 +1,132 @@
+# app/services/rag/micro_batcher.py
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesce single-item calls that arrive close together into one batched call.
+
+    Each `submit` queues an item and waits on a future. The queue is flushed
+    as one call to `fn` when it reaches `max_batch_size` or when the wait
+    window closes, and every caller gets its own result back.
+
+    The window adapts to load. Gaps between arrivals are tracked as an
+    exponential moving average that restarts after any pause of `max_wait`
+    or more. While requests arrive that far apart, waiting could not gather
+    a second item, so the window is zero and a lone request is sent on the
+    next event loop tick (items submitted in the same tick still share a
+    call). Under load the window grows to the time needed to fill a batch
+    at the current arrival rate, capped at `max_wait`.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 64,
+        max_wait: float = 0.005,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            fn: Coroutine function mapping a list of items to a list of results in the same order
+            max_batch_size: Most items sent in one call
+            max_wait: Longest time in seconds the first item of a batch waits for others
+            smoothing: Weight of the newest gap in the arrival-gap moving average
+            clock: Time source, overridable for tests
+        """
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        self._clock = clock
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._last_arrival: Optional[float] = None
+        # Start out assuming an idle service so the first request is not delayed
+        self._gap = max_wait
+        self.batches = 0
+        self.items = 0
+
+    def window(self) -> float:
+        """Seconds the next batch will wait for more items at the current arrival rate."""
+        if self._gap >= self.max_wait:
+            return 0.0
+        return min(self.max_wait, self._gap * (self.max_batch_size - 1))
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one item and wait for its result.
+
+        Args:
+            item: Input for `fn`
+
+        Returns:
+            The result `fn` produced for this item
+        """
+        loop = asyncio.get_running_loop()
+        now = self._clock()
+        gap = self.max_wait if self._last_arrival is None else now - self._last_arrival
+        if gap >= self.max_wait:
+            # A pause in traffic: the burst that follows starts from idle again
+            self._gap = self.max_wait
+        else:
+            self._gap += self.smoothing * (gap - self._gap)
+        self._last_arrival = now
+
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            window = self.window()
+            if window > 0:
+                self._flush_handle = loop.call_later(window, self._flush)
+            else:
+                self._flush_handle = loop.call_soon(self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+        if self._pending:
+            # More than one batch queued up: send the rest right after
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+        # Callers that were cancelled while waiting no longer need a result
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        self.batches += 1
+        self.items += len(batch)
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.fn([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "window_ms": round(self.window() * 1000, 3),
+            "pending": len(self._pending),
+        }
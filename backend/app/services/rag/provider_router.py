@@ -0,0 +1,311 @@
+# app/services/rag/provider_router.py
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from collections import deque
+import asyncio
+import logging
+import time
+from ...core.metrics import LLM_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderHealth:
+    """
+    Rolling latency and error window for one LLM provider, plus its circuit breaker.
+
+    The breaker opens after `failure_threshold` consecutive failures and
+    stays open for `reset_timeout` seconds. After that a single trial
+    request is let through (half-open): success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 100,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self._trial_in_flight)
+
+    def on_start(self) -> None:
+        if self.state == "half_open":
+            self._trial_in_flight = True
+
+    def on_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        if self.opened_at is not None:
+            logger.info(f"Circuit for {self.name} closed")
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def on_failure(self) -> None:
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None or self.state == "half_open":
+                logger.warning(f"Circuit for {self.name} opened after {self.consecutive_failures} failures")
+            self.opened_at = self._clock()
+
+    def on_cancel(self) -> None:
+        """A hedged request lost the race; it says nothing about provider health."""
+        self._trial_in_flight = False
+
+    def on_outrun(self, elapsed: float) -> None:
+        """
+        Record a lower bound on the latency of a request that was cancelled
+        after another provider, started later, answered first.
+        """
+        self.latencies.append(elapsed)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    def stats(self) -> Dict:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "state": self.state,
+            "requests": len(self.outcomes),
+            "error_rate": round(self.error_rate, 3),
+            "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+            "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+        }
+
+
+class ProviderRouter:
+    """
+    Routes each LLM call to the fastest healthy provider.
+
+    Providers are ranked by median latency, penalized by their recent
+    error rate; providers without measurements yet are tried first, in
+    configured order. With hedging enabled, if the chosen provider has not
+    answered after its own p95 latency a second provider is started and
+    the first answer wins. The loser's time so far is kept as a latency
+    sample, so a slow provider that never finishes a race still drops in
+    the ranking. A failed call falls over to the next provider.
+
+    Providers are anything with LangChain's `ainvoke`/`astream` interface,
+    so tests can plug in local fakes.
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, Any],
+        hedge: bool = True,
+        hedge_delay: float = 2.0,
+        min_hedge_delay: float = 0.05,
+        min_samples: int = 10,
+        error_penalty: float = 4.0,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            providers: Provider name -> runnable, in order of preference
+            hedge: Start a second provider when the first one is slow
+            hedge_delay: Hedge delay used until a provider has `min_samples` latencies
+            min_hedge_delay: Lower bound on the p95-based hedge delay
+            min_samples: Latencies needed before the measured p95 is trusted
+            error_penalty: How strongly the error rate inflates a provider's latency score
+            failure_threshold: Consecutive failures that open a provider's circuit
+            reset_timeout: Seconds an open circuit waits before a trial request
+            clock: Time source (injectable for tests)
+        """
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = dict(providers)
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.min_samples = min_samples
+        self.error_penalty = error_penalty
+        self._clock = clock
+        self.health = {
+            name: ProviderHealth(name, failure_threshold=failure_threshold, reset_timeout=reset_timeout, clock=clock)
+            for name in self.providers
+        }
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    def ranked(self) -> List[str]:
+        """Available providers, best first."""
+        order = {name: i for i, name in enumerate(self.providers)}
+
+        def score(name: str) -> Tuple:
+            health = self.health[name]
+            p50 = health.percentile(0.5)
+            if p50 is None:
+                return (0, 0.0, order[name])
+            return (1, p50 * (1 + self.error_penalty * health.error_rate), order[name])
+
+        return sorted((n for n in self.providers if self.health[n].available()), key=score)
+
+    def _hedge_delay(self, name: str) -> float:
+        health = self.health[name]
+        if len(health.latencies) < self.min_samples:
+            return self.hedge_delay
+        return max(self.min_hedge_delay, health.percentile(0.95))
+
+    async def _call(self, name: str, inputs: Dict) -> Tuple[str, Any]:
+        health = self.health[name]
+        health.on_start()
+        start = self._clock()
+        try:
+            result = await self.providers[name].ainvoke(inputs)
+        except asyncio.CancelledError:
+            health.on_cancel()
+            LLM_REQUESTS.inc(provider=name, outcome="cancelled")
+            raise
+        except Exception as e:
+            health.on_failure()
+            LLM_REQUESTS.inc(provider=name, outcome="error")
+            logger.warning(f"LLM provider {name} failed: {e}")
+            raise
+        health.on_success(self._clock() - start)
+        LLM_REQUESTS.inc(provider=name, outcome="success")
+        return name, result
+
+    async def ainvoke(self, inputs: Dict) -> Tuple[str, Any]:
+        """
+        Run the inputs through the best provider.
+
+        Returns:
+            (name of the provider that answered, its output)
+        """
+        candidates = self.ranked()
+        if not candidates:
+            raise RuntimeError("No LLM provider available: all circuits are open")
+
+        last_error: Optional[BaseException] = None
+        running: Dict[asyncio.Task, str] = {}
+        started: Dict[asyncio.Task, float] = {}
+        hedged = set()
+
+        def launch(name: str) -> asyncio.Task:
+            task = asyncio.create_task(self._call(name, inputs))
+            running[task] = name
+            started[task] = self._clock()
+            return task
+
+        try:
+            while candidates or running:
+                if not running:
+                    name = candidates.pop(0)
+                    if last_error is not None:
+                        self.failovers += 1
+                    launch(name)
+
+                timeout = None
+                if self.hedge and candidates and len(running) == 1:
+                    timeout = self._hedge_delay(next(iter(running.values())))
+                done, _ = await asyncio.wait(running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    # The request is slower than the provider's p95: race a second provider
+                    name = candidates.pop(0)
+                    self.hedges += 1
+                    logger.info(f"Hedging slow LLM request with {name}")
+                    hedged.add(launch(name))
+                    continue
+
+                for task in done:
+                    name = running.pop(task)
+                    if task.exception() is None:
+                        if task in hedged:
+                            self.hedge_wins += 1
+                        now = self._clock()
+                        for loser, loser_name in running.items():
+                            if started[loser] <= started[task]:
+                                self.health[loser_name].on_outrun(now - started[loser])
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            # Cancel the losing side of a hedge
+            for task in running:
+                task.cancel()
+
+    async def astream(self, inputs: Dict) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream from the best provider, falling over before the first chunk.
+
+        Once a provider has produced output the stream is committed to it;
+        streams are not hedged.
+
+        Yields:
+            (provider name, output chunk)
+        """
+        last_error: Optional[BaseException] = None
+        for attempt, name in enumerate(self.ranked()):
+            if attempt:
+                self.failovers += 1
+            health = self.health[name]
+            health.on_start()
+            start = self._clock()
+            started = False
+            try:
+                async for chunk in self.providers[name].astream(inputs):
+                    started = True
+                    yield name, chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                health.on_cancel()
+                LLM_REQUESTS.inc(provider=name, outcome="cancelled")
+                raise
+            except Exception as e:
+                health.on_failure()
+                LLM_REQUESTS.inc(provider=name, outcome="error")
+                logger.warning(f"LLM provider {name} failed while streaming: {e}")
+                if started:
+                    raise
+                last_error = e
+                continue
+            health.on_success(self._clock() - start)
+            LLM_REQUESTS.inc(provider=name, outcome="success")
+            return
+        if last_error is None:
+            raise RuntimeError("No LLM provider available: all circuits are open")
+        raise last_error
+
+    def stats(self) -> Dict:
+        return {
+            "providers": {name: health.stats() for name, health in self.health.items()},
+            "ranking": self.ranked(),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+        }
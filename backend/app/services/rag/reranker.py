@@ -0,0 +1,191 @@
+# app/services/rag/reranker.py
+from typing import List, Dict, Optional
+from collections import Counter
+import asyncio
+import logging
+import math
+from .bm25 import tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class Reranker:
+    """
+    Reorders over-fetched retrieval candidates so only the best few reach the prompt.
+
+    Candidates are the chunk dictionaries returned by VectorStore.query
+    ('text', 'score', ...). Rerankers return at most `top_n` of them with
+    'score' replaced by the rerank score and the retrieval score kept
+    under 'retrieval_score'.
+    """
+
+    async def rerank(self, query: str, candidates: List[Dict], top_n: int) -> List[Dict]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _rescored(candidate: Dict, score: float) -> Dict:
+        return {**candidate, 'score': float(score), 'retrieval_score': candidate.get('score')}
+
+    @staticmethod
+    def _normalized(values: List[float]) -> List[float]:
+        """Min-max scale to [0, 1] so scores from different scorers can be blended."""
+        if not values:
+            return []
+        low, high = min(values), max(values)
+        if high - low < 1e-12:
+            return [1.0] * len(values)
+        return [(v - low) / (high - low) for v in values]
+
+
+class LexicalReranker(Reranker):
+    """
+    BM25 over the candidate set, blended with the retrieval score.
+
+    Statistics come from the candidates themselves, so no index is
+    needed; this rescues chunks that share the question's exact terms but
+    were ranked low by the embedding.
+    """
+
+    def __init__(self, weight: float = 0.5, k1: float = 1.5, b: float = 0.75):
+        """
+        Args:
+            weight: Share of the final score taken by the lexical score
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+        """
+        self.weight = weight
+        self.k1 = k1
+        self.b = b
+
+    async def rerank(self, query: str, candidates: List[Dict], top_n: int) -> List[Dict]:
+        if not candidates:
+            return []
+        query_terms = set(tokenize(query))
+        docs = [Counter(tokenize(c.get('text', ''))) for c in candidates]
+        avg_len = max(sum(sum(d.values()) for d in docs) / len(docs), 1e-9)
+        df = Counter(term for d in docs for term in query_terms if term in d)
+
+        lexical = []
+        for doc in docs:
+            length = sum(doc.values())
+            score = 0.0
+            for term in query_terms:
+                tf = doc.get(term, 0)
+                if tf:
+                    idf = math.log1p((len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+                    score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_len))
+            lexical.append(score)
+
+        retrieval = self._normalized([c.get('score') or 0.0 for c in candidates])
+        lexical = self._normalized(lexical)
+        scored = [
+            self._rescored(c, (1 - self.weight) * r + self.weight * l)
+            for c, r, l in zip(candidates, retrieval, lexical)
+        ]
+        scored.sort(key=lambda c: c['score'], reverse=True)
+        return scored[:top_n]
+
+
+class MMRReranker(Reranker):
+    """
+    Maximal marginal relevance: trade relevance against redundancy.
+
+    Each pick maximizes weighted relevance minus the highest word-set
+    overlap with the chunks already picked, so the prompt gets several
+    different passages instead of near-copies of one. Scores are assigned
+    by pick order so later stages keep that order.
+    """
+
+    def __init__(self, relevance_weight: float = 0.7):
+        """
+        Args:
+            relevance_weight: 1.0 ranks purely by retrieval score, 0.0 purely by novelty
+        """
+        self.relevance_weight = relevance_weight
+
+    async def rerank(self, query: str, candidates: List[Dict], top_n: int) -> List[Dict]:
+        # Scale by the best score rather than min-max, which would turn a
+        # tiny score gap into the full relevance range
+        scores = [c.get('score') or 0.0 for c in candidates]
+        best_score = max(scores, default=0.0)
+        relevance = [s / best_score if best_score > 0 else 1.0 for s in scores]
+        terms = [set(tokenize(c.get('text', ''))) for c in candidates]
+        remaining = list(range(len(candidates)))
+        picked: List[int] = []
+        results = []
+        while remaining and len(picked) < top_n:
+            def marginal(i: int) -> float:
+                redundancy = max((self._overlap(terms[i], terms[j]) for j in picked), default=0.0)
+                return self.relevance_weight * relevance[i] - (1 - self.relevance_weight) * redundancy
+            best = max(remaining, key=marginal)
+            results.append(self._rescored(candidates[best], 1.0 / (1 + len(picked))))
+            picked.append(best)
+            remaining.remove(best)
+        return results
+
+    @staticmethod
+    def _overlap(a: set, b: set) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
+
+
+class CrossEncoderReranker(Reranker):
+    """
+    Small local cross-encoder (sentence-transformers) scoring question/chunk pairs on CPU.
+
+    The model is loaded on first use and scored on a worker thread so the
+    event loop keeps serving other requests.
+    """
+
+    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2", batch_size: int = 32):
+        """
+        Args:
+            model_name: sentence-transformers cross-encoder model
+            batch_size: Pairs scored per forward pass
+        """
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "The cross-encoder reranker needs the sentence-transformers package"
+            ) from e
+        self._model_class = CrossEncoder
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+
+    def _score(self, query: str, texts: List[str]) -> List[float]:
+        if self._model is None:
+            self._model = self._model_class(self.model_name, device="cpu")
+            logger.info(f"Loaded cross-encoder {self.model_name}")
+        return list(self._model.predict([(query, t) for t in texts], batch_size=self.batch_size))
+
+    async def rerank(self, query: str, candidates: List[Dict], top_n: int) -> List[Dict]:
+        if not candidates:
+            return []
+        scores = await asyncio.to_thread(self._score, query, [c.get('text', '') for c in candidates])
+        scored = [self._rescored(c, s) for c, s in zip(candidates, scores)]
+        scored.sort(key=lambda c: c['score'], reverse=True)
+        return scored[:top_n]
+
+
+def create_reranker(name: Optional[str]) -> Optional[Reranker]:
+    """
+    Create a reranker by name.
+
+    Args:
+        name: One of "none", "lexical", "mmr" or "cross-encoder"
+
+    Returns:
+        The reranker, or None when reranking is disabled
+    """
+    if not name or name == "none":
+        return None
+    if name == "lexical":
+        return LexicalReranker()
+    if name == "mmr":
+        return MMRReranker()
+    if name == "cross-encoder":
+        return CrossEncoderReranker()
+    raise ValueError("Reranker must be one of 'none', 'lexical', 'mmr' or 'cross-encoder'")
@@ -0,0 +1,261 @@
+# app/services/rag/sessions.py
+from typing import List, Dict, Optional, Callable
+from collections import OrderedDict
+import logging
+import re
+import secrets
+import time
+import numpy as np
+from .tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Follow-ups this short ("why?", "explain more") embed too vaguely to
+# reach the full reuse threshold, so they get the lower follow-up one
+_FOLLOW_UP_MAX_WORDS = 4
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def first_sentence(text: str, max_chars: int = 200) -> str:
+    """The first sentence of `text`, cut to `max_chars`."""
+    text = " ".join(text.split())
+    sentence = _SENTENCE_END_RE.split(text, 1)[0]
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 3].rstrip() + "..."
+
+
+class Turn:
+    __slots__ = ("question", "answer", "sources")
+
+    def __init__(self, question: str, answer: str, sources: List[str]):
+        self.question = question
+        self.answer = answer
+        self.sources = sources
+
+    def render(self) -> str:
+        return f"Student: {self.question}\nTutor: {self.answer}"
+
+    def to_dict(self) -> Dict:
+        return {"question": self.question, "answer": self.answer, "sources": self.sources}
+
+
+class TutorSession:
+    """
+    One student's conversation: the recent turns verbatim, older turns as
+    a running summary, and what the last turn retrieved.
+    """
+
+    def __init__(self, session_id: str, scope: Optional[Dict], created: float):
+        self.id = session_id
+        self.scope = scope
+        self.created = created
+        self.updated = created
+        self.turns: List[Turn] = []
+        # One line per rolled-up turn, oldest first
+        self.summary: List[str] = []
+        self.contexts: List[Dict] = []
+        self.query_embedding: Optional[np.ndarray] = None
+        self.size = 0
+
+    def history(self) -> str:
+        """The conversation so far, as it goes into the prompt."""
+        parts = []
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + "\n".join(f"- {line}" for line in self.summary))
+        parts.extend(turn.render() for turn in self.turns)
+        return "\n\n".join(parts)
+
+    def estimate_size(self) -> int:
+        # Character counts are a close enough proxy for the bound we need
+        size = sum(len(turn.question) + len(turn.answer) + sum(map(len, turn.sources)) for turn in self.turns)
+        size += sum(map(len, self.summary))
+        size += sum(len(ctx.get("text", "")) + 64 for ctx in self.contexts)
+        if self.query_embedding is not None:
+            size += self.query_embedding.nbytes
+        return size
+
+    def to_dict(self) -> Dict:
+        return {
+            "session_id": self.id,
+            "scope": self.scope,
+            "summary": list(self.summary),
+            "turns": [turn.to_dict() for turn in self.turns],
+        }
+
+
+class SessionStore:
+    """
+    In-memory tutoring sessions under a count and memory bound.
+
+    Sessions are kept in LRU order and evicted oldest-first once either
+    bound is exceeded; a session idle for longer than `ttl_seconds` is
+    dropped when next looked up. Each session's prompt history is held to
+    `history_tokens`: when a new turn pushes it over, the oldest turns are
+    rolled up into one-line summaries (the question and the first sentence
+    of the answer), and the oldest summary lines are dropped once the
+    summary alone takes more than a third of the budget.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        max_bytes: int = 16 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        history_tokens: int = 600,
+        reuse_threshold: float = 0.7,
+        follow_up_threshold: float = 0.3,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            max_sessions: Maximum number of live sessions
+            max_bytes: Approximate memory bound for all sessions together
+            ttl_seconds: Idle time after which a session expires
+            history_tokens: Estimated token budget for a session's prompt history
+            reuse_threshold: Minimum cosine similarity between a follow-up and
+                the previous question for the previous contexts to be reused
+            follow_up_threshold: Lower similarity that suffices for short
+                follow-ups such as "why?"
+            clock: Time source, overridable for tests
+        """
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.history_tokens = history_tokens
+        self.reuse_threshold = reuse_threshold
+        self.follow_up_threshold = follow_up_threshold
+        self._clock = clock
+        self._sessions: "OrderedDict[str, TutorSession]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {
+            "created": 0,
+            "turns": 0,
+            "context_reuses": 0,
+            "summarized_turns": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, scope: Optional[Dict] = None) -> TutorSession:
+        """Start a session whose retrieval is restricted to `scope`."""
+        session = TutorSession(secrets.token_urlsafe(16), scope, self._clock())
+        self._sessions[session.id] = session
+        self._stats["created"] += 1
+        self._evict()
+        return session
+
+    def get(self, session_id: str) -> Optional[TutorSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._clock() - session.updated > self.ttl_seconds:
+            self._remove(session_id)
+            self._stats["expirations"] += 1
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        if session_id not in self._sessions:
+            return False
+        self._remove(session_id)
+        return True
+
+    def reusable_contexts(
+        self,
+        session: TutorSession,
+        question: str,
+        query_embedding: Optional[List[float]]
+    ) -> Optional[List[Dict]]:
+        """
+        The previous turn's contexts, if they are still relevant to `question`.
+
+        They are when the question's embedding is close enough to the
+        previous question's: within `reuse_threshold`, or within the lower
+        `follow_up_threshold` for a short follow-up. Without embeddings
+        (lexical retrieval) relevance cannot be judged, so the index is
+        always queried.
+        """
+        if not session.contexts or query_embedding is None or session.query_embedding is None:
+            return None
+        query = self._normalize(query_embedding)
+        if query.shape != session.query_embedding.shape:
+            return None
+        short = len(question.split()) <= _FOLLOW_UP_MAX_WORDS
+        threshold = self.follow_up_threshold if short else self.reuse_threshold
+        if float(query @ session.query_embedding) < threshold:
+            return None
+        return session.contexts
+
+    def record(
+        self,
+        session: TutorSession,
+        question: str,
+        result: Dict,
+        contexts: List[Dict],
+        query_embedding: Optional[List[float]],
+        reused: bool = False
+    ) -> None:
+        """
+        Add an answered turn to a session and roll up its history to the budget.
+
+        Args:
+            session: The session the question was asked in
+            question: The student's question
+            result: The generated answer, with 'answer' and 'sources' keys
+            contexts: The contexts the answer was generated from
+            query_embedding: Embedding of the question the contexts were retrieved for
+            reused: The contexts were carried over from the previous turn
+        """
+        session.turns.append(Turn(question, result["answer"], result.get("sources", [])))
+        if reused:
+            self._stats["context_reuses"] += 1
+        else:
+            # Later follow-ups are compared with the question the contexts were retrieved for
+            session.contexts = contexts
+            session.query_embedding = None if query_embedding is None else self._normalize(query_embedding)
+        session.updated = self._clock()
+        self._stats["turns"] += 1
+        self._roll_up(session)
+
+        if session.id in self._sessions:
+            self._bytes -= session.size
+            session.size = session.estimate_size()
+            self._bytes += session.size
+            self._sessions.move_to_end(session.id)
+            self._evict()
+
+    def stats(self) -> Dict:
+        return {**self._stats, "sessions": len(self._sessions), "bytes": self._bytes}
+
+    def _roll_up(self, session: TutorSession) -> None:
+        # The latest turn always stays verbatim
+        while len(session.turns) > 1 and estimate_tokens(session.history()) > self.history_tokens:
+            turn = session.turns.pop(0)
+            session.summary.append(f"Asked: {first_sentence(turn.question)} Answered: {first_sentence(turn.answer)}")
+            self._stats["summarized_turns"] += 1
+        summary_budget = self.history_tokens // 3
+        while session.summary and estimate_tokens("\n".join(session.summary)) > summary_budget:
+            session.summary.pop(0)
+        overflow = estimate_tokens(session.history()) - self.history_tokens
+        if overflow > 0:
+            # A single turn longer than the budget keeps the start of its answer
+            last = session.turns[-1]
+            last.answer = last.answer[:max(0, len(last.answer) - 4 * overflow - 3)].rstrip() + "..."
+
+    def _evict(self) -> None:
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            oldest = next(iter(self._sessions))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def _remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.size
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
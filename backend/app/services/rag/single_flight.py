@@ -0,0 +1,59 @@
+# app/services/rag/single_flight.py
+from typing import Dict, Callable, Awaitable, Any
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task instead of starting their own. The
+    key is released as soon as the task finishes, so nothing is cached
+    beyond the lifetime of the in-flight call. Callers await the task
+    through `asyncio.shield`, so one caller disconnecting does not cancel
+    the work the others are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn` for `key`, or join the run already in flight.
+
+        Args:
+            key: Identity of the work, e.g. a normalized question
+            fn: Zero-argument coroutine function doing the work
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._release(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Marks the exception as retrieved even if every caller went away
+            logger.debug(f"Shared call for {key!r} failed: {task.exception()}")
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
@@ -1,11 +1,32 @@
 # app/services/rag/text_processor.py
-from typing import List, Dict
+from typing import List, Dict, Optional, AsyncIterator
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import asyncio
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=None)
+def _worker_processor(chunk_size: int, chunk_overlap: int) -> "TextProcessor":
+    # One splitter per worker process, reused across files
+    return TextProcessor(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+
+
+def _process_file(file_path: str, chunk_size: int, chunk_overlap: int) -> List[Dict]:
+    """Read and split one chapter file. Runs in a worker process."""
+    path = Path(file_path)
+    metadata = {
+        "chapter": int(path.stem.split("_")[1]),
+        "source": path.name
+    }
+    return _worker_processor(chunk_size, chunk_overlap).process_document(path.read_text(), metadata)
+
+
 class TextProcessor:
     def __init__(self, chunk_size: int = 2000, chunk_overlap: int = 200):
         self.chunk_size = chunk_size
@@ -35,6 +56,57 @@ class TextProcessor:
             logger.error(f"Error processing document: {e}")
             raise
 
+    async def iter_directory(self, directory: Path, max_workers: Optional[int] = None) -> AsyncIterator[List[Dict]]:
+        """
+        Process the text files in a directory on a process pool, yielding the
+        chunks of each file as soon as it has been split.
+        
+        At most `2 * max_workers` files are in flight, so memory stays
+        bounded by how fast the caller consumes the chunks rather than by
+        the size of the directory.
+        
+        Args:
+            directory: Path to directory containing text files
+            max_workers: Worker processes (defaults to the CPU count)
+            
+        Yields:
+            The chunks of one file, with metadata
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        loop = asyncio.get_running_loop()
+        files = sorted(directory.glob("*.txt"))
+        pending = set()
+        order = {}
+        # Shut down by hand: leaving a `with` block would wait for every
+        # in-flight file even when the consumer has stopped or been cancelled
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        try:
+            file_iter = iter(files)
+            while True:
+                for file_path in file_iter:
+                    future = loop.run_in_executor(
+                        executor, _process_file, str(file_path), self.chunk_size, self.chunk_overlap
+                    )
+                    order[future] = len(order)
+                    pending.add(future)
+                    if len(pending) >= 2 * max_workers:
+                        break
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                # Files that finished together come out in directory order
+                for future in sorted(done, key=order.pop):
+                    yield future.result()
+        except BaseException as e:
+            # Also reached on cancellation and when the caller closes the iterator early
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if isinstance(e, Exception):
+                logger.error(f"Error processing directory {directory}: {e}")
+            raise
+        executor.shutdown(wait=True)
+
     async def process_directory(self, directory: Path) -> List[Dict]:
         """
         Process all text files in a directory.
@@ -46,23 +118,9 @@ class TextProcessor:
             List of all chunks with metadata
         """
         all_chunks = []
-        try:
-            for file_path in directory.glob("*.txt"):
-                chapter_num = int(file_path.stem.split("_")[1])
-                text = file_path.read_text()
-                
-                metadata = {
-                    "chapter": chapter_num,
-                    "source": file_path.name
-                }
-                
-                chunks = self.process_document(text, metadata)
-                all_chunks.extend(chunks)
-                
-            return all_chunks
-        except Exception as e:
-            logger.error(f"Error processing directory {directory}: {e}")
-            raise
+        async for chunks in self.iter_directory(directory):
+            all_chunks.extend(chunks)
+        return all_chunks
 
 
 
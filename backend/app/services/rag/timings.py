@@ -0,0 +1,46 @@
+# app/services/rag/timings.py
+from typing import Dict
+from contextlib import contextmanager
+import time
+from ...core.logging import record_span
+from ...core.metrics import RAG_STAGE_SECONDS
+
+
+class StageTimings:
+    """
+    Running latency totals per pipeline stage (embed, retrieve, rerank, generate, ...).
+
+    Every measurement is also observed in the rag_stage_duration_seconds
+    histogram and attached as a span to the current request's log line.
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block and add it to the totals for `name`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def record(self, name: str, elapsed_ms: float) -> None:
+        totals = self._stages.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+        totals["count"] += 1
+        totals["total_ms"] += elapsed_ms
+        totals["max_ms"] = max(totals["max_ms"], elapsed_ms)
+        RAG_STAGE_SECONDS.observe(elapsed_ms / 1000, stage=name)
+        record_span(name, elapsed_ms)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "count": int(t["count"]),
+                "avg_ms": round(t["total_ms"] / t["count"], 3),
+                "max_ms": round(t["max_ms"], 3),
+                "total_ms": round(t["total_ms"], 3),
+            }
+            for name, t in self._stages.items()
+        }
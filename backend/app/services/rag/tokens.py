@@ -0,0 +1,11 @@
+# app/services/rag/tokens.py
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token count estimate for English text (~4 characters per token).
+
+    Used for budgeting batches and prompts where an exact tokenizer pass
+    would cost more than the precision is worth.
+    """
+    return len(text) // 4 + 1
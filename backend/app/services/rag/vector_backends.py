@@ -0,0 +1,552 @@
+# app/services/rag/vector_backends.py
+from typing import List, Dict, Optional, Tuple
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import json
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def matches_filter(metadata: Dict, filter: Optional[Dict]) -> bool:
+    """True when every key in `filter` has the same value in `metadata`."""
+    return not filter or all(metadata.get(key) == value for key, value in filter.items())
+
+
+class VectorBackend:
+    """
+    Interface for the vector index engines used by VectorStore.
+
+    Vectors are dictionaries with 'id', 'values' and 'metadata' keys (the
+    same shape Pinecone expects) and query results are dictionaries with
+    'id', 'score' and 'metadata' keys. A query `filter` restricts results to
+    vectors whose metadata equals every given key/value pair.
+    """
+
+    async def upsert(self, vectors: List[Dict]) -> None:
+        raise NotImplementedError
+
+    async def query(self, vector: List[float], top_k: int, filter: Optional[Dict] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    async def query_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        filter: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """Run several queries; engines that can score them together override this."""
+        return list(await asyncio.gather(*(self.query(vector, top_k, filter) for vector in vectors)))
+
+    async def delete(self, ids: List[str]) -> None:
+        raise NotImplementedError
+
+    async def delete_all(self) -> None:
+        raise NotImplementedError
+
+    async def flush(self) -> None:
+        """Persist pending changes. Remote backends have nothing to do."""
+        return None
+
+    async def warm_up(self) -> None:
+        """Open connections before the first query. Local backends have nothing to do."""
+        return None
+
+
+class PineconeBackend(VectorBackend):
+    """
+    Pinecone index accessed through its synchronous client.
+
+    Every call runs on a dedicated thread pool so a network round-trip
+    never blocks the event loop; the pool size caps concurrent requests.
+    """
+
+    def __init__(self, api_key: str, index_name: str = "tailor-tutor", pool_size: int = 8):
+        """
+        Initialize connection to a Pinecone index
+
+        Args:
+            api_key: Pinecone API key
+            index_name: Name of the index
+            pool_size: Threads available for concurrent Pinecone requests
+        """
+        from pinecone import Pinecone
+
+        self.pc = Pinecone(api_key=api_key)
+        self.index_name = index_name
+        self.index = self.pc.Index(self.index_name)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="pinecone")
+
+    async def _run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def upsert(self, vectors: List[Dict]) -> None:
+        await self._run(self.index.upsert, vectors=vectors)
+
+    async def query(self, vector: List[float], top_k: int, filter: Optional[Dict] = None) -> List[Dict]:
+        kwargs = {"filter": {key: {"$eq": value} for key, value in filter.items()}} if filter else {}
+        results = await self._run(
+            self.index.query,
+            vector=vector,
+            top_k=top_k,
+            include_metadata=True,
+            **kwargs
+        )
+        return [
+            {'id': match.id, 'score': match.score, 'metadata': match.metadata or {}}
+            for match in results.matches
+        ]
+
+    async def delete(self, ids: List[str]) -> None:
+        if ids:
+            await self._run(self.index.delete, ids=ids)
+
+    async def delete_all(self) -> None:
+        await self._run(self.index.delete, delete_all=True)
+
+    async def warm_up(self) -> None:
+        await self._run(self.index.describe_index_stats)
+
+
+class NumpyBackend(VectorBackend):
+    """
+    Exact in-process index over a contiguous float32 matrix.
+
+    Rows are L2-normalized on insert so a single matrix-vector product gives
+    cosine similarity for every stored vector. Intended for corpora that fit
+    comfortably in memory (tens of thousands of chunks).
+
+    Filtered queries only score the rows of the matching partition. The
+    rows per metadata value are indexed on first use of a key and the index
+    is rebuilt after the next write.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: Directory to persist the index to. When None the index
+                only lives in memory.
+        """
+        self.path = Path(path) if path else None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadata: List[Dict] = []
+        self._id_to_row: Dict[str, int] = {}
+        # metadata key -> value -> rows, for filtered queries
+        self._partitions: Dict[str, Dict] = {}
+        if self.path and (self.path / "vectors.npy").exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _normalize(values) -> np.ndarray:
+        vec = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vec, axis=-1, keepdims=True)
+        return vec / np.maximum(norm, 1e-12)
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        if self._matrix.shape[1] not in (0, dim):
+            raise ValueError(
+                f"Vector dimension {dim} does not match index dimension {self._matrix.shape[1]}"
+            )
+        capacity = self._matrix.shape[0]
+        if rows <= capacity and self._matrix.shape[1] == dim:
+            return
+        new_capacity = max(rows, 2 * capacity, 64)
+        grown = np.zeros((new_capacity, dim), dtype=np.float32)
+        if self._size:
+            grown[:self._size] = self._matrix[:self._size]
+        self._matrix = grown
+
+    def _add_rows(self, vectors: List[Dict]) -> List[int]:
+        """Insert or overwrite rows, returning the row index of each vector."""
+        if not vectors:
+            return []
+        values = self._normalize([v['values'] for v in vectors])
+        self._ensure_capacity(self._size + len(vectors), values.shape[1])
+        self._partitions = {}
+        rows = []
+        for vector, row_values in zip(vectors, values):
+            row = self._id_to_row.get(vector['id'])
+            if row is None:
+                row = self._size
+                self._size += 1
+                self._ids.append(vector['id'])
+                self._metadata.append(vector.get('metadata') or {})
+                self._id_to_row[vector['id']] = row
+            else:
+                self._metadata[row] = vector.get('metadata') or {}
+            self._matrix[row] = row_values
+            rows.append(row)
+        return rows
+
+    def _remove_row(self, row: int) -> None:
+        """Remove a row by moving the last row into its place."""
+        last = self._size - 1
+        removed_id = self._ids[row]
+        self._partitions = {}
+        if row != last:
+            self._matrix[row] = self._matrix[last]
+            self._ids[row] = self._ids[last]
+            self._metadata[row] = self._metadata[last]
+            self._id_to_row[self._ids[row]] = row
+        self._ids.pop()
+        self._metadata.pop()
+        del self._id_to_row[removed_id]
+        self._size -= 1
+
+    def _top_k(self, scores: np.ndarray, rows: np.ndarray, top_k: int) -> List[Dict]:
+        k = min(top_k, len(rows))
+        if k <= 0:
+            return []
+        if k < len(rows):
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(rows))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [
+            {
+                'id': self._ids[rows[i]],
+                'score': float(scores[i]),
+                'metadata': self._metadata[rows[i]]
+            }
+            for i in best
+        ]
+
+    def _filter_rows(self, filter: Optional[Dict]) -> Optional[np.ndarray]:
+        """Rows matching every key/value in `filter`, or None for all rows."""
+        if not filter:
+            return None
+        rows = None
+        for key, value in filter.items():
+            partition = self._partitions.get(key)
+            if partition is None:
+                grouped: Dict = {}
+                for row, metadata in enumerate(self._metadata):
+                    grouped.setdefault(metadata.get(key), []).append(row)
+                partition = self._partitions[key] = {
+                    k: np.asarray(v, dtype=np.int64) for k, v in grouped.items()
+                }
+            matching = partition.get(value)
+            if matching is None:
+                return np.zeros(0, dtype=np.int64)
+            rows = matching if rows is None else np.intersect1d(rows, matching, assume_unique=True)
+        return rows
+
+    async def upsert(self, vectors: List[Dict]) -> None:
+        self._add_rows(vectors)
+
+    async def query(self, vector: List[float], top_k: int, filter: Optional[Dict] = None) -> List[Dict]:
+        if self._size == 0:
+            return []
+        query_vec = self._normalize(vector)
+        rows = self._filter_rows(filter)
+        if rows is None:
+            return self._top_k(self._matrix[:self._size] @ query_vec, np.arange(self._size), top_k)
+        return self._top_k(self._matrix[rows] @ query_vec, rows, top_k)
+
+    async def query_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        filter: Optional[Dict] = None,
+        block_size: int = 256
+    ) -> List[List[Dict]]:
+        """Score a block of queries with one matrix-matrix product."""
+        if self._size == 0:
+            return [[] for _ in vectors]
+        queries = self._normalize(vectors)
+        rows = self._filter_rows(filter)
+        if rows is None:
+            rows = np.arange(self._size)
+            matrix = self._matrix[:self._size]
+        else:
+            matrix = self._matrix[rows]
+        results = []
+        # Blocks keep the (corpus x queries) score matrix bounded
+        for start in range(0, len(queries), block_size):
+            scores = matrix @ queries[start:start + block_size].T
+            results.extend(self._top_k(column, rows, top_k) for column in scores.T)
+        return results
+
+    async def delete(self, ids: List[str]) -> None:
+        for vector_id in ids:
+            row = self._id_to_row.get(vector_id)
+            if row is not None:
+                self._remove_row(row)
+
+    async def delete_all(self) -> None:
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._size = 0
+        self._ids = []
+        self._metadata = []
+        self._id_to_row = {}
+        self._partitions = {}
+
+    async def flush(self) -> None:
+        if self.path:
+            # Serialising grows with the corpus, so it runs on a worker thread
+            # from a copy the event loop can keep changing meanwhile
+            await asyncio.to_thread(self._save, self._snapshot())
+
+    def _snapshot(self) -> Dict:
+        return {
+            "matrix": self._matrix[:self._size].copy(),
+            "ids": list(self._ids),
+            "metadata": list(self._metadata),
+        }
+
+    def _save(self, snapshot: Dict) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        np.save(self.path / "vectors.npy", snapshot["matrix"])
+        with open(self.path / "metadata.json", "w") as f:
+            json.dump({"ids": snapshot["ids"], "metadata": snapshot["metadata"]}, f)
+        logger.info(f"Saved {len(snapshot['ids'])} vectors to {self.path}")
+
+    def _load(self) -> None:
+        self._matrix = np.ascontiguousarray(np.load(self.path / "vectors.npy"), dtype=np.float32)
+        with open(self.path / "metadata.json") as f:
+            stored = json.load(f)
+        self._ids = stored["ids"]
+        self._metadata = stored["metadata"]
+        self._size = len(self._ids)
+        self._id_to_row = {vector_id: row for row, vector_id in enumerate(self._ids)}
+        self._partitions = {}
+        logger.info(f"Loaded {self._size} vectors from {self.path}")
+
+
+class IVFBackend(NumpyBackend):
+    """
+    Inverted-file index on top of NumpyBackend for larger corpora.
+
+    Vectors are clustered with spherical k-means; a query only scores the
+    rows in the `n_probe` clusters closest to it. Below `min_train_size`
+    vectors the index falls back to exact search.
+
+    Training runs on a worker thread, never inside a query. A query that
+    finds the clusters missing or stale starts it in the background and is
+    answered from the current state (exact search before the first
+    training). `flush` and `warm_up` wait for it.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Path] = None,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        min_train_size: int = 4096,
+        train_iterations: int = 10
+    ):
+        """
+        Args:
+            path: Directory to persist the index to
+            n_lists: Number of clusters (defaults to sqrt of the corpus size)
+            n_probe: Number of clusters scanned per query
+            min_train_size: Corpus size below which exact search is used
+            train_iterations: k-means iterations when (re)training
+        """
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.train_iterations = train_iterations
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists: Optional[List[np.ndarray]] = None
+        self._trained_size = 0
+        self._training: Optional[asyncio.Task] = None
+        # Bumped on every write, so training can tell its snapshot went stale
+        self._version = 0
+        super().__init__(path)
+
+    def _fit(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Spherical k-means over `data`. Runs on a worker thread."""
+        size = len(data)
+        n_lists = min(self.n_lists or max(1, int(np.sqrt(size))), size)
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(size, size=n_lists, replace=False)].copy()
+        for _ in range(self.train_iterations):
+            assignments = np.argmax(data @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = data[assignments == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = self._normalize(centroids)
+        return centroids, np.argmax(data @ centroids.T, axis=1).astype(np.int32)
+
+    async def _train(self, attempts: int = 3) -> None:
+        for _ in range(attempts):
+            if not self._needs_training():
+                return
+            version = self._version
+            centroids, assignments = await asyncio.to_thread(self._fit, self._matrix[:self._size].copy())
+            if version == self._version:
+                break
+        else:
+            # Rows kept changing while fitting: assign the current ones here
+            assignments = np.argmax(self._matrix[:self._size] @ centroids.T, axis=1).astype(np.int32)
+        self._centroids = centroids
+        self._assignments = assignments
+        self._lists = None
+        self._trained_size = self._size
+        logger.info(f"Trained IVF index with {len(centroids)} lists over {self._size} vectors")
+
+    def _start_training(self) -> Optional[asyncio.Task]:
+        if self._training is None and self._needs_training():
+            self._training = asyncio.ensure_future(self._train())
+            self._training.add_done_callback(self._training_done)
+        return self._training
+
+    def _training_done(self, task: asyncio.Task) -> None:
+        self._training = None
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Training IVF index failed: {task.exception()}")
+
+    async def train(self) -> None:
+        """Train (or retrain) the clusters if the index needs it, and wait for it."""
+        task = self._start_training()
+        if task is not None:
+            # A cancelled caller does not abandon training other queries wait on
+            await asyncio.shield(task)
+
+    def _needs_training(self) -> bool:
+        if self._size < self.min_train_size:
+            return False
+        # Retrain once the corpus has doubled or shrunk by half since training
+        return (
+            self._centroids is None
+            or self._size > 2 * self._trained_size
+            or self._size < self._trained_size // 2
+        )
+
+    def _build_lists(self) -> None:
+        order = np.argsort(self._assignments[:self._size], kind="stable")
+        counts = np.bincount(self._assignments[:self._size], minlength=len(self._centroids))
+        self._lists = np.split(order, np.cumsum(counts)[:-1])
+
+    def _add_rows(self, vectors: List[Dict]) -> List[int]:
+        rows = super()._add_rows(vectors)
+        self._version += 1
+        if self._centroids is not None and rows:
+            if len(self._assignments) < self._size:
+                grown = np.zeros(max(self._size, 2 * len(self._assignments)), dtype=np.int32)
+                grown[:len(self._assignments)] = self._assignments
+                self._assignments = grown
+            row_idx = np.asarray(rows)
+            self._assignments[row_idx] = np.argmax(
+                self._matrix[row_idx] @ self._centroids.T, axis=1
+            )
+            self._lists = None
+        return rows
+
+    def _remove_row(self, row: int) -> None:
+        self._version += 1
+        last = self._size - 1
+        if self._centroids is not None:
+            self._assignments[row] = self._assignments[last]
+            self._lists = None
+        super()._remove_row(row)
+
+    async def query(self, vector: List[float], top_k: int, filter: Optional[Dict] = None) -> List[Dict]:
+        if filter:
+            # A partition is small enough to scan exactly, and probing clusters
+            # first could miss its rows entirely
+            return await super().query(vector, top_k, filter)
+        self._start_training()
+        if self._centroids is None or self._size < self.min_train_size:
+            return await super().query(vector, top_k)
+        if self._lists is None:
+            self._build_lists()
+
+        query_vec = self._normalize(vector)
+        n_probe = min(self.n_probe, len(self._centroids))
+        probe = np.argpartition(-(self._centroids @ query_vec), n_probe - 1)[:n_probe]
+        rows = np.concatenate([self._lists[c] for c in probe])
+        scores = self._matrix[rows] @ query_vec
+        return self._top_k(scores, rows, top_k)
+
+    async def query_batch(
+        self,
+        vectors: List[List[float]],
+        top_k: int,
+        filter: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        if filter:
+            return await super().query_batch(vectors, top_k, filter)
+        self._start_training()
+        if self._centroids is None or self._size < self.min_train_size:
+            return await super().query_batch(vectors, top_k)
+        # Probed clusters differ per query, so each one scans its own rows
+        return [await self.query(vector, top_k) for vector in vectors]
+
+    async def delete_all(self) -> None:
+        await super().delete_all()
+        self._version += 1
+        self._centroids = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._lists = None
+        self._trained_size = 0
+
+    async def flush(self) -> None:
+        await self.train()
+        await super().flush()
+
+    async def warm_up(self) -> None:
+        await self.train()
+
+    def _snapshot(self) -> Dict:
+        snapshot = super()._snapshot()
+        snapshot["centroids"] = self._centroids
+        snapshot["assignments"] = self._assignments[:self._size].copy()
+        return snapshot
+
+    def _save(self, snapshot: Dict) -> None:
+        super()._save(snapshot)
+        if snapshot["centroids"] is not None:
+            np.save(self.path / "centroids.npy", snapshot["centroids"])
+            np.save(self.path / "assignments.npy", snapshot["assignments"])
+        else:
+            for name in ("centroids.npy", "assignments.npy"):
+                (self.path / name).unlink(missing_ok=True)
+
+    def _load(self) -> None:
+        super()._load()
+        if (self.path / "centroids.npy").exists():
+            self._centroids = np.load(self.path / "centroids.npy")
+            self._assignments = np.load(self.path / "assignments.npy").astype(np.int32)
+            self._trained_size = self._size
+
+
+def create_backend(
+    name: str,
+    api_key: Optional[str] = None,
+    index_name: str = "tailor-tutor",
+    path: Optional[Path] = None,
+    pool_size: int = 8
+) -> VectorBackend:
+    """
+    Create a vector backend by name.
+
+    Args:
+        name: One of "pinecone", "numpy" or "ivf"
+        api_key: Pinecone API key (only used by the pinecone backend)
+        index_name: Pinecone index name
+        path: Directory for local backends to persist to
+        pool_size: Thread pool size for the pinecone backend
+
+    Returns:
+        The configured backend
+    """
+    if name == "pinecone":
+        return PineconeBackend(api_key=api_key, index_name=index_name, pool_size=pool_size)
+    if name == "numpy":
+        return NumpyBackend(path=path)
+    if name == "ivf":
+        return IVFBackend(path=path)
+    raise ValueError("Vector backend must be one of 'pinecone', 'numpy' or 'ivf'")
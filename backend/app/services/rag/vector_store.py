@@ -1,40 +1,152 @@
 # app/services/rag/vector_store.py
-from typing import List, Dict
-from pinecone import Pinecone, Index
+from typing import List, Dict, Optional
+from pathlib import Path
 from .embedder import Embedder
+from .vector_backends import create_backend
+from .manifest import stable_chunk_id
+from .bm25 import BM25Index
+from .chunk_store import ChunkStore
+import asyncio
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
 class VectorStore:
-    def __init__(self, api_key: str, openai_api_key: str, environment: str = "us-east-1", ):
-        """Initialize connection to Pinecone vector store"""
-        self.pc = Pinecone(api_key=api_key)
+    def __init__(
+        self,
+        api_key: str,
+        openai_api_key: str,
+        environment: str = "us-east-1",
+        backend: str = "pinecone",
+        index_path: Optional[Path] = None,
+        embedding_cache_path: Optional[Path] = None,
+        embedding_concurrency: int = 4,
+        index_embedding_concurrency: Optional[int] = None,
+        embedding_batch_size: int = 64,
+        embedding_batch_wait: float = 0.005,
+        pool_size: int = 8,
+        upsert_concurrency: int = 4,
+        retrieval_mode: str = "dense",
+        lexical_index_path: Optional[Path] = None,
+        chunk_store_path: Optional[Path] = None
+    ):
+        """
+        Initialize the vector store on top of a pluggable index backend.
+
+        Args:
+            api_key: Pinecone API key (only needed for the pinecone backend)
+            openai_api_key: OpenAI API key used for embeddings
+            environment: Pinecone environment
+            backend: Index engine to use ("pinecone", "numpy" or "ivf")
+            index_path: Directory local backends persist to
+            embedding_cache_path: SQLite file for cached embeddings
+            embedding_concurrency: Embedding requests kept in flight
+            index_embedding_concurrency: Embedding requests an index job keeps
+                in flight, on a limiter separate from question embeddings
+                (defaults to `embedding_concurrency`)
+            embedding_batch_size: Most concurrent question embeddings sent in one request
+            embedding_batch_wait: Longest wait in seconds for questions to share a request
+            pool_size: Threads for blocking vector store calls (pinecone backend)
+            upsert_concurrency: Upsert batches kept in flight while indexing
+            retrieval_mode: "dense" (embeddings only), "lexical" (BM25 only,
+                no embedding API needed) or "hybrid" (both, fused by rank)
+            lexical_index_path: Directory the BM25 index persists to
+            chunk_store_path: Directory of the local chunk text store. When
+                set, chunk texts are kept there instead of in the vector
+                and BM25 metadata, and query results are filled in from it
+        """
+        if retrieval_mode not in ("dense", "lexical", "hybrid"):
+            raise ValueError("Retrieval mode must be one of 'dense', 'lexical' or 'hybrid'")
+        self.retrieval_mode = retrieval_mode
         self.index_name = "tailor-tutor"  # Your existing index name
-        self.index = self.pc.Index(self.index_name)
-        self.embedder = Embedder(openai_api_key)
+        self.backend = create_backend(
+            backend,
+            api_key=api_key,
+            index_name=self.index_name,
+            path=index_path,
+            pool_size=pool_size
+        )
+        self.upsert_concurrency = upsert_concurrency
+        self.embedder = None
+        if retrieval_mode != "lexical":
+            self.embedder = Embedder(
+                openai_api_key,
+                cache_path=embedding_cache_path,
+                max_concurrency=embedding_concurrency,
+                index_concurrency=index_embedding_concurrency,
+                micro_batch_size=embedding_batch_size,
+                micro_batch_wait=embedding_batch_wait
+            )
+        self.lexical_index = None
+        if retrieval_mode != "dense":
+            self.lexical_index = BM25Index(path=lexical_index_path)
+        self.chunk_store = ChunkStore(chunk_store_path) if chunk_store_path else None
         
+    async def warm_up(self) -> Dict[str, str]:
+        """
+        Open the index and embedding API connections ahead of the first question.
+
+        Returns:
+            Error message per component that failed to warm up
+        """
+        components = {"vector_index": self.backend.warm_up()}
+        if self.embedder is not None:
+            components["embeddings"] = self.embedder.warm_up()
+        results = await asyncio.gather(*components.values(), return_exceptions=True)
+        errors = {}
+        for name, result in zip(components, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Warm-up of {name} failed: {result}")
+                errors[name] = str(result)
+        return errors
+
     async def index_chunks(self, chunks: List[Dict], batch_size: int = 100) -> None:
         """
         Index a list of chunks with their embeddings.
         
+        Vector IDs come from each chunk's 'id' key, or are derived from its
+        source and text, so re-indexing the same chunk overwrites it.
+        
         Args:
             chunks: List of dictionaries containing text and metadata
             batch_size: Number of vectors to upsert in each batch
         """
+        vectors = await self.embed_chunks(chunks, batch_size)
+        await self.upsert_vectors(vectors, batch_size)
+
+    async def embed_chunks(self, chunks: List[Dict], batch_size: int = 100) -> List[Dict]:
+        """
+        Embed chunks and build the vectors to upsert.
+        
+        Args:
+            chunks: List of dictionaries containing text and metadata
+            batch_size: Number of texts per embedding request
+            
+        Returns:
+            List of vectors with 'id', 'values' and 'metadata' keys
+        """
         try:
+            if not chunks:
+                return []
+
             # Extract texts for embedding
             texts = [chunk["text"] for chunk in chunks]
             
-            # Generate embeddings in batches
-            embeddings = await self.embedder.embed_text(texts, batch_size)
+            # Generate embeddings in batches (lexical-only indexes need none)
+            if self.embedder is None:
+                embeddings = [None] * len(texts)
+            else:
+                embeddings = await self.embedder.embed_text(texts, batch_size, background=True)
+                if len(texts) == 1:
+                    # embed_text unwraps single results
+                    embeddings = [embeddings]
             
             # Prepare vectors for upsert
             vectors = []
             for i, (embedding, chunk) in enumerate(zip(embeddings, chunks)):
                 vector = {
-                    'id': f'chunk_{i}',
+                    'id': chunk.get('id') or stable_chunk_id(chunk.get('source', 'unknown'), chunk['text']),
                     'values': embedding,
                     'metadata': {
                         'text': chunk['text'],
@@ -43,60 +155,235 @@ class VectorStore:
                         'chunk_id': chunk.get('chunk_id', i)
                     }
                 }
+                if chunk.get('book'):
+                    vector['metadata']['book'] = chunk['book']
                 vectors.append(vector)
-            
-            # Upsert vectors in batches
-            for i in range(0, len(vectors), batch_size):
-                batch = vectors[i:i + batch_size]
-                self.index.upsert(vectors=batch)
-                logger.info(f"Indexed batch {i//batch_size + 1} of {len(vectors)//batch_size + 1}")
+            return vectors
+
+        except Exception as e:
+            logger.error(f"Error embedding chunks: {e}")
+            raise
+
+    async def upsert_vectors(self, vectors: List[Dict], batch_size: int = 100, persist: bool = True) -> None:
+        """
+        Upsert prepared vectors in batches, a bounded number at a time.
+        
+        Args:
+            vectors: Vectors from embed_chunks
+            batch_size: Number of vectors to upsert in each batch
+            persist: Save the local indexes afterwards. Callers upserting
+                many documents pass False and call `persist` themselves
+                at checkpoints, since a save rewrites the whole index
+        """
+        try:
+            texts = {vector['id']: vector['metadata']['text'] for vector in vectors}
+            if self.chunk_store is not None:
+                # Texts go to the local store first, so no indexed ID lacks its text
+                self.chunk_store.put_many(texts)
+                vectors = [
+                    {**vector, 'metadata': {k: v for k, v in vector['metadata'].items() if k != 'text'}}
+                    for vector in vectors
+                ]
+            semaphore = asyncio.Semaphore(self.upsert_concurrency)
+            total_batches = (len(vectors) + batch_size - 1) // batch_size
+
+            async def upsert_batch(i: int) -> None:
+                async with semaphore:
+                    await self.backend.upsert(vectors[i:i + batch_size])
+                logger.info(f"Indexed batch {i//batch_size + 1} of {total_batches}")
+
+            if self.embedder is not None:
+                await asyncio.gather(*(upsert_batch(i) for i in range(0, len(vectors), batch_size)))
+
+            if self.lexical_index is not None:
+                for vector in vectors:
+                    self.lexical_index.add(vector['id'], texts[vector['id']], vector['metadata'])
+
+            if persist:
+                await self.persist()
                 
         except Exception as e:
             logger.error(f"Error indexing chunks: {e}")
             raise
+
+    async def persist(self) -> None:
+        """Save the local vector and BM25 indexes (a no-op for hosted backends)."""
+        if self.embedder is not None:
+            await self.backend.flush()
+        if self.lexical_index is not None:
+            await self.lexical_index.save_async()
     
-    async def query(self, query: str, top_k: int = 5) -> List[Dict]:
+    async def query(
+        self,
+        query: str,
+        top_k: int = 5,
+        query_embedding: Optional[List[float]] = None,
+        rrf_k: int = 60,
+        filter: Optional[Dict] = None
+    ) -> List[Dict]:
         """
         Query the vector store for similar chunks.
         
+        In hybrid mode dense and BM25 results are fused with reciprocal
+        rank fusion: each chunk scores sum(1 / (rrf_k + rank)) over the
+        rankings it appears in.
+        
         Args:
             query: The question or query text
             top_k: Number of most similar chunks to return
+            query_embedding: Precomputed embedding of the query, if the
+                caller already has one
+            rrf_k: Rank offset for reciprocal rank fusion
+            filter: Only search chunks whose metadata has these key/values,
+                e.g. {"book": "class_10_science", "chapter": 3}
             
         Returns:
             List of dictionaries containing text and metadata of most similar chunks
         """
         try:
-            # Generate embedding for query
-            query_embedding = await self.embedder.embed_text(query)
-            
-            # Query Pinecone
-            results = self.index.query(
-                vector=query_embedding,
-                top_k=top_k,
-                include_metadata=True
-            )
-            
-            # Extract and return relevant chunks
-            matched_chunks = []
-            for match in results.matches:
-                matched_chunks.append({
-                    'text': match.metadata['text'],
-                    'source': match.metadata.get('source', 'Unknown'),
-                    'score': match.score,
-                    'chapter': match.metadata.get('chapter')
-                })
+            if self.retrieval_mode == "lexical":
+                matches = self.lexical_index.query(query, top_k, filter)
+            else:
+                # Generate embedding for query
+                if query_embedding is None:
+                    query_embedding = await self.embedder.embed_text(query)
+                
+                if self.retrieval_mode == "dense":
+                    # Query the index backend
+                    matches = await self.backend.query(query_embedding, top_k, filter)
+                else:
+                    # Over-fetch from both rankings, then fuse
+                    candidates = 4 * top_k
+                    dense = await self.backend.query(query_embedding, candidates, filter)
+                    lexical = self.lexical_index.query(query, candidates, filter)
+                    matches = self._fuse([dense, lexical], top_k, rrf_k)
             
-            return matched_chunks
+            return self._format_matches(matches)
             
         except Exception as e:
             logger.error(f"Error querying vector store: {e}")
             raise
 
+    async def query_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        query_embeddings: Optional[List[List[float]]] = None,
+        rrf_k: int = 60,
+        filter: Optional[Dict] = None
+    ) -> List[List[Dict]]:
+        """
+        Query the vector store for many questions at once.
+
+        Questions without a precomputed embedding are embedded in a single
+        batched call, and the backend scores all of them together (one
+        matrix product for the local backends).
+
+        Args:
+            queries: The questions or query texts
+            top_k: Number of most similar chunks to return per query
+            query_embeddings: Precomputed embeddings, aligned with queries
+            rrf_k: Rank offset for reciprocal rank fusion
+            filter: Only search chunks whose metadata has these key/values
+
+        Returns:
+            One list of matched chunks per query, in the order given
+        """
+        try:
+            if not queries:
+                return []
+            if self.retrieval_mode == "lexical":
+                return [self._format_matches(self.lexical_index.query(q, top_k, filter)) for q in queries]
+
+            if query_embeddings is None:
+                query_embeddings = await self.embedder.embed_text(queries)
+                if len(queries) == 1:
+                    # embed_text unwraps single results
+                    query_embeddings = [query_embeddings]
+
+            if self.retrieval_mode == "dense":
+                batches = await self.backend.query_batch(query_embeddings, top_k, filter)
+            else:
+                dense = await self.backend.query_batch(query_embeddings, 4 * top_k, filter)
+                batches = [
+                    self._fuse([matches, self.lexical_index.query(q, 4 * top_k, filter)], top_k, rrf_k)
+                    for q, matches in zip(queries, dense)
+                ]
+            return [self._format_matches(matches) for matches in batches]
+
+        except Exception as e:
+            logger.error(f"Error batch querying vector store: {e}")
+            raise
+
+    def _format_matches(self, matches: List[Dict]) -> List[Dict]:
+        """
+        Flatten backend matches into the chunk dictionaries callers use.
+
+        Texts come from the match metadata, or from the chunk store for
+        vectors indexed without them.
+        """
+        matched_chunks = []
+        for match in matches:
+            text = match['metadata'].get('text')
+            if text is None and self.chunk_store is not None:
+                text = self.chunk_store.get(match['id'])
+            if text is None:
+                logger.warning(f"No text stored for chunk {match['id']}, skipping it")
+                continue
+            matched_chunks.append({
+                'id': match['id'],
+                'text': text,
+                'source': match['metadata'].get('source', 'Unknown'),
+                'score': match['score'],
+                'chapter': match['metadata'].get('chapter'),
+                'book': match['metadata'].get('book'),
+                'chunk_id': match['metadata'].get('chunk_id')
+            })
+        return matched_chunks
+
+    @staticmethod
+    def _fuse(rankings: List[List[Dict]], top_k: int, rrf_k: int) -> List[Dict]:
+        """Reciprocal rank fusion of several ranked match lists."""
+        fused = {}
+        for ranking in rankings:
+            for rank, match in enumerate(ranking):
+                entry = fused.setdefault(match['id'], {**match, 'score': 0.0})
+                entry['score'] += 1.0 / (rrf_k + rank + 1)
+        return sorted(fused.values(), key=lambda m: m['score'], reverse=True)[:top_k]
+
+    async def delete(self, ids: List[str], batch_size: int = 1000, persist: bool = True) -> None:
+        """
+        Delete vectors by ID.
+        
+        Args:
+            ids: Vector IDs to delete
+            batch_size: Number of IDs per delete request
+            persist: Save the local indexes afterwards (see `upsert_vectors`)
+        """
+        try:
+            for i in range(0, len(ids), batch_size):
+                await self.backend.delete(ids[i:i + batch_size])
+            if self.lexical_index is not None:
+                self.lexical_index.remove(ids)
+            if persist:
+                await self.persist()
+            if self.chunk_store is not None:
+                self.chunk_store.remove(ids)
+            logger.info(f"Deleted {len(ids)} vectors from index")
+        except Exception as e:
+            logger.error(f"Error deleting vectors: {e}")
+            raise
+
     async def delete_all(self) -> None:
         """Delete all vectors from the index"""
         try:
-            self.index.delete(delete_all=True)
+            await self.backend.delete_all()
+            await self.backend.flush()
+            if self.lexical_index is not None:
+                self.lexical_index.clear()
+                await self.lexical_index.save_async()
+            if self.chunk_store is not None:
+                self.chunk_store.clear()
             logger.info("Deleted all vectors from index")
         except Exception as e:
             logger.error(f"Error deleting vectors: {e}")
@@ -0,0 +1,111 @@
+# benchmarks/fakes.py
+from types import SimpleNamespace
+from typing import List
+from pathlib import Path
+import asyncio
+import hashlib
+import random
+import numpy as np
+from langchain_core.runnables import RunnableLambda
+from app.services.rag import RAGPipeline
+
+WORDS = (
+    "acid base salt metal carbon oxygen light lens mirror current circuit magnet force energy cell "
+    "tissue plant animal reflex hormone nerve heredity evolution reaction equation atom molecule "
+    "electron compound mixture element ecosystem food chain resource water soil forest pollution "
+    "refraction reflection power voltage resistance genetics species respiration digestion"
+).split()
+
+
+def _token_bucket(token: str, dim: int) -> int:
+    # md5 rather than hash() so vectors are identical across runs
+    return int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:4], "little") % dim
+
+
+class FakeEmbeddingsAPI:
+    """
+    Stands in for `AsyncOpenAI().embeddings`.
+
+    Vectors are hashed bags of words, so they are deterministic and texts
+    sharing words are similar. Every request sleeps `latency` seconds plus
+    `per_text_latency` per input, like a real API round-trip.
+    """
+
+    def __init__(self, dim: int = 256, latency: float = 0.05, per_text_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.requests = 0
+        self.texts = 0
+
+    def embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            vector[_token_bucket(token, self.dim)] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    async def create(self, model, input):
+        self.requests += 1
+        self.texts += len(input)
+        await asyncio.sleep(self.latency + self.per_text_latency * len(input))
+        return SimpleNamespace(
+            data=[SimpleNamespace(embedding=self.embed(text)) for text in input],
+            usage=SimpleNamespace(total_tokens=sum(len(text) // 4 + 1 for text in input))
+        )
+
+
+def fake_llm(latency: float = 0.3) -> RunnableLambda:
+    """An LLM stand-in that answers after `latency` seconds with a summary of its prompt."""
+
+    async def respond(prompt_value) -> str:
+        await asyncio.sleep(latency)
+        return f"Answer based on {len(prompt_value.to_string())} prompt characters."
+
+    return RunnableLambda(lambda prompt_value: "", afunc=respond)
+
+
+def write_corpus(directory: Path, documents: int, words_per_document: int, seed: int = 0) -> Path:
+    """Write deterministic synthetic chapters to `directory`."""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(documents):
+        sentences = []
+        for _ in range(words_per_document // 12):
+            sentences.append(" ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + ".")
+        (directory / f"chapter_{i:03d}.txt").write_text("\n\n".join(
+            " ".join(sentences[j:j + 8]) for j in range(0, len(sentences), 8)
+        ))
+    return directory
+
+
+def make_questions(count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [f"What is the link between {rng.choice(WORDS)} and {rng.choice(WORDS)} ({i})?" for i in range(count)]
+
+
+def make_pipeline(
+    work_dir: Path,
+    embed_latency: float,
+    llm_latency: float,
+    vector_backend: str = "numpy",
+    embedding_concurrency: int = 4
+) -> RAGPipeline:
+    """A RAGPipeline wired to local fakes: no network, no API keys, no caches between runs."""
+    pipeline = RAGPipeline({
+        "pinecone_api_key": None,
+        "pinecone_environment": None,
+        "openai_api_key": "benchmark",
+        "groq_api_key": "benchmark",
+        "vector_backend": vector_backend,
+        "vector_index_path": work_dir / "index",
+        "index_manifest_path": work_dir / "index" / "manifest.json",
+        "chunk_store_path": work_dir / "index" / "chunks",
+        "embedding_concurrency": embedding_concurrency,
+        # Measure the full path on every question
+        "answer_cache_size": 0,
+    })
+    pipeline.vector_store.embedder.client = SimpleNamespace(embeddings=FakeEmbeddingsAPI(latency=embed_latency))
+    pipeline.answer_generator.llm_groq = fake_llm(llm_latency)
+    pipeline.answer_generator.switch_provider("groq")
+    return pipeline
@@ -0,0 +1,249 @@
+# benchmarks/run_benchmarks.py
+"""
+Offline RAG performance benchmarks.
+
+Runs text processing, embedding, indexing, retrieval and question answering
+against deterministic local fakes with injected latency, so results are
+reproducible without API keys and comparable between commits.
+
+Run from the backend directory:
+
+    python -m benchmarks.run_benchmarks --output benchmarks/results/current.json
+    python -m benchmarks.run_benchmarks --baseline benchmarks/results/baseline.json
+
+With --baseline the run exits with status 1 when any latency percentile
+rose, or any throughput fell, by more than --threshold.
+"""
+from typing import Awaitable, Callable, Dict, List, Optional
+from pathlib import Path
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from app.services.rag import TextProcessor
+from benchmarks.fakes import make_pipeline, make_questions, write_corpus
+
+logger = logging.getLogger(__name__)
+
+# Metrics where a larger value is a regression; everything else is a throughput
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms", "mean_ms")
+THROUGHPUT_KEYS = ("chunks_per_s", "texts_per_s", "questions_per_s", "queries_per_s")
+
+
+def summarize(latencies_ms: List[float], elapsed: float, count: int, unit: str) -> Dict:
+    """Latency percentiles plus throughput (`<unit>_per_s`) for one benchmark."""
+    values = np.asarray(latencies_ms, dtype=np.float64)
+    summary = {"count": count, "seconds": round(elapsed, 4), f"{unit}_per_s": round(count / max(elapsed, 1e-9), 2)}
+    if len(values):
+        summary.update({
+            "mean_ms": round(float(values.mean()), 3),
+            "p50_ms": round(float(np.percentile(values, 50)), 3),
+            "p95_ms": round(float(np.percentile(values, 95)), 3),
+            "p99_ms": round(float(np.percentile(values, 99)), 3),
+        })
+    return summary
+
+
+async def run_concurrent(items: List, concurrency: int, call: Callable[..., Awaitable]) -> Dict:
+    """Call `call(item)` for every item with at most `concurrency` in flight, timing each call."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def timed(item):
+        async with semaphore:
+            start = time.perf_counter()
+            await call(item)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(item) for item in items))
+    return {"latencies": latencies, "elapsed": time.perf_counter() - start}
+
+
+async def bench_text_processing(corpus: Path) -> Dict:
+    processor = TextProcessor()
+    start = time.perf_counter()
+    chunks = await processor.process_directory(corpus)
+    elapsed = time.perf_counter() - start
+    return summarize([], elapsed, len(chunks), "chunks")
+
+
+async def bench_indexing(corpus: Path, work_dir: Path, args: argparse.Namespace) -> Dict:
+    pipeline = make_pipeline(work_dir / "indexing", args.embed_latency_ms / 1000, args.llm_latency_ms / 1000)
+    start = time.perf_counter()
+    stats = await pipeline.index_directory(corpus, incremental=False)
+    elapsed = time.perf_counter() - start
+    result = summarize([], elapsed, stats["added"], "chunks")
+    result["embedding_requests"] = pipeline.vector_store.embedder.client.embeddings.requests
+    return result
+
+
+async def bench_embedding(texts: List[str], work_dir: Path, args: argparse.Namespace) -> Dict:
+    pipeline = make_pipeline(work_dir / "embedding", args.embed_latency_ms / 1000, args.llm_latency_ms / 1000)
+    embedder = pipeline.vector_store.embedder
+    start = time.perf_counter()
+    await embedder.embed_text(texts, batch_size=args.embed_batch_size)
+    elapsed = time.perf_counter() - start
+    result = summarize([], elapsed, len(texts), "texts")
+    result["embedding_requests"] = embedder.client.embeddings.requests
+    return result
+
+
+async def bench_queries(pipeline, questions: List[str], concurrency: int) -> Dict:
+    """Retrieval only, with the question embedding precomputed."""
+    embeddings = await pipeline.vector_store.embedder.embed_text(questions)
+    if len(questions) == 1:
+        embeddings = [embeddings]
+    pairs = list(zip(questions, embeddings))
+    run = await run_concurrent(
+        pairs, concurrency,
+        lambda pair: pipeline.vector_store.query(pair[0], top_k=pipeline.top_k, query_embedding=pair[1])
+    )
+    return summarize(run["latencies"], run["elapsed"], len(pairs), "queries")
+
+
+async def bench_answers(pipeline, questions: List[str], concurrency: int) -> Dict:
+    run = await run_concurrent(questions, concurrency, pipeline.answer_question)
+    return summarize(run["latencies"], run["elapsed"], len(questions), "questions")
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        work_dir = Path(tmp)
+        corpus = write_corpus(work_dir / "corpus", args.documents, args.words_per_document, seed=args.seed)
+        questions = make_questions(args.questions, seed=args.seed + 1)
+
+        results["text_processing"] = await bench_text_processing(corpus)
+        logger.info(f"text_processing: {results['text_processing']}")
+        results["indexing"] = await bench_indexing(corpus, work_dir, args)
+        logger.info(f"indexing: {results['indexing']}")
+        texts = [chunk["text"] for chunk in await TextProcessor().process_directory(corpus)]
+        results["embedding"] = await bench_embedding(texts, work_dir, args)
+        logger.info(f"embedding: {results['embedding']}")
+
+        # One index shared by the retrieval and answering runs
+        pipeline = make_pipeline(work_dir / "qa", args.embed_latency_ms / 1000, args.llm_latency_ms / 1000)
+        await pipeline.index_directory(corpus, incremental=False)
+        for concurrency in args.concurrency:
+            name = f"query_c{concurrency}"
+            results[name] = await bench_queries(pipeline, questions, concurrency)
+            logger.info(f"{name}: {results[name]}")
+        for concurrency in args.concurrency:
+            name = f"answer_c{concurrency}"
+            results[name] = await bench_answers(pipeline, questions, concurrency)
+            logger.info(f"{name}: {results[name]}")
+        results["stages"] = pipeline.stats()["stages"]
+
+    return {"meta": metadata(args), "results": results}
+
+
+def metadata(args: argparse.Namespace) -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {
+            "documents": args.documents,
+            "words_per_document": args.words_per_document,
+            "questions": args.questions,
+            "concurrency": args.concurrency,
+            "embed_latency_ms": args.embed_latency_ms,
+            "llm_latency_ms": args.llm_latency_ms,
+            "embed_batch_size": args.embed_batch_size,
+            "seed": args.seed,
+        },
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta_ms: float = 1.0) -> List[str]:
+    """
+    List the metrics that regressed against a baseline run.
+
+    Args:
+        current: Output of this run
+        baseline: Output of an earlier run
+        threshold: Allowed relative change, e.g. 0.2 for 20%
+        min_delta_ms: Latency changes smaller than this are noise, whatever their ratio
+
+    Returns:
+        One human readable line per regression
+    """
+    regressions = []
+    if current["meta"]["params"] != baseline["meta"]["params"]:
+        logger.warning("Benchmark parameters differ from the baseline; comparison may be meaningless")
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if name == "stages" or before is None:
+            continue
+        for key, value in result.items():
+            old = before.get(key)
+            if not old:
+                continue
+            change = (value - old) / old
+            if key in LATENCY_KEYS and change > threshold and value - old >= min_delta_ms:
+                regressions.append(f"{name}.{key}: {old} -> {value} (+{change:.0%})")
+            elif key in THROUGHPUT_KEYS and -change > threshold:
+                regressions.append(f"{name}.{key}: {old} -> {value} ({change:.0%})")
+    return regressions
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the offline RAG benchmarks")
+    parser.add_argument("--documents", type=int, default=20, help="Synthetic chapters to index")
+    parser.add_argument("--words-per-document", type=int, default=3000)
+    parser.add_argument("--questions", type=int, default=64, help="Questions per concurrency level")
+    parser.add_argument(
+        "--concurrency", type=lambda s: [int(c) for c in s.split(",")], default=[1, 4, 16],
+        help="Comma separated concurrency levels"
+    )
+    parser.add_argument("--embed-latency-ms", type=float, default=50.0, help="Injected embedding API latency")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="Injected LLM latency")
+    parser.add_argument("--embed-batch-size", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="Compare against this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore smaller latency changes")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # The pipeline logs every batch it indexes
+    logging.getLogger("app").setLevel(logging.WARNING)
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        logger.info(f"Wrote {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        regressions = compare(report, json.loads(args.baseline.read_text()), args.threshold, args.min_delta_ms)
+        for line in regressions:
+            logger.error(f"Regression: {line}")
+        if regressions:
+            return 1
+        logger.info(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+# scripts/answer_questions.py
+import argparse
+import asyncio
+import json
+import logging
+from pathlib import Path
+from typing import List, Dict, Set
+from app.services.rag import RAGPipeline
+from scripts.index_documents import build_config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def read_questions(input_path: Path) -> List[Dict]:
+    """
+    Read questions from a JSONL file.
+
+    Each line is either {"id": ..., "question": ...} or a bare JSON string.
+    Lines without an id are keyed by their line number.
+    """
+    questions = []
+    with open(input_path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"question": item}
+            item.setdefault("id", str(line_number))
+            questions.append(item)
+    return questions
+
+def completed_ids(output_path: Path) -> Set[str]:
+    """IDs already answered in a previous run, so the job can resume."""
+    done = set()
+    if not output_path.exists():
+        return done
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A run killed mid-write leaves a partial last line
+                continue
+            if "error" not in record:
+                done.add(str(record["id"]))
+    return done
+
+async def answer_questions(input_path: Path, output_path: Path, batch_size: int = 100, concurrency: int = 8):
+    """
+    Answer every question in a JSONL file, appending results to a JSONL file.
+
+    Questions are sent through the pipeline `batch_size` at a time: one
+    embedding call and one retrieval query per batch, with up to
+    `concurrency` LLM generations in flight. Each answer is written and
+    flushed as soon as it is ready; re-running with the same output file
+    skips questions that already have an answer.
+    """
+    try:
+        config = build_config()
+        pipeline = RAGPipeline(config)
+
+        questions = read_questions(input_path)
+        done = completed_ids(output_path)
+        todo = [q for q in questions if str(q["id"]) not in done]
+        logger.info(f"{len(questions)} questions, {len(questions) - len(todo)} already answered")
+
+        answered = failed = 0
+        with open(output_path, "a") as out:
+            for start in range(0, len(todo), batch_size):
+                batch = todo[start:start + batch_size]
+                async for index, result in pipeline.answer_batch(
+                    [q["question"] for q in batch],
+                    concurrency=concurrency
+                ):
+                    record = {"id": batch[index]["id"], "question": batch[index]["question"], **result}
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    if "error" in result:
+                        failed += 1
+                    else:
+                        answered += 1
+                logger.info(f"Answered {start + len(batch)} of {len(todo)} questions")
+
+        logger.info(f"Done: {answered} answered, {failed} failed (re-run to retry failures)")
+        logger.info(f"Answer cache: {pipeline.answer_cache.stats()}")
+
+    except Exception as e:
+        logger.error(f"Error answering questions: {e}")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate answers for a JSONL file of questions")
+    parser.add_argument("input", type=Path, help="JSONL file of questions")
+    parser.add_argument("output", type=Path, help="JSONL file answers are appended to")
+    parser.add_argument("--batch-size", type=int, default=100, help="questions embedded and retrieved together")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM generations kept in flight")
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        raise FileNotFoundError(f"Question file not found at {args.input}")
+
+    asyncio.run(answer_questions(args.input, args.output, args.batch_size, args.concurrency))
+
+if __name__ == "__main__":
+    main()
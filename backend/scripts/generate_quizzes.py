@@ -0,0 +1,51 @@
+# scripts/generate_quizzes.py
+import argparse
+import asyncio
+import logging
+from pathlib import Path
+from app.core.config import settings
+from app.services.quiz import QuestionBank
+from app.services.quiz.builder import QuizBankBuilder
+from app.services.quiz.generator import QuizGenerator
+from app.services.rag import AnswerGenerator
+from scripts.index_documents import build_config
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def generate_quizzes(data_dir: Path, bank_dir: Path, workers: int = 4, force: bool = False):
+    """
+    Pre-generate the quiz question banks of every book under data_dir.
+
+    Only chapters whose text changed since their bank was generated are
+    sent to the LLM, unless force is set.
+    """
+    try:
+        config = build_config()
+        llm = AnswerGenerator(config["openai_api_key"], config["groq_api_key"]).llm
+        builder = QuizBankBuilder(QuestionBank(bank_dir), QuizGenerator(llm), workers=workers)
+
+        result = await builder.build_all(data_dir, force=force)
+        logger.info(
+            f"Generated {result['questions']} questions for {result['generated']} chapters, "
+            f"{result['unchanged']} unchanged, {result['failed']} failed"
+        )
+    except Exception as e:
+        logger.error(f"Error generating quizzes: {e}")
+        raise
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate quiz question banks from the textbook chapters")
+    parser.add_argument("--workers", type=int, default=settings.QUIZ_WORKERS, help="chapters generated concurrently")
+    parser.add_argument("--force", action="store_true", help="regenerate every chapter, not only the changed ones")
+    args = parser.parse_args()
+
+    data_dir = Path(settings.RAW_DATA_DIR)
+    if not data_dir.exists():
+        raise FileNotFoundError(f"Data directory not found at {data_dir}")
+
+    asyncio.run(generate_quizzes(data_dir, Path(settings.QUIZ_BANK_DIR), args.workers, args.force))
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 # scripts/index_documents.py
+import argparse
 import asyncio
 import logging
 from pathlib import Path
@@ -10,28 +11,49 @@ from app.services.rag import RAGPipeline
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def index_documents(data_dir: Path, clear_existing: bool = True):
-    """Index all documents in the specified directory using RAG pipeline."""
+def build_config() -> dict:
+    """Pipeline config from the environment (and the repository's .env file)."""
+    # Load environment variables from .env
+    env_path = Path(__file__).parent.parent.parent / '.env'
+    load_dotenv(env_path)
+
+    # Create config dict from environment variables
+    return {
+        "pinecone_api_key": os.getenv("PINECONE_API_KEY"),
+        "pinecone_environment": os.getenv("PINECONE_ENVIRONMENT"),
+        "pinecone_index_name": os.getenv("PINECONE_INDEX_NAME"),
+        "openai_api_key": os.getenv("OPENAI_API_KEY"),
+        "groq_api_key": os.getenv("GROQ_API_KEY"),
+        "vector_backend": os.getenv("VECTOR_BACKEND", "pinecone"),
+        "vector_index_path": os.getenv("VECTOR_INDEX_PATH", str(Path(__file__).parent.parent / "data/index")),
+        "index_manifest_path": os.getenv("INDEX_MANIFEST_PATH", str(Path(__file__).parent.parent / "data/index/manifest.json")),
+        "embedding_cache_path": os.getenv("EMBEDDING_CACHE_PATH", str(Path(__file__).parent.parent / "data/cache/embeddings.sqlite")),
+        "embedding_concurrency": int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+        "retrieval_mode": os.getenv("RETRIEVAL_MODE", "dense"),
+        "lexical_index_path": os.getenv("LEXICAL_INDEX_PATH", str(Path(__file__).parent.parent / "data/index/lexical")),
+        "chunk_store_path": os.getenv("CHUNK_STORE_PATH", str(Path(__file__).parent.parent / "data/index/chunks"))
+    }
+
+async def index_documents(data_dir: Path, clear_existing: bool = False):
+    """
+    Index all documents in the specified directory using RAG pipeline.
+
+    By default only chunks that changed since the last run (according to
+    the index manifest) are embedded, upserted or deleted. With
+    clear_existing the whole index is wiped and rebuilt.
+    """
     try:
-        # Load environment variables from .env
-        env_path = Path(__file__).parent.parent.parent / '.env'
-        load_dotenv(env_path)
-        
-        
-        
-        
-        # Create config dict from environment variables
-        config = {
-            "pinecone_api_key": os.getenv("PINECONE_API_KEY"),
-            "pinecone_environment": os.getenv("PINECONE_ENVIRONMENT"),
-            "pinecone_index_name": os.getenv("PINECONE_INDEX_NAME"),
-            "openai_api_key": os.getenv("OPENAI_API_KEY")
-        }
-        
+        config = build_config()
         
+        # Lexical-only indexing needs neither embeddings nor a vector database
+        required = []
+        if config["retrieval_mode"] != "lexical":
+            required.append("openai_api_key")
+        if config["retrieval_mode"] != "lexical" and config["vector_backend"] == "pinecone":
+            required += ["pinecone_api_key", "pinecone_environment", "pinecone_index_name"]
         
         # Validate environment variables
-        missing_vars = [k for k, v in config.items() if not v]
+        missing_vars = [k for k in required if not config[k]]
         if missing_vars:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}")
         
@@ -39,14 +61,24 @@ async def index_documents(data_dir: Path, clear_existing: bool = True):
         pipeline = RAGPipeline(config)
         
         if clear_existing:
-            # First clear existing vectors (optional)
-            logger.info("Clearing existing vectors...")
-            await pipeline.vector_store.delete_all()
+            logger.info("Clearing existing vectors before a full re-index...")
+            await pipeline.clear_index()
         
         # Index all documents
         logger.info(f"Starting indexing of documents in {data_dir}...")
-        await pipeline.index_directory(data_dir)
+        result = await pipeline.index_directory(data_dir, incremental=not clear_existing)
+        logger.info(
+            f"Added {result['added']} chunks, removed {result['removed']}, "
+            f"{result['unchanged']} unchanged"
+        )
         
+        embedder = pipeline.vector_store.embedder
+        if embedder is not None:
+            logger.info(
+                f"Embeddings: {embedder.cache_hits} from cache, "
+                f"{embedder.cache_misses} requested from the API"
+            )
+            logger.info(embedder.stats.report())
         logger.info("Indexing completed successfully!")
         
     except Exception as e:
@@ -54,6 +86,14 @@ async def index_documents(data_dir: Path, clear_existing: bool = True):
         raise
 
 def main():
+    parser = argparse.ArgumentParser(description="Index textbook chapters into the vector store")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="wipe the index and re-index everything instead of only the changes"
+    )
+    args = parser.parse_args()
+
     # Define data directory path
     data_dir = Path(__file__).parent.parent / "data/raw/class_10_science"
     
@@ -62,7 +102,7 @@ def main():
         raise FileNotFoundError(f"Data directory not found at {data_dir}")
     
     # Run indexing
-    asyncio.run(index_documents(data_dir))
+    asyncio.run(index_documents(data_dir, clear_existing=args.full))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
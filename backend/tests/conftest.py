@@ -1,6 +1,51 @@
 # tests/conftest.py
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
+
+
+class ConstantEmbeddings:
+    """Every text gets the same vector, so retrieval order comes from the index alone."""
+
+    async def create(self, model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0, 0.0]) for _ in input])
+
+
+@pytest.fixture
+def make_pipeline(tmp_path):
+    """
+    Factory for a RAGPipeline on the in-process numpy backend, with fake
+    embeddings and an optional fake LLM, so tests only pass what they change.
+
+    Args (of the returned factory):
+        embeddings: Stands in for the OpenAI embeddings client (default: ConstantEmbeddings)
+        answers: Replies for a FakeListChatModel used as the Groq model
+        llm: Any other runnable to use as the Groq model
+        **config: RAGPipeline config overrides
+    """
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+    from app.services.rag import RAGPipeline
+
+    def make(embeddings=None, answers=None, llm=None, **config):
+        pipeline = RAGPipeline({
+            "pinecone_api_key": None,
+            "pinecone_environment": None,
+            "openai_api_key": "test-key",
+            "groq_api_key": "test-key",
+            "vector_backend": "numpy",
+            "index_manifest_path": tmp_path / "manifest.json",
+            **config,
+        })
+        if pipeline.vector_store.embedder is not None:
+            pipeline.vector_store.embedder.client = SimpleNamespace(embeddings=embeddings or ConstantEmbeddings())
+        if answers is not None:
+            llm = FakeListChatModel(responses=list(answers))
+        if llm is not None:
+            pipeline.answer_generator.llm_groq = llm
+            pipeline.answer_generator.switch_provider("groq")
+        return pipeline
+
+    return make
 
 @pytest.fixture
 def sample_text():
@@ -0,0 +1,45 @@
+# tests/test_answer_cache.py
+from app.services.rag.answer_cache import AnswerCache, normalize_question
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_question():
+    assert normalize_question("  What happens in Reflex Actions?? ") == "what happens in reflex actions"
+
+
+def test_exact_and_semantic_hits():
+    cache = AnswerCache(similarity_threshold=0.9)
+    cache.put("What is a reflex action?", [1.0, 0.0, 0.0], {"answer": "A quick response", "sources": []})
+
+    assert cache.get("what is a reflex action")["answer"] == "A quick response"
+    assert cache.get_similar([0.99, 0.05, 0.0])["answer"] == "A quick response"
+    assert cache.get_similar([0.0, 1.0, 0.0]) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_lru_eviction_ttl_and_clear():
+    clock = FakeClock()
+    cache = AnswerCache(max_entries=2, ttl_seconds=10, clock=clock)
+    cache.put("q1", [1.0, 0.0], {"answer": "a1"})
+    cache.put("q2", [0.0, 1.0], {"answer": "a2"})
+    cache.get("q1")
+    cache.put("q3", [0.7, 0.7], {"answer": "a3"})
+
+    assert cache.get("q2") is None
+    assert cache.get("q1") is not None
+
+    clock.now = 11
+    assert cache.get("q3") is None
+    assert cache.stats()["expirations"] == 1
+
+    cache.clear()
+    assert cache.stats()["entries"] == 0
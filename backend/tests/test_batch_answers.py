@@ -0,0 +1,36 @@
+# tests/test_batch_answers.py
+from types import SimpleNamespace
+import pytest
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, model, input):
+        self.calls += 1
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in input
+        ])
+
+
+@pytest.mark.asyncio
+async def test_answer_batch_embeds_once_and_uses_cache(make_pipeline):
+    fake = CountingEmbeddings()
+    # Similar-length questions would otherwise share cached answers
+    pipeline = make_pipeline(fake, answers=["An answer."], answer_cache_threshold=1.1)
+    await pipeline.vector_store.backend.upsert([
+        {"id": "a", "values": [1.0, 0.0], "metadata": {"text": "Reflex arcs", "source": "chapter_06.txt"}}
+    ])
+    questions = ["What is a reflex?", "Why do plants bend to light?", "What is an acid?"]
+
+    results = dict([item async for item in pipeline.answer_batch(questions, concurrency=2)])
+
+    assert sorted(results) == [0, 1, 2]
+    assert all(r["answer"] == "An answer." for r in results.values())
+    assert results[0]["sources"] == ["chapter_06.txt"]
+    assert fake.calls == 1
+
+    again = [item async for item in pipeline.answer_batch(questions)]
+    assert len(again) == 3
+    assert fake.calls == 1
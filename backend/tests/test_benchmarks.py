@@ -0,0 +1,31 @@
+# tests/test_benchmarks.py
+import pytest
+from benchmarks.fakes import FakeEmbeddingsAPI
+from benchmarks.run_benchmarks import compare, parse_args, run
+
+
+def test_fake_embeddings_are_deterministic():
+    api = FakeEmbeddingsAPI(dim=64)
+    assert api.embed("acid and base") == FakeEmbeddingsAPI(dim=64).embed("acid and base")
+    assert api.embed("acid and base") != api.embed("light and lens")
+
+
+@pytest.mark.asyncio
+async def test_benchmarks_run_offline_and_compare():
+    args = parse_args([
+        "--documents", "2", "--words-per-document", "600", "--questions", "4",
+        "--concurrency", "1,2", "--embed-latency-ms", "0", "--llm-latency-ms", "0"
+    ])
+
+    report = await run(args)
+
+    results = report["results"]
+    assert results["indexing"]["count"] == results["text_processing"]["count"] > 0
+    assert results["answer_c2"]["count"] == 4
+    assert {"p50_ms", "p95_ms", "p99_ms", "questions_per_s"} <= set(results["answer_c1"])
+    assert compare(report, report, threshold=0.2) == []
+
+    slower = {"meta": report["meta"], "results": {"answer_c1": dict(results["answer_c1"])}}
+    slower["results"]["answer_c1"]["p95_ms"] = results["answer_c1"]["p95_ms"] * 2 + 10
+    regressions = compare(slower, report, threshold=0.2)
+    assert len(regressions) == 1 and regressions[0].startswith("answer_c1.p95_ms")
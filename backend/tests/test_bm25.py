@@ -0,0 +1,62 @@
+# tests/test_bm25.py
+import asyncio
+
+from app.services.rag.bm25 import BM25Index, tokenize
+
+
+def make_index(path=None):
+    index = BM25Index(path=path)
+    index.add("c1", "A magnetic field exists around a bar magnet.", {"text": "magnet"})
+    index.add("c2", "In a double displacement reaction ions are exchanged.", {"text": "reaction"})
+    index.add("c3", "The magnetic field of a straight wire forms circles.", {"text": "wire"})
+    return index
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("What is the Magnetic Field?") == ["magnetic", "field"]
+
+
+def test_query_ranks_exact_terms():
+    index = make_index()
+
+    assert [m["id"] for m in index.query("double displacement")] == ["c2"]
+    assert {m["id"] for m in index.query("magnetic field", top_k=5)} == {"c1", "c3"}
+    assert index.query("photosynthesis") == []
+
+
+def test_persisted_index_accepts_edits(tmp_path):
+    make_index(tmp_path).save()
+
+    index = BM25Index(path=tmp_path)
+    index.remove(["c1"])
+    index.add("c4", "Displacement of the needle shows a magnetic field.", {"text": "needle"})
+
+    assert [m["id"] for m in index.query("bar magnet")] == []
+    assert index.query("double displacement")[0]["id"] == "c2"
+    assert {m["id"] for m in index.query("needle")} == {"c4"}
+
+
+def test_save_skips_unchanged_index(tmp_path, monkeypatch):
+    index = make_index(tmp_path)
+    index.save()
+    builds = []
+    monkeypatch.setattr(index, "_build", lambda *args: builds.append(args))
+    monkeypatch.setattr(index, "_write", lambda snapshot: builds.append(snapshot))
+
+    index.save()
+    index.query("magnetic field")
+
+    assert builds == []
+
+
+def test_save_async_writes_snapshot_off_loop(tmp_path):
+    index = make_index(tmp_path)
+    index.query("magnetic field")
+    index.add("c4", "Displacement of the needle shows a magnetic field.", {"text": "needle"})
+
+    asyncio.run(index.save_async())
+
+    assert not index._dirty
+    reloaded = BM25Index(path=tmp_path)
+    assert [m["id"] for m in reloaded.query("needle")] == ["c4"]
+    assert reloaded.query("magnetic field", top_k=5) == index.query("magnetic field", top_k=5)
@@ -0,0 +1,72 @@
+# tests/test_catalog.py
+import json
+from pathlib import Path
+from app.services.catalog import Catalog
+
+CATALOG_DIR = Path(__file__).parent.parent / "data" / "catalog"
+
+
+def write_subject(directory, subject_id, chapter_id, topic_ids):
+    subject = {
+        "id": subject_id,
+        "name": subject_id.title(),
+        "grade": "Class 10",
+        "chapters": [{
+            "id": chapter_id,
+            "title": f"Chapter {chapter_id}",
+            "description": "",
+            "topics": [{"id": t, "title": f"Topic {t}", "content": "..."} for t in topic_ids]
+        }]
+    }
+    (directory / f"{subject_id}.json").write_text(json.dumps(subject))
+
+
+def test_shipped_catalog_lookups():
+    catalog = Catalog(CATALOG_DIR)
+
+    assert catalog.get_subject("science").name == "Science"
+    assert catalog.get_chapter("ch2").title == "Indian National Movement"
+    assert catalog.chapter_of_topic("topic3").id == "ch2"
+    assert catalog.subject_of_chapter("ch1").id == "science"
+    assert catalog.get_topic("missing") is None
+    assert catalog.chapters_json("missing") is None
+    subjects = json.loads(catalog.subjects_json())
+    assert {s["id"] for s in subjects} == {"science", "social"}
+    assert "chapters" not in subjects[0]
+
+
+def test_catalog_reloads_changed_files(tmp_path):
+    write_subject(tmp_path, "maths", "m1", ["t1"])
+    catalog = Catalog(tmp_path, check_interval=0)
+    version = catalog.version
+    first = catalog.chapters_json("maths")
+
+    write_subject(tmp_path, "maths", "m1", ["t1", "t2"])
+    catalog.maybe_reload()
+
+    assert catalog.version != version
+    assert catalog.get_topic("t2") is not None
+    assert catalog.chapters_json("maths") != first
+
+
+def test_catalog_keeps_previous_version_on_duplicate_ids(tmp_path):
+    write_subject(tmp_path, "maths", "m1", ["t1"])
+    catalog = Catalog(tmp_path)
+    version = catalog.version
+
+    write_subject(tmp_path, "physics", "p1", ["t1"])
+
+    assert catalog.reload() is False
+    assert catalog.version == version
+    assert catalog.get_subject("physics") is None
+
+
+def test_retrieval_scope_from_question_context():
+    catalog = Catalog(CATALOG_DIR)
+
+    assert catalog.retrieval_scope({"chapterId": "ch1", "topicId": "topic1"}) == {"book": "class_10_science", "chapter": 1}
+    assert catalog.retrieval_scope({"topicId": "topic2"}) == {"book": "class_10_science", "chapter": 1}
+    assert catalog.retrieval_scope({"subjectId": "science"}) == {"book": "class_10_science"}
+    # Social science has no indexed book yet
+    assert catalog.retrieval_scope({"chapterId": "ch2"}) is None
+    assert catalog.retrieval_scope(None) is None
@@ -0,0 +1,128 @@
+# tests/test_chunk_store.py
+from types import SimpleNamespace
+import multiprocessing
+import pytest
+from app.services.rag import chunk_store
+from app.services.rag.chunk_store import ChunkStore
+from app.services.rag.vector_store import VectorStore
+
+
+class LengthEmbeddings:
+    async def create(self, model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in input])
+
+
+def test_texts_survive_reopening_and_removal(tmp_path):
+    store = ChunkStore(tmp_path)
+    assert store.put_many({"a": "Acids turn litmus red.", "b": "Ünïcode lenses."}) == 2
+    assert store.put_many({"a": "Acids turn litmus red.", "c": ""}) == 1
+    store.remove(["b"])
+
+    reopened = ChunkStore(tmp_path)
+
+    assert reopened.get_many(["a", "b", "c"]) == ["Acids turn litmus red.", None, ""]
+    assert reopened.stats() == {
+        "chunks": 2, "live_bytes": 22, "dead_bytes": len("Ünïcode lenses.".encode()), "generation": 0
+    }
+
+
+def test_dead_records_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(ChunkStore, "_MIN_COMPACT_BYTES", 10)
+    store = ChunkStore(tmp_path)
+    store.put_many({"old": "x" * 100, "kept": "Kept text."})
+
+    store.remove(["old"])
+
+    assert store.stats()["dead_bytes"] == 0
+    assert not (tmp_path / "chunks.bin").exists()
+    assert (tmp_path / "chunks.1.bin").read_bytes() == b"Kept text."
+    assert ChunkStore(tmp_path).get("kept") == "Kept text."
+
+
+def test_crash_before_the_index_swap_keeps_the_old_generation(tmp_path):
+    store = ChunkStore(tmp_path)
+    store.put_many({"old": "x" * 100, "kept": "Kept text."})
+    # A compaction that died after writing its data file, before the index rename
+    (tmp_path / "chunks.1.bin").write_bytes(b"Kept text.")
+    (tmp_path / "chunks.idx.tmp").write_text('{"generation": 1}\n["kept", 0, 10]\n')
+
+    assert ChunkStore(tmp_path).get_many(["old", "kept"]) == ["x" * 100, "Kept text."]
+
+
+def test_reader_sees_texts_written_by_another_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(ChunkStore, "_MIN_COMPACT_BYTES", 10)
+    reader = ChunkStore(tmp_path)
+    writer = ChunkStore(tmp_path)
+
+    writer.put_many({"a": "First.", "old": "x" * 100})
+    assert reader.get("a") == "First."
+
+    # The writer compacts into a new generation under the reader
+    writer.remove(["old"])
+    writer.put_many({"b": "Second."})
+    assert reader.get_many(["a", "b", "old"]) == ["First.", "Second.", None]
+    assert reader.stats()["generation"] == 1
+
+
+def test_truncated_index_keeps_earlier_records(tmp_path):
+    ChunkStore(tmp_path).put_many({"a": "First."})
+    with open(tmp_path / "chunks.idx", "a") as f:
+        f.write('["b", 6,')
+
+    assert ChunkStore(tmp_path).get_many(["a", "b"]) == ["First.", None]
+
+
+def write_texts(path, writer):
+    store = ChunkStore(path)
+    for i in range(200):
+        store.put_many({f"{writer}-{i}": f"Text {i} from writer {writer}. " * (1 + i % 7)})
+        if i % 50 == 49:
+            store.remove([f"{writer}-{i - 1}"])
+            store.compact()
+
+
+@pytest.mark.skipif(chunk_store.fcntl is None, reason="needs fcntl")
+def test_writers_in_separate_processes_do_not_corrupt_each_other(tmp_path):
+    context = multiprocessing.get_context("fork")
+    writers = [context.Process(target=write_texts, args=(tmp_path, name)) for name in ("a", "b")]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    store = ChunkStore(tmp_path)
+    removed = {f"{name}-{i - 1}" for name in ("a", "b") for i in range(200) if i % 50 == 49}
+    for name in ("a", "b"):
+        for i in range(200):
+            expected = None if f"{name}-{i}" in removed else f"Text {i} from writer {name}. " * (1 + i % 7)
+            assert store.get(f"{name}-{i}") == expected
+    assert len(store) == 400 - len(removed)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("retrieval_mode", ["dense", "lexical"])
+async def test_index_metadata_holds_no_text(tmp_path, retrieval_mode):
+    store = VectorStore(
+        api_key=None,
+        openai_api_key="test-key",
+        backend="numpy",
+        retrieval_mode=retrieval_mode,
+        chunk_store_path=tmp_path / "chunks",
+    )
+    if store.embedder is not None:
+        store.embedder.client = SimpleNamespace(embeddings=LengthEmbeddings())
+    chunks = [
+        {"id": "book/ch1#a", "text": "Acids turn blue litmus red.", "source": "chapter_01.txt", "chapter": 1},
+        {"id": "book/ch2#b", "text": "Lenses bend light.", "source": "chapter_02.txt", "chapter": 2},
+    ]
+    await store.index_chunks(chunks)
+
+    index = store.backend if retrieval_mode == "dense" else store.lexical_index
+    assert all("text" not in metadata for metadata in index._metadata)
+    texts = {c["id"]: c["text"] for c in chunks}
+    results = await store.query("litmus acids", top_k=2)
+    assert results and all(r["text"] == texts[r["id"]] for r in results)
+
+    await store.delete(["book/ch1#a"])
+    assert store.chunk_store.get("book/ch1#a") is None
+    assert [r["text"] for r in await store.query("lenses bend light", top_k=2)] == ["Lenses bend light."]
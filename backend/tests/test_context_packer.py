@@ -0,0 +1,68 @@
+# tests/test_context_packer.py
+import pytest
+from langchain_core.runnables import RunnableLambda
+from app.services.rag.answer_generator import AnswerGenerator
+from app.services.rag.context_packer import ContextPacker
+
+SENTENCES = [f"Sentence {i} about how plants make food from sunlight." for i in range(60)]
+TEXT = " ".join(SENTENCES)
+
+
+def test_overlapping_neighbours_are_merged():
+    first, second = TEXT[:1200], TEXT[1000:2200]
+    packer = ContextPacker(max_tokens=10_000)
+
+    packed = packer.pack([
+        {"text": second, "source": "ch7.txt", "chunk_id": 1, "score": 0.9},
+        {"text": first, "source": "ch7.txt", "chunk_id": 0, "score": 0.8},
+    ])
+
+    assert len(packed.contexts) == 1
+    assert packed.contexts[0]["text"] == TEXT[:2200]
+    assert packed.contexts[0]["score"] == 0.9
+    assert packed.tokens_saved > 0
+
+
+def test_same_file_names_in_different_books_are_not_merged():
+    packer = ContextPacker(max_tokens=10_000)
+
+    packed = packer.pack([
+        {"text": "Acids turn blue litmus red.", "book": "science", "source": "chapter_01.txt", "chunk_id": 0},
+        {"text": "The salt march began in 1930.", "book": "history", "source": "chapter_01.txt", "chunk_id": 1},
+    ])
+
+    assert sorted(c["book"] for c in packed.contexts) == ["history", "science"]
+
+
+def test_near_duplicates_dropped_and_budget_respected():
+    packer = ContextPacker(max_tokens=150)
+    contexts = [
+        {"text": TEXT[:500], "source": "a.txt", "chunk_id": 0, "score": 0.9},
+        {"text": TEXT[:500] + " Extra.", "source": "b.txt", "chunk_id": 4, "score": 0.8},
+        {"text": "Acids turn blue litmus red. " * 10, "source": "c.txt", "chunk_id": 2, "score": 0.7},
+        {"text": "Magnets attract iron. " * 20, "source": "d.txt", "chunk_id": 3, "score": 0.6},
+    ]
+
+    packed = packer.pack(contexts)
+
+    assert [c["source"] for c in packed.contexts] == ["a.txt"]
+    assert packed.tokens <= 150
+    assert packed.dropped == 3
+
+
+@pytest.mark.asyncio
+async def test_prompt_receives_packed_context_text():
+    generator = AnswerGenerator(openai_api_key="test-key", groq_api_key="test-key")
+    prompts = []
+    # Stands in for the LLM and records the prompt it was given
+    generator.llm_groq = RunnableLambda(lambda value: prompts.append(value.to_string()) or "ok")
+    generator.switch_provider("groq")
+
+    result = await generator.generate_answer("Why?", [
+        {"text": "Chlorophyll absorbs light.", "source": "ch7.txt", "chunk_id": 0, "score": 1.0}
+    ])
+
+    assert "Chlorophyll absorbs light." in prompts[0]
+    assert "Question: Why?" in prompts[0]
+    assert result["sources"] == ["ch7.txt"]
+    assert generator.context_stats["requests"] == 1
@@ -0,0 +1,151 @@
+# tests/test_embedder.py
+from types import SimpleNamespace
+import asyncio
+import httpx
+import pytest
+from openai import RateLimitError
+from app.services.rag.embedder import Embedder
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in input
+        ])
+
+
+@pytest.mark.asyncio
+async def test_embed_text_only_sends_cache_misses(tmp_path):
+    embedder = Embedder("test-key", cache_path=tmp_path / "embeddings.sqlite")
+    fake = FakeEmbeddings()
+    embedder.client = SimpleNamespace(embeddings=fake)
+
+    first = await embedder.embed_text(["a", "bb", "ccc"], batch_size=2)
+    second = await embedder.embed_text(["a", "bb", "dddd"])
+
+    assert first == [[1.0, 1.0], [2.0, 1.0], [3.0, 1.0]]
+    assert second == [[1.0, 1.0], [2.0, 1.0], [4.0, 1.0]]
+    assert fake.calls == [["a", "bb"], ["ccc"], ["dddd"]]
+    assert (embedder.cache_hits, embedder.cache_misses) == (2, 4)
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_persists_across_instances(tmp_path):
+    path = tmp_path / "embeddings.sqlite"
+    embedder = Embedder("test-key", cache_path=path)
+    embedder.client = SimpleNamespace(embeddings=FakeEmbeddings())
+    await embedder.embed_text(["chapter text", "more text"])
+
+    reopened = Embedder("test-key", cache_path=path)
+    fake = FakeEmbeddings()
+    reopened.client = SimpleNamespace(embeddings=fake)
+
+    assert await reopened.embed_text(["chapter text", "more text"]) == [[12.0, 1.0], [9.0, 1.0]]
+    assert fake.calls == []
+
+
+class SlowEmbeddings(FakeEmbeddings):
+    def __init__(self, fail_first=None):
+        super().__init__()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_first = fail_first
+
+    async def create(self, model, input):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail_first and input[0] == self.fail_first:
+                self.fail_first = None
+                request = httpx.Request("POST", "https://api.openai.com/v1/embeddings")
+                response = httpx.Response(429, request=request, headers={"retry-after": "0"})
+                raise RateLimitError("rate limited", response=response, body=None)
+            return await super().create(model, input)
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.mark.asyncio
+async def test_batches_run_concurrently_and_keep_order():
+    embedder = Embedder("test-key", max_concurrency=3)
+    fake = SlowEmbeddings()
+    embedder.client = SimpleNamespace(embeddings=fake)
+    texts = ["x" * (i + 1) for i in range(10)]
+
+    embeddings = await embedder.embed_text(texts, batch_size=2)
+
+    assert [e[0] for e in embeddings] == [float(i + 1) for i in range(10)]
+    assert fake.max_in_flight == 3
+    assert embedder.stats.texts == 10
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_batch_is_retried_alone():
+    embedder = Embedder("test-key", max_concurrency=2)
+    fake = SlowEmbeddings(fail_first="ccc")
+    embedder.client = SimpleNamespace(embeddings=fake)
+
+    embeddings = await embedder.embed_text(["a", "bb", "ccc", "dddd"], batch_size=2)
+
+    assert [e[0] for e in embeddings] == [1.0, 2.0, 3.0, 4.0]
+    assert fake.calls.count(["a", "bb"]) == 1
+    assert fake.calls.count(["ccc", "dddd"]) == 1
+    assert embedder.stats.retries == 1
+
+
+def test_batches_respect_token_budget():
+    embedder = Embedder("test-key", max_batch_tokens=30)
+    texts = ["y" * 80] * 5
+
+    batches = embedder._make_batches(texts, list(range(5)), batch_size=100)
+
+    assert batches == [[0], [1], [2], [3], [4]]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_single_texts_are_micro_batched(tmp_path):
+    embedder = Embedder("test-key", cache_path=tmp_path / "embeddings.sqlite")
+    fake = FakeEmbeddings()
+    embedder.client = SimpleNamespace(embeddings=fake)
+
+    embeddings = await asyncio.gather(*(embedder.embed_text("q" * n) for n in range(1, 6)))
+
+    assert embeddings == [[float(n), 1.0] for n in range(1, 6)]
+    assert fake.calls == [["q", "qq", "qqq", "qqqq", "qqqqq"]]
+    # Served from the cache without another request
+    assert await embedder.embed_text("qqq") == [3.0, 1.0]
+    assert len(fake.calls) == 1
+
+
+class GatedEmbeddings(FakeEmbeddings):
+    """Holds back every request that contains chapter text until the gate opens."""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = asyncio.Event()
+
+    async def create(self, model, input):
+        if any(text.startswith("chapter") for text in input):
+            await self.gate.wait()
+        return await super().create(model, input)
+
+
+@pytest.mark.asyncio
+async def test_question_embeddings_do_not_wait_behind_indexing():
+    embedder = Embedder("test-key", max_concurrency=1, index_concurrency=1)
+    fake = GatedEmbeddings()
+    embedder.client = SimpleNamespace(embeddings=fake)
+
+    indexing = asyncio.create_task(embedder.embed_text(["chapter 1", "chapter 2"], batch_size=1, background=True))
+    await asyncio.sleep(0.01)
+
+    assert await asyncio.wait_for(embedder.embed_text("What is an acid?"), 1) == [16.0, 1.0]
+    assert await asyncio.wait_for(embedder.embed_text(["Why?", "How?"]), 1) == [[4.0, 1.0], [4.0, 1.0]]
+    assert not indexing.done()
+    fake.gate.set()
+    assert await indexing == [[9.0, 1.0], [9.0, 1.0]]
@@ -0,0 +1,79 @@
+# tests/test_http_cache.py
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.http_cache import PrecompressedStaticFiles, cached_response, accepted_encodings
+
+
+def make_client(static_dir):
+    app = FastAPI()
+    static_files = PrecompressedStaticFiles(directory=str(static_dir))
+    app.mount("/static", static_files, name="static")
+
+    @app.get("/api/data")
+    async def data(request: Request):
+        return cached_response(request, b'{"a":1}', "v1")
+
+    return TestClient(app), static_files
+
+
+def test_api_etag_and_304(tmp_path):
+    client, _ = make_client(tmp_path)
+
+    first = client.get("/api/data")
+    etag = first.headers["etag"]
+    second = client.get("/api/data", headers={"If-None-Match": etag})
+
+    assert first.status_code == 200 and first.json() == {"a": 1}
+    assert etag.startswith('"v1-')
+    assert second.status_code == 304
+    assert second.content == b""
+
+
+def test_static_files_precompressed_and_fingerprinted(tmp_path):
+    script = "console.log('hello');\n" * 100
+    (tmp_path / "app.js").write_text(script)
+    client, static_files = make_client(tmp_path)
+
+    url = static_files.asset_url("/static", "app.js")
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+    revalidated = client.get("/static/app.js", headers={
+        "Accept-Encoding": "identity", "If-None-Match": plain.headers["etag"]
+    })
+
+    assert "?v=" in url
+    assert response.headers["content-encoding"] == "gzip"
+    assert "immutable" in response.headers["cache-control"]
+    assert response.text == script
+    assert plain.headers["cache-control"] == "no-cache"
+    assert plain.headers["etag"] != response.headers["etag"]
+    assert revalidated.status_code == 304
+
+
+def test_static_file_changes_are_picked_up(tmp_path):
+    asset = tmp_path / "style.css"
+    asset.write_text("body { color: red; }")
+    client, static_files = make_client(tmp_path)
+    old_url = static_files.asset_url("/static", "style.css")
+
+    asset.write_text("body { color: blue; }")
+
+    assert static_files.asset_url("/static", "style.css") != old_url
+    assert client.get("/static/style.css").text == "body { color: blue; }"
+
+
+def test_accepted_encodings_skips_refused():
+    assert accepted_encodings("gzip;q=0, br") == {"br"}
+    assert accepted_encodings("br;q=0.5, gzip") == {"br", "gzip"}
+
+
+def test_static_range_requests_get_partial_identity_body(tmp_path):
+    script = "console.log('hello');\n" * 100
+    (tmp_path / "app.js").write_text(script)
+    client, _ = make_client(tmp_path)
+
+    response = client.get("/static/app.js", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"})
+
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.content == script.encode()[:10]
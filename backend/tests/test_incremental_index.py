@@ -0,0 +1,130 @@
+# tests/test_incremental_index.py
+from types import SimpleNamespace
+import pytest
+from app.services.rag.text_processor import TextProcessor
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.texts = 0
+
+    async def create(self, model, input):
+        self.texts += len(input)
+        return SimpleNamespace(data=[
+            SimpleNamespace(embedding=[float(len(text)), 1.0, 0.5]) for text in input
+        ])
+
+
+@pytest.fixture
+def make_indexed_pipeline(tmp_path, make_pipeline):
+    """A pipeline whose index and manifest persist in `tmp_path`, with its embeddings counter."""
+    def make():
+        fake = CountingEmbeddings()
+        pipeline = make_pipeline(
+            fake, vector_index_path=tmp_path / "index", index_manifest_path=tmp_path / "index" / "manifest.json"
+        )
+        return pipeline, fake
+
+    return make
+
+
+@pytest.mark.asyncio
+async def test_reindex_only_touches_changed_chunks(tmp_path, make_indexed_pipeline):
+    book = tmp_path / "book"
+    book.mkdir()
+    (book / "chapter_01.txt").write_text("Acids turn blue litmus red.")
+    (book / "chapter_02.txt").write_text("Light bends when it enters glass.")
+
+    pipeline, fake = make_indexed_pipeline()
+    first = await pipeline.index_directory(book)
+    assert (first["added"], first["removed"]) == (2, 0)
+
+    (book / "chapter_02.txt").write_text("Light slows down when it enters glass.")
+    (book / "chapter_01.txt").unlink()
+    pipeline, fake = make_indexed_pipeline()
+    second = await pipeline.index_directory(book)
+
+    assert (second["added"], second["removed"], second["unchanged"]) == (1, 2, 0)
+    assert fake.texts == 1
+    assert len(pipeline.vector_store.backend) == 1
+
+    third = await pipeline.index_directory(book)
+    assert (third["added"], third["removed"], third["unchanged"]) == (0, 0, 1)
+
+
+@pytest.mark.asyncio
+async def test_full_rebuild_only_touches_its_own_book(tmp_path, make_indexed_pipeline):
+    for book, text in (("a", "Acids turn blue litmus red."), ("b", "Light bends when it enters glass.")):
+        (tmp_path / book).mkdir()
+        (tmp_path / book / "chapter_01.txt").write_text(text)
+    pipeline, _ = make_indexed_pipeline()
+    await pipeline.index_directory(tmp_path / "a")
+    await pipeline.index_directory(tmp_path / "b")
+
+    rebuilt = await pipeline.index_directory(tmp_path / "a", incremental=False)
+
+    assert (rebuilt["added"], rebuilt["removed"]) == (1, 1)
+    assert len(pipeline.vector_store.backend) == 2
+    assert sorted(pipeline.manifest.documents) == ["a/chapter_01.txt", "b/chapter_01.txt"]
+
+    await pipeline.clear_index()
+    assert len(pipeline.vector_store.backend) == 0
+    assert pipeline.manifest.documents == {}
+
+
+@pytest.mark.asyncio
+async def test_indexes_are_saved_at_checkpoints_not_per_document(tmp_path, make_indexed_pipeline):
+    book = tmp_path / "book"
+    book.mkdir()
+    for i in range(1, 6):
+        (book / f"chapter_{i:02d}.txt").write_text(f"Chapter {i} is about topic number {i}.")
+    pipeline, _ = make_indexed_pipeline()
+    saves = []
+    persist = pipeline.vector_store.persist
+
+    async def counting_persist():
+        saves.append(len(pipeline.vector_store.backend))
+        await persist()
+
+    pipeline.vector_store.persist = counting_persist
+    await pipeline.index_directory(book, checkpoint_interval=3600)
+
+    assert saves == [5]
+    reopened, _ = make_indexed_pipeline()
+    assert len(reopened.vector_store.backend) == 5
+    assert len(reopened.manifest.documents) == 5
+
+
+@pytest.mark.asyncio
+async def test_lexical_mode_indexes_without_embeddings(tmp_path, make_pipeline):
+    book = tmp_path / "book"
+    book.mkdir()
+    (book / "chapter_01.txt").write_text("Acids turn blue litmus red.")
+    (book / "chapter_04.txt").write_text("Carbon forms covalent bonds.")
+
+    pipeline = make_pipeline(retrieval_mode="lexical", lexical_index_path=tmp_path / "lexical")
+    await pipeline.index_directory(book)
+
+    assert pipeline.vector_store.embedder is None
+    results = await pipeline.vector_store.query("covalent bonds")
+    assert [r["source"] for r in results] == ["chapter_04.txt"]
+
+
+@pytest.mark.asyncio
+async def test_reindex_renumbers_chunks_that_moved(tmp_path, make_indexed_pipeline):
+    book = tmp_path / "book"
+    book.mkdir()
+    paragraphs = [f"Paragraph {name} explains one more idea about magnets." for name in ("one", "two", "three")]
+    chapter = book / "chapter_01.txt"
+    chapter.write_text("\n\n".join(paragraphs))
+    pipeline, _ = make_indexed_pipeline()
+    pipeline.text_processor = TextProcessor(chunk_size=60, chunk_overlap=0)
+    await pipeline.index_directory(book)
+
+    chapter.write_text("\n\n".join(["Paragraph zero is a new opening about magnets."] + paragraphs))
+    second = await pipeline.index_directory(book)
+
+    assert (second["added"], second["removed"], second["unchanged"]) == (1, 0, 3)
+    backend = pipeline.vector_store.backend
+    assert len(backend) == 4
+    assert sorted(metadata["chunk_id"] for metadata in backend._metadata) == [0, 1, 2, 3]
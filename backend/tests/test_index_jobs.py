@@ -0,0 +1,104 @@
+# tests/test_index_jobs.py
+from types import SimpleNamespace
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.services.index_jobs import IndexJobQueue
+
+
+async def wait_for(condition, timeout=10.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        assert loop.time() < deadline, "condition not met in time"
+        await asyncio.sleep(0.01)
+
+
+class GatedEmbeddings:
+    """Holds back texts mentioning "glass" until the gate opens."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.waiting = False
+        self.texts = []
+
+    async def create(self, model, input):
+        if any("glass" in text for text in input) and not self.gate.is_set():
+            self.waiting = True
+            await self.gate.wait()
+        self.texts.extend(input)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text)), 1.0]) for text in input])
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_one_at_a_time_and_can_be_cancelled():
+    release = asyncio.Event()
+
+    async def run(job):
+        job.progress["files"] = 1
+        await release.wait()
+        return {"added": 1}
+
+    queue = IndexJobQueue(run, max_running=1)
+    first = queue.submit("/books/a")
+    second = queue.submit("/books/b")
+    await wait_for(lambda: first.state == "running")
+
+    assert second.state == "queued"
+    assert queue.active("/books/b") is second
+    assert queue.cancel(second.id)
+    await asyncio.gather(second.task)
+    assert second.state == "cancelled"
+    assert not queue.cancel(second.id)
+
+    release.set()
+    await first.task
+    assert (first.state, first.result) == ("completed", {"added": 1})
+    assert queue.resume(first.id) is None
+    assert [job.id for job in queue.jobs()] == [second.id, first.id]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_index_job_resumes_after_last_committed_document(tmp_path, make_pipeline):
+    book = tmp_path / "book"
+    book.mkdir()
+    (book / "chapter_01.txt").write_text("Acids turn blue litmus red.")
+    (book / "chapter_02.txt").write_text("Light bends when it enters glass.")
+    fake = GatedEmbeddings()
+    pipeline = make_pipeline(fake)
+
+    async def run(job):
+        return await pipeline.index_directory(
+            book, incremental=job.incremental, embed_workers=1, process_workers=1, progress=job.progress
+        )
+
+    queue = IndexJobQueue(run)
+    job = queue.submit(str(book), incremental=False)
+    await wait_for(lambda: fake.waiting and job.progress.get("files_done") == 1)
+    assert job.to_dict()["eta_seconds"] is not None
+    queue.cancel(job.id)
+    await job.task
+
+    assert job.state == "cancelled"
+    assert job.progress["upserted"] == 1
+
+    fake.gate.set()
+    resumed = queue.resume(job.id)
+    await resumed.task
+
+    assert (resumed.state, resumed.resumes, resumed.incremental) == ("completed", job.id, True)
+    assert (resumed.result["added"], resumed.result["unchanged"]) == (1, 1)
+    assert resumed.progress == {
+        "files": 2, "files_done": 2, "chunks": 2, "chunks_new": 1, "embedded": 1, "upserted": 1
+    }
+    # The committed chapter was not embedded again
+    assert fake.texts == ["Acids turn blue litmus red.", "Light bends when it enters glass."]
+
+
+def test_index_endpoint_only_accepts_book_directories():
+    client = TestClient(main.app)
+
+    assert client.post("/api/admin/index", json={"book": "../app"}).status_code == 400
+    assert client.post("/api/admin/index", json={"book": "no_such_book"}).status_code == 400
+    assert client.get("/api/admin/index/jobs/unknown").status_code == 404
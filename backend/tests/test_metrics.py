@@ -0,0 +1,54 @@
+# tests/test_metrics.py
+import logging
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.logging import RequestContextMiddleware, RequestIdFilter, request_id_var
+from app.core.metrics import MetricsRegistry, HTTP_REQUEST_SECONDS
+from app.services.rag.timings import StageTimings
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Stage latency", ("stage",), buckets=(0.1, 1.0))
+    hits = registry.counter("cache_total", "Cache lookups", ("outcome",))
+
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value, stage="embed")
+    hits.inc(outcome="miss")
+
+    text = registry.render()
+    assert 'stage_seconds_bucket{stage="embed",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="embed",le="1"} 3' in text
+    assert 'stage_seconds_bucket{stage="embed",le="+Inf"} 4' in text
+    assert 'stage_seconds_count{stage="embed"} 4' in text
+    assert 'cache_total{outcome="miss"} 1' in text
+
+
+def test_requests_get_ids_and_stage_spans(caplog):
+    app = FastAPI()
+    app.add_middleware(RequestContextMiddleware)
+    timings = StageTimings()
+    seen_ids = []
+
+    @app.get("/work/{item}")
+    async def work(item: str):
+        seen_ids.append(request_id_var.get())
+        timings.record("retrieve", 12.5)
+        return {"item": item}
+
+    client = TestClient(app)
+    with caplog.at_level(logging.INFO, logger="app.core.logging"):
+        response = client.get("/work/a", headers={"X-Request-ID": "abc123"})
+        generated = client.get("/work/b").headers["x-request-id"]
+
+    assert response.headers["x-request-id"] == "abc123"
+    assert seen_ids == ["abc123", generated]
+    assert any("retrieve=12.5ms" in r.getMessage() for r in caplog.records)
+    assert HTTP_REQUEST_SECONDS.count(method="GET", route="/work/{item}", status="200") >= 2
+    assert timings.stats()["retrieve"]["count"] == 2
+
+
+def test_request_id_filter_defaults_outside_requests():
+    record = logging.LogRecord("x", logging.INFO, __file__, 1, "msg", None, None)
+    RequestIdFilter().filter(record)
+    assert record.request_id == "-"
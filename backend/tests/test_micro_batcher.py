@@ -0,0 +1,63 @@
+# tests/test_micro_batcher.py
+import asyncio
+import pytest
+from app.services.rag.micro_batcher import MicroBatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def recording(calls, fail=False):
+    async def fn(items):
+        calls.append(list(items))
+        await asyncio.sleep(0)
+        if fail:
+            raise RuntimeError("upstream down")
+        return [item.upper() for item in items]
+    return fn
+
+
+@pytest.mark.asyncio
+async def test_concurrent_items_share_a_call():
+    calls = []
+    batcher = MicroBatcher(recording(calls), max_batch_size=4, max_wait=0.01)
+
+    results = await asyncio.gather(*(batcher.submit(c) for c in "abcdef"))
+
+    assert results == list("ABCDEF")
+    assert calls == [list("abcd"), list("ef")]
+    assert batcher.stats()["mean_batch_size"] == 3.0
+
+
+@pytest.mark.asyncio
+async def test_window_is_zero_when_idle_and_grows_under_load():
+    clock = FakeClock()
+    batcher = MicroBatcher(recording([]), max_batch_size=8, max_wait=0.005, clock=clock)
+    assert batcher.window() == 0.0
+
+    # Arrivals 0.1ms apart: waiting long enough to fill a batch, capped at max_wait
+    for _ in range(20):
+        clock.now += 0.0001
+        await batcher.submit("q")
+    assert 0 < batcher.window() <= 0.005
+
+    # Traffic stops: the first request after the pause goes out immediately again
+    for _ in range(20):
+        clock.now += 1.0
+        await batcher.submit("q")
+    assert batcher.window() == 0.0
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    batcher = MicroBatcher(recording([], fail=True), max_wait=0.01)
+
+    results = await asyncio.gather(*(batcher.submit(c) for c in "abc"), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert batcher.stats()["pending"] == 0
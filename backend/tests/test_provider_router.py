@@ -0,0 +1,119 @@
+# tests/test_provider_router.py
+import asyncio
+import pytest
+from app.services.rag.provider_router import ProviderRouter
+
+
+class FakeProvider:
+    """Local stand-in for an LLM chain with a fixed latency and optional failures."""
+
+    def __init__(self, answer, latency=0.0, fail=False):
+        self.answer = answer
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("rate limited")
+        return self.answer
+
+    async def astream(self, inputs):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("rate limited")
+        for word in self.answer.split():
+            await asyncio.sleep(self.latency)
+            yield word + " "
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.asyncio
+async def test_routes_to_fastest_provider():
+    slow, fast = FakeProvider("slow", latency=0.05), FakeProvider("fast", latency=0.0)
+    router = ProviderRouter({"slow": slow, "fast": fast}, hedge=False)
+
+    # Both get measured once, then the faster one wins every time
+    for _ in range(2):
+        await router.ainvoke({})
+    results = [await router.ainvoke({}) for _ in range(5)]
+
+    assert results == [("fast", "fast")] * 5
+    assert router.ranked() == ["fast", "slow"]
+
+
+@pytest.mark.asyncio
+async def test_hedge_returns_first_answer():
+    stuck, backup = FakeProvider("stuck", latency=1.0), FakeProvider("backup", latency=0.0)
+    router = ProviderRouter({"stuck": stuck, "backup": backup}, hedge_delay=0.02)
+
+    start = asyncio.get_running_loop().time()
+    provider, answer = await router.ainvoke({})
+
+    assert (provider, answer) == ("backup", "backup")
+    assert asyncio.get_running_loop().time() - start < 0.5
+    assert router.hedges == 1 and router.hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_provider_that_always_loses_the_hedge_drops_in_ranking():
+    slow, fast = FakeProvider("slow", latency=0.5), FakeProvider("fast", latency=0.0)
+    router = ProviderRouter({"slow": slow, "fast": fast}, hedge_delay=0.02)
+
+    results = [await router.ainvoke({}) for _ in range(3)]
+
+    assert results == [("fast", "fast")] * 3
+    assert router.ranked() == ["fast", "slow"]
+    assert (router.hedges, router.hedge_wins) == (1, 1)
+    assert router.health["slow"].latencies
+
+
+@pytest.mark.asyncio
+async def test_failover_is_not_counted_as_a_hedge_win():
+    broken, backup = FakeProvider("broken", fail=True), FakeProvider("backup")
+    router = ProviderRouter({"broken": broken, "backup": backup}, hedge_delay=1.0)
+
+    assert await router.ainvoke({}) == ("backup", "backup")
+    assert (router.failovers, router.hedge_wins) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_and_recovers():
+    clock = FakeClock()
+    flaky, steady = FakeProvider("flaky", fail=True), FakeProvider("steady")
+    router = ProviderRouter(
+        {"flaky": flaky, "steady": steady},
+        hedge=False, failure_threshold=2, reset_timeout=10, clock=clock
+    )
+
+    # Failures fall over to the healthy provider
+    assert (await router.ainvoke({}))[0] == "steady"
+    assert (await router.ainvoke({}))[0] == "steady"
+    assert router.health["flaky"].state == "open"
+    assert router.ranked() == ["steady"]
+
+    clock.now = 11
+    flaky.fail = False
+    assert router.health["flaky"].state == "half_open"
+    assert (await router.ainvoke({}))[0] == "flaky"
+    assert router.health["flaky"].state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_stream_falls_over_before_first_chunk():
+    router = ProviderRouter({"down": FakeProvider("x", fail=True), "up": FakeProvider("hello there")})
+
+    chunks = [item async for item in router.astream({})]
+
+    assert {provider for provider, _ in chunks} == {"up"}
+    assert "".join(chunk for _, chunk in chunks) == "hello there "
+    assert router.failovers == 1
@@ -0,0 +1,128 @@
+# tests/test_quiz.py
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+from app.api.endpoints import quiz
+from app.services.catalog import Catalog
+from app.services.quiz import QuestionBank
+from app.services.quiz.builder import QuizBankBuilder
+from app.services.quiz.generator import QuizGenerator, parse_questions
+
+
+def fake_llm(calls):
+    """Writes one question per passage, naming the passage's first word."""
+    def respond(prompt_value):
+        passage = prompt_value.to_string().split("Passage:")[1].split()[0]
+        calls.append(passage)
+        return "Here you go:\n```json\n" + json.dumps([{
+            "question": f"What is {passage}?",
+            "options": ["right", "wrong 1", "wrong 2", "wrong 3"],
+            "answer": 0,
+            "explanation": "It says so."
+        }]) + "\n```"
+    return RunnableLambda(respond)
+
+
+def test_parse_questions_drops_malformed_items():
+    reply = json.dumps([
+        {"question": "Q1", "options": ["a", "b", "c", "d"], "answer": 2},
+        {"question": "Q2", "options": ["a", "b"], "answer": 0},
+        {"question": "Q3", "options": ["a", "b", "c", "d"], "answer": 7},
+    ])
+
+    assert [q["question"] for q in parse_questions("Sure! " + reply)] == ["Q1"]
+    assert parse_questions("no json here") == []
+
+
+@pytest.mark.asyncio
+async def test_builder_only_regenerates_changed_chapters(tmp_path):
+    book = tmp_path / "raw" / "class_10_science"
+    book.mkdir(parents=True)
+    (book / "chapter_01.txt").write_text("Acids turn blue litmus red.")
+    (book / "chapter_02.txt").write_text("Lenses bend light.")
+    calls = []
+    bank = QuestionBank(tmp_path / "quiz")
+    builder = QuizBankBuilder(bank, QuizGenerator(fake_llm(calls)), workers=2)
+
+    first = await builder.build_all(tmp_path / "raw")
+    (book / "chapter_02.txt").write_text("Mirrors reflect light.")
+    second = await builder.build(book)
+
+    assert (first["generated"], first["questions"]) == (2, 2)
+    assert (second["generated"], second["unchanged"]) == (1, 1)
+    assert sorted(calls) == ["Acids", "Lenses", "Mirrors"]
+    # A fresh instance reads the compressed files back
+    reopened = QuestionBank(tmp_path / "quiz")
+    assert reopened.questions("class_10_science/2")[0]["question"] == "What is Mirrors?"
+    assert reopened.keys() == ["class_10_science/1", "class_10_science/2"]
+
+
+@pytest.mark.asyncio
+async def test_chapter_without_usable_questions_is_retried(tmp_path):
+    book = tmp_path / "raw" / "class_10_science"
+    book.mkdir(parents=True)
+    (book / "chapter_01.txt").write_text("Acids turn blue litmus red.")
+    bank = QuestionBank(tmp_path / "quiz")
+
+    broken = await QuizBankBuilder(bank, QuizGenerator(RunnableLambda(lambda _: "Sorry, no."))).build(book)
+    calls = []
+    retried = await QuizBankBuilder(bank, QuizGenerator(fake_llm(calls))).build(book)
+
+    assert (broken["generated"], broken["failed"]) == (0, 1)
+    assert (retried["generated"], calls) == (1, ["Acids"])
+
+
+def test_quiz_shuffles_options_and_tracks_the_answer(tmp_path):
+    bank = QuestionBank(tmp_path)
+    bank.put("book/1", "hash", [
+        {"id": str(i), "question": f"Q{i}", "options": [f"right {i}", "x", "y", "z"], "answer": 0}
+        for i in range(20)
+    ])
+
+    quiz = bank.quiz("book/1", count=5, seed=7)
+
+    assert len(quiz) == 5 and len({q["id"] for q in quiz}) == 5
+    assert all(q["options"][q["answer"]] == f"right {q['id']}" for q in quiz)
+    assert bank.quiz("book/1", count=5, seed=7) == quiz
+    assert bank.quiz("missing/1") == []
+
+
+def test_bank_picks_up_chapters_written_by_another_process(tmp_path):
+    server = QuestionBank(tmp_path, check_interval=0)
+    QuestionBank(tmp_path).put("book/1", "v1", [{"id": "a", "question": "Old?"}])
+    server.maybe_reload()
+    assert server.questions("book/1")[0]["question"] == "Old?"
+
+    QuestionBank(tmp_path).put("book/1", "v2", [{"id": "b", "question": "New?"}])
+    server.maybe_reload()
+
+    assert server.questions("book/1")[0]["question"] == "New?"
+    assert server.content_hash("book/1") == "v2"
+
+
+def test_quiz_endpoint_serves_from_the_bank(tmp_path):
+    catalog_dir = tmp_path / "catalog"
+    catalog_dir.mkdir()
+    (catalog_dir / "science.json").write_text(json.dumps({
+        "id": "science", "name": "Science", "grade": "Class 10", "book": "class_10_science",
+        "chapters": [
+            {"id": "ch1", "title": "Reactions", "description": "", "topics": [], "chapter_number": 1},
+            {"id": "ch2", "title": "Acids", "description": "", "topics": [], "chapter_number": 2},
+        ]
+    }))
+    app = FastAPI()
+    app.state.catalog = Catalog(catalog_dir)
+    app.state.question_bank = QuestionBank(tmp_path / "quiz")
+    app.state.question_bank.put("class_10_science/1", "hash", [
+        {"id": "a", "question": "Q", "options": ["1", "2", "3", "4"], "answer": 1}
+    ])
+    app.include_router(quiz.router)
+    client = TestClient(app)
+
+    response = client.get("/api/quiz/ch1", params={"count": 5})
+    assert response.status_code == 200
+    assert response.json()["questions"][0]["id"] == "a"
+    assert client.get("/api/quiz/ch2").status_code == 404
+    assert client.get("/api/quiz/missing").status_code == 404
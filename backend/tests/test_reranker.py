@@ -0,0 +1,55 @@
+# tests/test_reranker.py
+import pytest
+from app.services.rag.reranker import LexicalReranker, MMRReranker
+
+
+def chunk(text, score, source="ch.txt"):
+    return {"text": text, "score": score, "source": source}
+
+
+@pytest.mark.asyncio
+async def test_lexical_reranker_promotes_term_matches():
+    candidates = [
+        chunk("Plants grow towards light.", 0.9),
+        chunk("Magnets attract iron filings.", 0.85),
+        chunk("Photosynthesis converts light, water and carbon dioxide into glucose.", 0.5),
+    ]
+
+    ranked = await LexicalReranker(weight=0.7).rerank("What does photosynthesis produce?", candidates, top_n=2)
+
+    assert ranked[0]["text"].startswith("Photosynthesis")
+    assert ranked[0]["retrieval_score"] == 0.5
+    assert len(ranked) == 2
+
+
+@pytest.mark.asyncio
+async def test_mmr_reranker_skips_redundant_chunks():
+    candidates = [
+        chunk("Acids turn blue litmus red and taste sour.", 0.95),
+        chunk("Acids turn blue litmus red and taste sour!", 0.94),
+        chunk("Bases turn red litmus blue and feel soapy.", 0.80),
+    ]
+
+    ranked = await MMRReranker(relevance_weight=0.5).rerank("acids and bases", candidates, top_n=2)
+
+    assert [c["score"] for c in ranked] == sorted((c["score"] for c in ranked), reverse=True)
+    assert ranked[1]["text"].startswith("Bases")
+
+
+@pytest.mark.asyncio
+async def test_pipeline_over_fetches_and_times_stages(make_pipeline):
+    pipeline = make_pipeline(answers=["Answer."], reranker="lexical", rerank_candidates=20, top_k=2)
+    await pipeline.vector_store.backend.upsert([
+        {"id": f"c{i}", "values": [1.0, 0.01 * i], "metadata": {"text": f"Filler text {i}.", "source": f"{i}.txt"}}
+        for i in range(10)
+    ] + [
+        {"id": "target", "values": [0.2, 1.0], "metadata": {"text": "Refraction bends light.", "source": "light.txt"}}
+    ])
+
+    result = await pipeline.answer_question("What is refraction?")
+
+    assert "light.txt" in result["sources"]
+    assert len(result["sources"]) == 2
+    stages = pipeline.stats()["stages"]
+    assert {"embed", "retrieve", "rerank", "generate"} <= set(stages)
+    assert stages["rerank"]["count"] == 1
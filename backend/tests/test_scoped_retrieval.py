@@ -0,0 +1,28 @@
+# tests/test_scoped_retrieval.py
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_scope_restricts_retrieval_and_cache(tmp_path, make_pipeline):
+    for book, text in (("science", "Acids turn blue litmus red."), ("history", "The salt march began in 1930.")):
+        (tmp_path / book).mkdir()
+        (tmp_path / book / "chapter_01.txt").write_text(text)
+        (tmp_path / book / "chapter_02.txt").write_text(f"{book} chapter two.")
+    # Every text embeds the same, so only the scope decides what is retrieved
+    pipeline = make_pipeline(answers=["Science answer.", "History answer."])
+    for book in ("science", "history"):
+        await pipeline.index_directory(tmp_path / book)
+
+    science = await pipeline.answer_question("What happened?", scope={"book": "science", "chapter": 1})
+    history = await pipeline.answer_question("What happened?", scope={"book": "history", "chapter": 1})
+
+    assert science["sources"] == ["chapter_01.txt"]
+    contexts = await pipeline.vector_store.query("x", top_k=10, filter={"book": "history", "chapter": 1})
+    assert [c["text"] for c in contexts] == ["The salt march began in 1930."]
+    # Same question, different scope: not served from the other scope's cache entry
+    assert (science["answer"], history["answer"]) == ("Science answer.", "History answer.")
+    assert (await pipeline.answer_question("What happened?", scope={"book": "history", "chapter": 1}))["answer"] == "History answer."
+
+    # A scope with nothing indexed falls back to the whole index
+    unknown = await pipeline.answer_question("Anything?", scope={"book": "maths"})
+    assert unknown["sources"]
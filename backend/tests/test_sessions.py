@@ -0,0 +1,154 @@
+# tests/test_sessions.py
+from types import SimpleNamespace
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.runnables import RunnableLambda
+from app.api.endpoints import tutor
+from app.services.catalog import Catalog
+from app.services.pipeline_loader import PipelineLoader
+from app.services.rag.sessions import SessionStore
+from app.services.rag.tokens import estimate_tokens
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TopicEmbeddings:
+    """Texts about acids and the salt march point different ways; vague ones in between."""
+
+    @staticmethod
+    def embed(text):
+        if "acid" in text.lower():
+            return [1.0, 0.0]
+        if "salt" in text.lower():
+            return [0.0, 1.0]
+        return [0.6, 0.8]
+
+    async def create(self, model, input):
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self.embed(text)) for text in input])
+
+
+def answer(text):
+    return {"answer": text, "sources": ["chapter_01.txt"]}
+
+
+def test_history_is_rolled_up_within_budget():
+    store = SessionStore(history_tokens=60)
+    session = store.create()
+
+    for i in range(6):
+        store.record(session, f"Question {i}?", answer(f"Answer {i}. " + "More detail. " * 5), [], None)
+
+    assert estimate_tokens(session.history()) <= 60
+    assert session.turns[-1].question == "Question 5?"
+    assert session.summary and session.summary[-1].startswith("Asked: Question")
+    assert store.stats()["summarized_turns"] == 6 - len(session.turns)
+
+    # A single answer longer than the whole budget is cut down
+    store.record(session, "Long?", answer("word " * 500), [], None)
+    assert estimate_tokens(session.history()) <= 60
+
+
+def test_sessions_are_evicted_by_count_memory_and_idle_time():
+    clock = Clock()
+    store = SessionStore(max_sessions=2, max_bytes=10_000, ttl_seconds=60, clock=clock)
+    first, second = store.create(), store.create()
+    store.get(first.id)
+    store.create()
+
+    # `first` was used more recently than `second`
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first
+
+    store.record(first, "Big?", answer("x"), [{"text": "y" * 20_000}], [1.0, 0.0])
+    assert store.get(first.id) is None
+    assert store.stats()["bytes"] <= 10_000
+
+    third = store.create()
+    clock.now = 61
+    assert store.get(third.id) is None
+    assert store.stats()["expirations"] == 1
+
+
+def test_contexts_are_reused_only_for_related_follow_ups():
+    store = SessionStore(reuse_threshold=0.7)
+    session = store.create()
+    contexts = [{"text": "Acids turn blue litmus red.", "source": "chapter_01.txt"}]
+    store.record(session, "Why do acids turn litmus red?", answer("Because."), contexts, [1.0, 0.0])
+
+    assert store.reusable_contexts(session, "Why?", [0.6, 0.8]) == contexts
+    assert store.reusable_contexts(session, "What about strong acids and litmus paper?", [0.9, 0.1]) == contexts
+    assert store.reusable_contexts(session, "When did the salt march begin?", [0.0, 1.0]) is None
+    # Short, but about something else
+    assert store.reusable_contexts(session, "What is refraction?", [0.1, 1.0]) is None
+    assert store.reusable_contexts(session, "Why?", None) is None
+
+
+@pytest.fixture
+def tutor_pipeline(make_pipeline):
+    """A pipeline that numbers its answers and records every prompt in `pipeline.prompts`."""
+    prompts = []
+
+    def respond(prompt_value):
+        prompts.append(prompt_value.to_string())
+        return f"Answer {len(prompts)}."
+
+    pipeline = make_pipeline(TopicEmbeddings(), llm=RunnableLambda(respond))
+    pipeline.prompts = prompts
+    return pipeline
+
+
+@pytest.mark.asyncio
+async def test_follow_ups_reuse_contexts_and_see_the_history(tmp_path, tutor_pipeline):
+    (tmp_path / "science").mkdir()
+    (tmp_path / "science" / "chapter_01.txt").write_text("Acids turn blue litmus red.")
+    (tmp_path / "science" / "chapter_02.txt").write_text("The salt march began in 1930.")
+    pipeline = tutor_pipeline
+    await pipeline.index_directory(tmp_path / "science")
+    queries = []
+    query = pipeline.vector_store.query
+
+    async def counting_query(*args, **kwargs):
+        queries.append(args[0])
+        return await query(*args, **kwargs)
+
+    pipeline.vector_store.query = counting_query
+    session = pipeline.sessions.create()
+
+    first = await pipeline.answer_in_session(session, "Why do acids turn litmus red?")
+    follow_up = await pipeline.answer_in_session(session, "Why is that?")
+    new_topic = await pipeline.answer_in_session(session, "When did the salt march begin?")
+
+    assert (first["reused_context"], follow_up["reused_context"], new_topic["reused_context"]) == (False, True, False)
+    assert queries == ["Why do acids turn litmus red?", "When did the salt march begin?"]
+    assert follow_up["sources"] == first["sources"]
+    assert "Conversation so far" not in pipeline.prompts[0]
+    assert "Student: Why do acids turn litmus red?\nTutor: Answer 1." in pipeline.prompts[1]
+    assert pipeline.stats()["sessions"]["context_reuses"] == 1
+
+
+def test_session_endpoints(tmp_path, tutor_pipeline):
+    pipeline = tutor_pipeline
+    loader = PipelineLoader({}, factory=lambda config: pipeline)
+    loader.pipeline = pipeline
+    app = FastAPI()
+    app.state.pipeline_loader = loader
+    app.state.catalog = Catalog(tmp_path / "catalog")
+    app.include_router(tutor.router)
+    client = TestClient(app)
+
+    session_id = client.post("/api/tutor/sessions", json={}).json()["session_id"]
+    response = client.post(f"/api/tutor/sessions/{session_id}/ask", json={"question": "Why do acids turn litmus red?"})
+    history = client.get(f"/api/tutor/sessions/{session_id}").json()
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "Answer 1."
+    assert [turn["question"] for turn in history["turns"]] == ["Why do acids turn litmus red?"]
+    assert client.delete(f"/api/tutor/sessions/{session_id}").status_code == 204
+    assert client.post(f"/api/tutor/sessions/{session_id}/ask", json={"question": "Why?"}).status_code == 404
@@ -0,0 +1,38 @@
+# tests/test_single_flight.py
+import asyncio
+import pytest
+from app.services.rag.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return {"answer": "42"}
+
+    results = await asyncio.gather(*(flight.do("q", work) for _ in range(40)))
+
+    assert len(runs) == 1
+    assert all(r == {"answer": "42"} for r in results)
+    assert flight.stats() == {"calls": 1, "coalesced": 39, "in_flight": 0}
+
+    await flight.do("q", work)
+    assert len(runs) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter_and_release_the_key():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("q", fail) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,116 @@
+# tests/test_startup.py
+import subprocess
+import sys
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app import main
+from app.services.pipeline_loader import PipelineLoader, PipelineUnavailable
+
+
+class FakePipeline:
+    def __init__(self):
+        self.warmed = False
+
+    async def warm_up(self):
+        self.warmed = True
+        return {}
+
+    async def answer_question(self, question, scope=None):
+        return {"answer": f"About {question}", "sources": ["chapter_01.txt"]}
+
+
+def slow_factory(config):
+    time.sleep(0.3)
+    return FakePipeline()
+
+
+def failing_factory(config):
+    raise ValueError("An OpenAI or Groq API key is required to generate answers")
+
+
+class FlakyFactory:
+    """Fails the first `failures` builds, as during a network outage."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, config):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("Pinecone is unreachable")
+        return FakePipeline()
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_importing_the_app_does_not_load_the_rag_stack():
+    # A fresh interpreter, since other tests import the pipeline
+    code = "import sys, app.main; print(sorted(m for m in sys.modules if m.split('.')[0] in ('langchain', 'openai', 'pinecone')))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_catalog_serves_while_pipeline_warms_up(monkeypatch):
+    monkeypatch.setattr(main, "pipeline_loader", PipelineLoader({}, factory=slow_factory))
+
+    with TestClient(main.app) as client:
+        assert client.get("/health/ready").json()["state"] in ("loading", "warming")
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/api/subjects").status_code == 200
+        assert client.get("/health/live").status_code == 200
+
+        # Questions wait for the pipeline instead of failing
+        answer = client.post("/api/tutor/ask", json={"question": "acids"})
+        assert answer.status_code == 200
+        assert answer.json()["answer"] == "About acids"
+
+        ready = client.get("/health/ready")
+        assert ready.status_code == 200
+        assert ready.json()["state"] == "ready"
+        assert main.pipeline_loader.pipeline.warmed
+
+
+def test_failed_pipeline_is_reported_not_fatal(monkeypatch):
+    monkeypatch.setattr(main, "pipeline_loader", PipelineLoader({}, factory=failing_factory))
+
+    with TestClient(main.app) as client:
+        response = client.post("/api/tutor/ask", json={"question": "acids"})
+        assert response.status_code == 503
+        assert "API key is required" in response.json()["detail"]
+
+        ready = client.get("/health/ready")
+        assert ready.status_code == 503
+        assert ready.json()["state"] == "failed"
+        assert client.get("/api/subjects").status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_failed_start_is_retried_after_a_growing_cooldown():
+    clock = Clock()
+    factory = FlakyFactory(failures=2)
+    loader = PipelineLoader({}, factory=factory, retry_delay=10, clock=clock)
+
+    with pytest.raises(PipelineUnavailable, match="unreachable"):
+        await loader.get()
+    # Still cooling down: the failure is reported without building again
+    with pytest.raises(PipelineUnavailable):
+        await loader.get()
+    assert (factory.calls, loader.status()["retry_in_seconds"]) == (1, 10)
+
+    clock.now = 10
+    with pytest.raises(PipelineUnavailable):
+        await loader.get()
+    assert (factory.calls, loader.status()["retry_in_seconds"]) == (2, 20)
+
+    clock.now = 30
+    assert isinstance(await loader.get(), FakePipeline)
+    assert loader.status()["state"] == "ready"
+    assert (loader.status()["error"], loader.failures) == (None, 2)
@@ -0,0 +1,23 @@
+# tests/test_streaming.py
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_stream_answer_sends_sources_then_tokens(make_pipeline):
+    pipeline = make_pipeline(answers=["Reflexes are quick."])
+    await pipeline.vector_store.backend.upsert([
+        {"id": "a", "values": [1.0, 0.0], "metadata": {"text": "Reflex arcs", "source": "chapter_06.txt"}}
+    ])
+
+    events = [event async for event in pipeline.stream_answer("What is a reflex?")]
+
+    assert events[0] == {"type": "sources", "sources": ["chapter_06.txt"]}
+    tokens = [e["text"] for e in events if e["type"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == "Reflexes are quick."
+    assert events[-1]["type"] == "done" and events[-1]["ttft_ms"] is not None
+
+    # The streamed answer is cached for the next identical question
+    cached = [event async for event in pipeline.stream_answer("what is a reflex")]
+    assert cached[1] == {"type": "token", "text": "Reflexes are quick."}
+    assert cached[-1]["cached"] is True
@@ -1,7 +1,16 @@
 # tests/test_text_processor.py
+import time
 import pytest
+from app.services.rag import text_processor
 from app.services.rag.text_processor import TextProcessor
 
+
+def slow_after_first_chapter(file_path, chunk_size, chunk_overlap):
+    if not file_path.endswith("chapter_01.txt"):
+        time.sleep(3)
+    return [{"text": file_path, "chunk_id": 0}]
+
+
 def test_process_document():
     processor = TextProcessor(chunk_size=100, chunk_overlap=20)
     text = "This is a test document " * 10
@@ -11,4 +20,31 @@ def test_process_document():
     
     assert len(chunks) > 0
     assert all("text" in chunk for chunk in chunks)
-    assert all(chunk["chapter"] == 1 for chunk in chunks)
\ No newline at end of file
+    assert all(chunk["chapter"] == 1 for chunk in chunks)
+
+@pytest.mark.asyncio
+async def test_iter_directory_splits_every_file(tmp_path):
+    for i in range(1, 6):
+        (tmp_path / f"chapter_{i:02d}.txt").write_text(f"Chapter {i} text. " * 50)
+    processor = TextProcessor(chunk_size=200, chunk_overlap=20)
+
+    per_file = [chunks async for chunks in processor.iter_directory(tmp_path, max_workers=2)]
+
+    assert sorted(chunks[0]["chapter"] for chunks in per_file) == [1, 2, 3, 4, 5]
+    expected = processor.process_document((tmp_path / "chapter_03.txt").read_text(), {"chapter": 3, "source": "chapter_03.txt"})
+    assert next(c for c in per_file if c[0]["chapter"] == 3) == expected
+
+
+@pytest.mark.asyncio
+async def test_closing_iter_directory_early_does_not_wait_for_workers(tmp_path, monkeypatch):
+    for i in range(1, 4):
+        (tmp_path / f"chapter_{i:02d}.txt").write_text(f"Chapter {i} text.")
+    monkeypatch.setattr(text_processor, "_process_file", slow_after_first_chapter)
+    files = TextProcessor().iter_directory(tmp_path, max_workers=1)
+
+    first = await files.__anext__()
+    started = time.monotonic()
+    await files.aclose()
+
+    assert first[0]["text"].endswith("chapter_01.txt")
+    assert time.monotonic() - started < 1
@@ -0,0 +1,141 @@
+# tests/test_vector_backends.py
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import asyncio
+import time
+import numpy as np
+import pytest
+from app.services.rag.vector_backends import NumpyBackend, IVFBackend, PineconeBackend
+
+
+def make_vectors(n, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {"id": f"v{i}", "values": rng.normal(size=dim).tolist(), "metadata": {"text": f"chunk {i}"}}
+        for i in range(n)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_numpy_backend_exact_top_k(tmp_path):
+    backend = NumpyBackend(path=tmp_path)
+    vectors = make_vectors(50)
+    await backend.upsert(vectors)
+
+    matches = await backend.query(vectors[7]["values"], top_k=3)
+
+    assert matches[0]["id"] == "v7"
+    assert matches[0]["score"] == pytest.approx(1.0, abs=1e-5)
+    assert len(matches) == 3
+    assert matches[0]["score"] >= matches[1]["score"] >= matches[2]["score"]
+
+
+@pytest.mark.asyncio
+async def test_numpy_backend_delete_and_persist(tmp_path):
+    backend = NumpyBackend(path=tmp_path)
+    vectors = make_vectors(10)
+    await backend.upsert(vectors)
+    await backend.delete(["v3"])
+    await backend.flush()
+
+    reloaded = NumpyBackend(path=tmp_path)
+    matches = await reloaded.query(vectors[3]["values"], top_k=10)
+
+    assert len(reloaded) == 9
+    assert "v3" not in [m["id"] for m in matches]
+    assert (await reloaded.query(vectors[9]["values"], top_k=1))[0]["id"] == "v9"
+
+
+@pytest.mark.asyncio
+async def test_ivf_backend_finds_exact_match(tmp_path):
+    backend = IVFBackend(path=tmp_path, n_probe=4, min_train_size=100)
+    vectors = make_vectors(400)
+    await backend.upsert(vectors)
+
+    # Served by exact search while the clusters train in the background
+    matches = await backend.query(vectors[123]["values"], top_k=5)
+    assert matches[0]["id"] == "v123"
+
+    await backend.flush()
+    assert backend._centroids is not None
+    assert (await backend.query(vectors[123]["values"], top_k=5))[0]["id"] == "v123"
+    assert IVFBackend(path=tmp_path)._centroids is not None
+
+
+@pytest.mark.asyncio
+async def test_ivf_training_does_not_block_queries(tmp_path, monkeypatch):
+    backend = IVFBackend(n_probe=4, min_train_size=100)
+    vectors = make_vectors(400)
+    await backend.upsert(vectors)
+    fit = backend._fit
+    monkeypatch.setattr(backend, "_fit", lambda data: time.sleep(0.5) or fit(data))
+
+    start = time.perf_counter()
+    first = await backend.query(vectors[5]["values"], top_k=1)
+    await asyncio.gather(*(backend.query(vectors[i]["values"], top_k=1) for i in range(20)))
+    elapsed = time.perf_counter() - start
+    await backend.train()
+
+    assert first[0]["id"] == "v5"
+    assert elapsed < 0.3
+    assert backend._centroids is not None
+
+
+class SlowIndex:
+    """Stands in for the synchronous Pinecone index client."""
+
+    def __init__(self, latency):
+        self.latency = latency
+
+    def query(self, vector, top_k, include_metadata):
+        time.sleep(self.latency)
+        return SimpleNamespace(matches=[SimpleNamespace(id="v0", score=1.0, metadata={"text": "t"})])
+
+
+@pytest.mark.asyncio
+async def test_pinecone_calls_do_not_block_event_loop():
+    backend = PineconeBackend.__new__(PineconeBackend)
+    backend.index = SlowIndex(latency=0.05)
+    backend._executor = ThreadPoolExecutor(max_workers=10)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(backend.query([1.0], top_k=1) for _ in range(10)))
+    elapsed = time.perf_counter() - start
+
+    assert all(r[0]["id"] == "v0" for r in results)
+    # Serialized on the loop this would take 10 x 50ms
+    assert elapsed < 0.25
+
+
+@pytest.mark.asyncio
+async def test_numpy_query_batch_matches_single_queries(tmp_path):
+    backend = NumpyBackend(path=tmp_path)
+    vectors = make_vectors(100)
+    await backend.upsert(vectors)
+    queries = [vectors[i]["values"] for i in (3, 40, 99)]
+
+    batched = await backend.query_batch(queries, top_k=4, block_size=2)
+    single = [await backend.query(q, top_k=4) for q in queries]
+
+    assert [[m["id"] for m in r] for r in batched] == [[m["id"] for m in r] for r in single]
+    assert [r[0]["id"] for r in batched] == ["v3", "v40", "v99"]
+
+
+@pytest.mark.asyncio
+async def test_filtered_query_only_scores_the_partition(tmp_path):
+    backend = IVFBackend(path=tmp_path, min_train_size=16, n_lists=4, n_probe=1)
+    vectors = make_vectors(40)
+    for i, vector in enumerate(vectors):
+        vector["metadata"].update(book="science" if i < 30 else "social", chapter=i % 3)
+    await backend.upsert(vectors)
+
+    matches = await backend.query(vectors[35]["values"], top_k=50, filter={"book": "social", "chapter": 2})
+
+    assert [m["id"] for m in matches][0] == "v35"
+    assert {m["id"] for m in matches} == {"v32", "v35", "v38"}
+    assert await backend.query(vectors[0]["values"], top_k=5, filter={"book": "maths"}) == []
+
+    # The partition index picks up later writes
+    await backend.upsert([{"id": "new", "values": vectors[0]["values"], "metadata": {"book": "maths"}}])
+    batched = await backend.query_batch([vectors[0]["values"]], top_k=5, filter={"book": "maths"})
+    assert [m["id"] for m in batched[0]] == ["new"]
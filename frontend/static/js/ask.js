@@ -1,4 +1,12 @@
 // static/js/ask.js
+function renderSources(container, sources) {
+    if (!sources || sources.length === 0) {
+        container.innerHTML = '';
+        return;
+    }
+    container.innerHTML = `<small>Sources: ${sources.join(', ')}</small>`;
+}
+
 async function askQuestion() {
     const questionInput = document.getElementById('question');
     const answerContainer = document.getElementById('answer');
@@ -12,26 +20,53 @@ async function askQuestion() {
     answerContainer.innerHTML = '<p>Getting answer...</p>';
     
     try {
-        const response = await fetch('/api/tutor/ask', {
+        const response = await fetch('/api/tutor/ask/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({ question: question }),
         });
-        
-        const result = await response.json();
-        
+
+        if (!response.ok || !response.body) {
+            throw new Error('Failed to get answer');
+        }
+
         answerContainer.innerHTML = `
             <h3>Answer:</h3>
-            <p>${result.answer}</p>
-            ${result.sources ? `
-                <div class="sources">
-                    <small>Sources: ${result.sources.join(', ')}</small>
-                </div>
-            ` : ''}
+            <p class="answer-text"></p>
+            <div class="sources"></div>
         `;
+        const answerText = answerContainer.querySelector('.answer-text');
+        const sourcesContainer = answerContainer.querySelector('.sources');
+
+        // The response is newline-delimited JSON; render each event as it arrives
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) {
+                    continue;
+                }
+                const event = JSON.parse(line);
+                if (event.type === 'sources') {
+                    renderSources(sourcesContainer, event.sources);
+                } else if (event.type === 'token') {
+                    answerText.textContent += event.text;
+                } else if (event.type === 'error') {
+                    throw new Error(event.detail);
+                }
+            }
+        }
     } catch (error) {
         answerContainer.innerHTML = '<p class="error">Failed to get answer. Please try again.</p>';
     }
-}
\ No newline at end of file
+}
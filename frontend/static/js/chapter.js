@@ -23,30 +23,25 @@ async function initChapter() {
     }
 }
 
-async function displayTopic(index) {
+function displayTopic(index) {
     if (index < 0 || index >= topics.length) {
         return;
     }
 
-    try {
-        const response = await fetch(`/api/topic/${topics[index].id}`);
-        const topicContent = await response.json();
-        const contentArea = document.getElementById('content-area');
-        
-        contentArea.innerHTML = `
-            <h2>${topicContent.title}</h2>
-            <div class="topic-content">
-                ${topicContent.content}
-            </div>
-        `;
+    // Topics arrive with the chapter, so switching topics needs no request
+    const topicContent = topics[index];
+    const contentArea = document.getElementById('content-area');
 
-        updateProgress(index);
-        currentTopicIndex = index;
-        updateNavigation();
-    } catch (error) {
-        console.error('Error displaying topic:', error);
-        showError('Failed to load topic content');
-    }
+    contentArea.innerHTML = `
+        <h2>${topicContent.title}</h2>
+        <div class="topic-content">
+            ${topicContent.content}
+        </div>
+    `;
+
+    updateProgress(index);
+    currentTopicIndex = index;
+    updateNavigation();
 }
 
 function nextTopic() {
@@ -0,0 +1,56 @@
+// static/js/quiz.js
+// The chapter comes from the page URL: /quiz?chapter=ch1
+const QUIZ_CHAPTER_ID = new URLSearchParams(window.location.search).get('chapter');
+let quizQuestions = [];
+
+async function loadQuiz() {
+    const quizContainer = document.getElementById('quiz');
+    document.getElementById('score').innerHTML = '';
+
+    if (!QUIZ_CHAPTER_ID) {
+        quizContainer.innerHTML = '<p class="error-message">Open a quiz from a chapter page.</p>';
+        return;
+    }
+
+    try {
+        const response = await fetch(`/api/quiz/${QUIZ_CHAPTER_ID}?count=10`);
+        const result = await response.json();
+        if (!response.ok) {
+            throw new Error(result.detail || 'Failed to load quiz');
+        }
+
+        quizQuestions = result.questions;
+        quizContainer.innerHTML = quizQuestions.map((question, index) => `
+            <div class="answer">
+                <p><strong>${index + 1}. ${question.question}</strong></p>
+                ${question.options.map((option, optionIndex) => `
+                    <label>
+                        <input type="radio" name="q${index}" value="${optionIndex}">
+                        ${option}
+                    </label><br>
+                `).join('')}
+                <p class="explanation" id="explanation-${index}"></p>
+            </div>
+        `).join('');
+    } catch (error) {
+        console.error('Error loading quiz:', error);
+        quizContainer.innerHTML = `<p class="error-message">${error.message}</p>`;
+    }
+}
+
+function checkAnswers() {
+    let correct = 0;
+    quizQuestions.forEach((question, index) => {
+        const selected = document.querySelector(`input[name="q${index}"]:checked`);
+        const isCorrect = selected && Number(selected.value) === question.answer;
+        if (isCorrect) {
+            correct += 1;
+        }
+        document.getElementById(`explanation-${index}`).innerHTML = isCorrect
+            ? `Correct. ${question.explanation || ''}`
+            : `Answer: ${question.options[question.answer]}. ${question.explanation || ''}`;
+    });
+    document.getElementById('score').innerHTML = `<p>Score: ${correct} / ${quizQuestions.length}</p>`;
+}
+
+document.addEventListener('DOMContentLoaded', loadQuiz);